@@ -0,0 +1,127 @@
+"""
+Microbenchmark: Debezium JSON deserialization + statement lookup per event.
+
+Compares the original cdc_apply path (json.loads on the decoded string,
+then walking the envelope) against the cdc.serde deserializers that are
+installed. Messages are synthetic Customers change events with the schema
+block the JSON converter emits.
+
+    python benchmarks/bench_cdc_deserialize.py --events 200000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "migration" / "python"))
+
+from cdc.serde import DESERIALIZERS, CdcEvent  # noqa: E402
+from cdc.statements import CdcTable, StatementCache  # noqa: E402
+
+TABLES = {"Customers": CdcTable("adventureworkslite_dbo.customers", ["CustomerID"])}
+
+_ROW_FIELDS = [
+    {"type": "int32", "optional": False, "field": "CustomerID"},
+    {"type": "string", "optional": False, "field": "FirstName"},
+    {"type": "string", "optional": False, "field": "LastName"},
+    {"type": "string", "optional": True, "field": "Email"},
+    {"type": "string", "optional": True, "field": "Phone"},
+    {"type": "int64", "optional": True, "name": "io.debezium.time.Timestamp", "version": 1, "field": "CreatedDate"},
+    {"type": "int64", "optional": True, "name": "io.debezium.time.Timestamp", "version": 1, "field": "ModifiedDate"},
+]
+
+_SCHEMA = {
+    "type": "struct",
+    "fields": [
+        {"type": "struct", "fields": _ROW_FIELDS, "optional": True,
+         "name": "migrationlab-sqlserver.AdventureWorksLite.dbo.Customers.Value", "field": "before"},
+        {"type": "struct", "fields": _ROW_FIELDS, "optional": True,
+         "name": "migrationlab-sqlserver.AdventureWorksLite.dbo.Customers.Value", "field": "after"},
+        {"type": "struct", "fields": [
+            {"type": "string", "optional": False, "field": "version"},
+            {"type": "string", "optional": False, "field": "connector"},
+            {"type": "string", "optional": False, "field": "name"},
+            {"type": "int64", "optional": False, "field": "ts_ms"},
+            {"type": "string", "optional": False, "field": "db"},
+            {"type": "string", "optional": False, "field": "schema"},
+            {"type": "string", "optional": False, "field": "table"},
+            {"type": "string", "optional": True, "field": "change_lsn"},
+            {"type": "string", "optional": True, "field": "commit_lsn"},
+        ], "optional": False, "name": "io.debezium.connector.sqlserver.Source", "field": "source"},
+        {"type": "string", "optional": False, "field": "op"},
+        {"type": "int64", "optional": True, "field": "ts_ms"},
+    ],
+    "optional": False,
+    "name": "migrationlab-sqlserver.AdventureWorksLite.dbo.Customers.Envelope",
+}
+
+
+def make_messages(count):
+    messages = []
+    for n in range(count):
+        row = {
+            "CustomerID": n,
+            "FirstName": f"First{n}",
+            "LastName": f"Last{n}",
+            "Email": f"user{n}@example.com",
+            "Phone": "555-0100",
+            "CreatedDate": 1700000000000 + n,
+            "ModifiedDate": 1700000000000 + n,
+        }
+        payload = {
+            "before": None,
+            "after": row,
+            "source": {
+                "version": "2.5.0.Final", "connector": "sqlserver", "name": "migrationlab-sqlserver",
+                "ts_ms": 1700000000000, "db": "AdventureWorksLite", "schema": "dbo", "table": "Customers",
+                "change_lsn": "00000025:00000d48:0003", "commit_lsn": "00000025:00000d48:0005",
+            },
+            "op": "u",
+            "ts_ms": 1700000000000,
+        }
+        messages.append(json.dumps({"schema": _SCHEMA, "payload": payload}).encode("utf-8"))
+    return messages
+
+
+def baseline_decode(message):
+    # What cdc_apply did before: decode to str, parse the whole envelope
+    # (schema included) and walk it.
+    value = json.loads(message.decode("utf-8"))
+    payload = value["payload"]
+    return CdcEvent(payload.get("op"), payload.get("before"), payload.get("after"), value.get("schema"))
+
+
+def run_serde(decode, messages):
+    cache = StatementCache(TABLES)
+    for m in messages:
+        cache.statement("Customers", decode(m))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    messages = make_messages(args.events)
+    size_mb = sum(len(m) for m in messages) / 1e6
+    print(f"{args.events} events, {size_mb:.1f} MB")
+
+    cases = [("baseline json.loads", baseline_decode)]
+    cases += [(f"serde {name}", decode) for name, decode in DESERIALIZERS.items()]
+
+    baseline = None
+    for name, decode in cases:
+        started = time.perf_counter()
+        run_serde(decode, messages)
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(
+            f"{name:<22} {args.events / elapsed:>12,.0f} events/s "
+            f"{size_mb / elapsed:>8.1f} MB/s  {baseline / elapsed:>5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Microbenchmark: client-side COPY encoding of bulk_migrate rows, per core.
+
+Compares what each copy path does in the Python process before bytes
+reach libpq, without a database in the loop:
+
+  text write_row     COPY text, one copy.write_row() per row (the default)
+  binary write_row   COPY BINARY, one copy.write_row() per row, types set
+  binary RowEncoder  loader.pgcopy: dumpers fixed per table, one buffer
+                     per batch
+  arrow csv          --fetch arrow: record batches (built outside the
+                     timing, as arrow-odbc would hand them over) encoded
+                     by pyarrow's CSV writer; only when pyarrow is installed
+
+Rows are synthetic pyodbc-like values for the posgres-schema.sql types:
+Decimal for MONEY -> NUMERIC(19,4), datetime for DATETIME -> TIMESTAMP,
+str for NVARCHAR -> VARCHAR. Rates are rows per CPU second of this
+process, i.e. per core.
+
+    python benchmarks/bench_copy_encode.py --rows 200000 --table orders
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "migration" / "python"))
+
+from psycopg._copy_base import BinaryFormatter, TextFormatter  # noqa: E402
+from psycopg.adapt import Transformer  # noqa: E402
+from psycopg.postgres import types as pg_types  # noqa: E402
+
+from common import columnar  # noqa: E402
+from loader.pgcopy import RowEncoder  # noqa: E402
+
+TABLES = {
+    "orders": ["integer", "integer", "timestamp without time zone", "numeric", "character varying"],
+    "products": ["integer", "character varying", "character varying", "numeric", "integer",
+                 "timestamp without time zone"],
+}
+
+_STATUSES = ["Pending", "Shipped", "Delivered", "Cancelled"]
+_CATEGORIES = ["Bikes", "Components", "Clothing", "Accessories"]
+
+
+def make_rows(table, count):
+    start = datetime(2020, 1, 1, 8, 30)
+    if table == "orders":
+        return [
+            (n, n % 5000 + 1, start + timedelta(minutes=n, milliseconds=n % 1000 * 3),
+             Decimal(n % 100000) / 100 + Decimal("0.0000"), _STATUSES[n % 4])
+            for n in range(count)
+        ]
+    return [
+        (n, f"Product {n} Mountain-{n % 700}", _CATEGORIES[n % 4], Decimal(n % 5000) + Decimal("0.9900"),
+         n % 250, start + timedelta(seconds=n))
+        for n in range(count)
+    ]
+
+
+def run_formatter(formatter_cls, oids, rows, batch_size):
+    tx = Transformer()
+    if oids:
+        tx.set_dumper_types(oids, formatter_cls.format)
+    formatter = formatter_cls(tx)
+    size = 0
+    for start in range(0, len(rows), batch_size):
+        for row in rows[start:start + batch_size]:
+            size += len(formatter.write_row(row))
+    return size + len(formatter.end())
+
+
+def run_encoder(oids, rows, batch_size):
+    encoder = RowEncoder(oids)
+    size = len(encoder.header())
+    for start in range(0, len(rows), batch_size):
+        size += len(encoder.encode(rows[start:start + batch_size]))
+    return size + len(encoder.trailer())
+
+
+def make_record_batch(table, rows):
+    pa = columnar.pa
+    arrow_types = {
+        "integer": pa.int32(),
+        "numeric": pa.decimal128(19, 4),
+        "timestamp without time zone": pa.timestamp("ms"),
+        "character varying": pa.string(),
+    }
+    columns = list(zip(*rows))
+    return pa.record_batch(
+        [pa.array(values, arrow_types[name]) for values, name in zip(columns, TABLES[table])],
+        names=[f"c{n}" for n in range(len(columns))],
+    )
+
+
+def run_arrow_csv(batch, batch_size):
+    size = 0
+    for start in range(0, batch.num_rows, batch_size):
+        size += columnar.to_copy_csv(batch.slice(start, batch_size)).size
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--table", choices=sorted(TABLES), default="orders")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs per case")
+    args = parser.parse_args()
+
+    oids = [pg_types.get(name).oid for name in TABLES[args.table]]
+    rows = make_rows(args.table, args.rows)
+    print(f"{args.rows} {args.table} rows, batches of {args.batch_size}")
+
+    cases = [
+        ("text write_row", lambda: run_formatter(TextFormatter, None, rows, args.batch_size)),
+        ("binary write_row", lambda: run_formatter(BinaryFormatter, oids, rows, args.batch_size)),
+        ("binary RowEncoder", lambda: run_encoder(oids, rows, args.batch_size)),
+    ]
+    if columnar.pa is not None:
+        batch = make_record_batch(args.table, rows)
+        cases.append(("arrow csv", lambda: run_arrow_csv(batch, args.batch_size)))
+
+    baseline = None
+    for name, run in cases:
+        best = None
+        for _ in range(args.repeat):
+            started = time.process_time()
+            size = run()
+            elapsed = time.process_time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        baseline = baseline or best
+        print(
+            f"{name:<20} {args.rows / best:>12,.0f} rows/s/core "
+            f"{size / 1e6 / best:>8.1f} MB/s  {size / 1e6:>7.1f} MB  {baseline / best:>5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+End-to-end load benchmark against the lab databases.
+
+Phases, each timed on its own:
+  generate   datagen.py into the emptied SQL Server tables (with --generate)
+  bulk_load  bulk_migrate.load with --bulk-args
+  validate   ValidationRunner, plus one entry per check
+  cdc_apply  synthetic Debezium update events decoded and applied through
+             cdc_apply's lanes, without Kafka in the loop
+
+cdc_apply runs last because its updates make the target diverge from the
+source; the next run's bulk load resets it.
+
+Each phase reports rows/s, MB/s and the process's peak RSS so far. The
+run is written to benchmarks/results/<utc time>-<commit>.json; --compare
+prints the per-phase change against an earlier result file. The metrics
+registry (fetch/write/apply spans, pool waits) is saved alongside.
+
+    python benchmarks/bench_load.py --scale 10 --generate
+    python benchmarks/bench_load.py --compare benchmarks/results/<old>.json
+"""
+
+import argparse
+import json
+import platform
+import resource
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "migration" / "python"))
+
+import bulk_migrate  # noqa: E402
+import cdc_apply  # noqa: E402
+import datagen  # noqa: E402
+from bench_cdc_deserialize import make_messages  # noqa: E402
+from cdc.ordering import fk_order  # noqa: E402
+from cdc.serde import get_deserializer  # noqa: E402
+from cdc.statements import StatementCache  # noqa: E402
+from common import metrics  # noqa: E402
+from common.catalog import get_catalog  # noqa: E402
+from common.connections import connect_postgres, connect_sqlserver  # noqa: E402
+from validation.config import load_config  # noqa: E402
+from validation.runner import ValidationRunner  # noqa: E402
+
+# cdc_apply turns SIGINT into a graceful-stop flag for its poll loop;
+# here Ctrl-C should just stop the benchmark.
+signal.signal(signal.SIGINT, signal.default_int_handler)
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+Record = namedtuple("Record", "topic key value")
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def phase(results, name):
+    """
+    Time the block; it fills in rows/bytes on the yielded dict.
+    """
+    entry = {"name": name, "rows": None, "bytes": None}
+    started = time.perf_counter()
+    yield entry
+    seconds = time.perf_counter() - started
+    entry["seconds"] = round(seconds, 3)
+    if entry["rows"]:
+        entry["rows_per_s"] = round(entry["rows"] / seconds, 1)
+    if entry["bytes"]:
+        entry["mb_per_s"] = round(entry["bytes"] / 1e6 / seconds, 2)
+    entry["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    results.append(entry)
+    print(f"{name:<22} {seconds:>9.2f}s  {entry.get('rows_per_s', 0):>12,.0f} rows/s  "
+          f"{entry.get('mb_per_s', 0):>8.1f} MB/s  peak RSS {entry['peak_rss_mb']:.0f} MB")
+
+
+def source_stats():
+    """
+    (rows, bytes) of the source tables from the partition stats.
+    """
+    with connect_sqlserver() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT SUM(row_count), SUM(used_page_count) * 8192
+            FROM sys.dm_db_partition_stats
+            WHERE index_id IN (0, 1)
+              AND object_id IN ({', '.join(f"OBJECT_ID('dbo.{t}')" for t in get_catalog())})
+        """)
+        rows, size = cur.fetchone()
+    return int(rows or 0), int(size or 0)
+
+
+def target_bytes():
+    with connect_postgres() as conn:
+        tables = [table.target for table in get_catalog().tables()]
+        (size,) = conn.execute("SELECT SUM(pg_table_size(t::regclass)) FROM unnest(%s::text[]) t", (tables,)).fetchone()
+    return int(size or 0)
+
+
+def bench_generate(results, args):
+    with phase(results, "generate") as entry:
+        # Keys are explicit from 1: the seeded rows would collide with them
+        datagen.reset()
+        entry["rows"] = datagen.generate(args.scale, args.seed, args.workers)
+        entry["bytes"] = source_stats()[1]
+
+
+def bench_bulk_load(results, args):
+    load_args = bulk_migrate.parse_args(shlex.split(args.bulk_args))
+    rows, size = source_stats()
+    with phase(results, "bulk_load") as entry:
+        if load_args.defer_constraints:
+            bulk_migrate.load_with_deferred_constraints(load_args)
+        else:
+            bulk_migrate.load(load_args)
+        entry["rows"] = rows
+        entry["bytes"] = size
+    entry["target_bytes"] = target_bytes()
+
+
+def bench_validation(results, rows):
+    with phase(results, "validate") as entry:
+        checks = ValidationRunner(load_config()).run()
+        entry["rows"] = rows
+    for check in checks:
+        results.append({
+            "name": f"validate.{check.name}",
+            "seconds": round(check.seconds, 3),
+            "rows": rows,
+            "rows_per_s": round(rows / check.seconds, 1) if check.seconds else None,
+            "ok": check.ok,
+            "peak_rss_mb": entry["peak_rss_mb"],
+        })
+        print(f"  {check.name:<20} {check.seconds:>9.2f}s  {'OK' if check.ok else 'FAIL'}")
+
+
+def bench_cdc(results, args):
+    messages = make_messages(args.cdc_events)
+    topic = f"{cdc_apply.TOPIC_PREFIX}.Customers"
+    decode = get_deserializer("auto")
+    statements = StatementCache(cdc_apply.cdc_tables(get_catalog()))
+    order = fk_order(get_catalog())
+    conns = [connect_postgres("cdc_apply") for _ in range(args.apply_lanes)]
+    try:
+        with phase(results, "cdc_apply") as entry, ThreadPoolExecutor(max_workers=len(conns)) as executor:
+            applied = 0
+            for start in range(0, len(messages), args.cdc_batch):
+                batch = messages[start:start + args.cdc_batch]
+                records = [Record(topic, str(start + n).encode(), decode(m)) for n, m in enumerate(batch)]
+                applied += cdc_apply.apply_lanes(executor, conns, statements, records, order)
+            entry["rows"] = applied
+            entry["bytes"] = sum(len(m) for m in messages)
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(previous_path, results):
+    previous = {p["name"]: p for p in json.loads(Path(previous_path).read_text())["phases"]}
+    print(f"\nvs {previous_path}:")
+    for entry in results:
+        old = previous.get(entry["name"])
+        if old and old.get("seconds"):
+            change = 100 * (entry["seconds"] - old["seconds"]) / old["seconds"]
+            print(f"  {entry['name']:<22} {old['seconds']:>9.2f}s -> {entry['seconds']:>9.2f}s  {change:+6.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk load / CDC / validation benchmark")
+    parser.add_argument("--scale", type=float, default=1.0, help="datagen scale factor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=4, help="datagen insert threads")
+    parser.add_argument(
+        "--generate", action="store_true", help="truncate the source tables and generate source data first",
+    )
+    parser.add_argument(
+        "--bulk-args",
+        default="--workers 4 --chunk-size 50000 --preserve-ids",
+        help="arguments passed to bulk_migrate (--preserve-ids keeps the hash check meaningful)",
+    )
+    parser.add_argument("--cdc-events", type=int, default=100000)
+    parser.add_argument("--cdc-batch", type=int, default=500)
+    parser.add_argument("--apply-lanes", type=int, default=4)
+    parser.add_argument(
+        "--skip", action="append", default=[], choices=["bulk_load", "validate", "cdc_apply"],
+        help="phase to leave out (repeatable)",
+    )
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<utc time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+
+    if args.generate:
+        bench_generate(results, args)
+    if "bulk_load" not in args.skip:
+        bench_bulk_load(results, args)
+    if "validate" not in args.skip:
+        bench_validation(results, source_stats()[0])
+    if "cdc_apply" not in args.skip:
+        bench_cdc(results, args)
+
+    started = datetime.now(timezone.utc)
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": started.isoformat(timespec="seconds"),
+        "scale": args.scale,
+        "seed": args.seed,
+        "bulk_args": args.bulk_args,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "phases": results,
+        # spans, row/byte counters and pool waits recorded during the run
+        "metrics": metrics.REGISTRY.snapshot(),
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{started:%Y%m%dT%H%M%SZ}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Deterministic AdventureWorksLite data for the source SQL Server.
+
+Row counts scale linearly with --scale (1.0 ~ 186k rows). Every chunk of
+rows is a pure function of (seed, table, chunk), so the same scale and
+seed always produce the same data, chunks can be generated and inserted
+in parallel, and keys are explicit (IDENTITY_INSERT) rather than whatever
+order the inserts happened to commit in. OrderItem keys leave gaps
+(MAX_ITEMS_PER_ORDER slots per order), like a real table with deletes.
+
+Rows go in with pyodbc fast_executemany: parameter arrays bound in one
+ODBC call per batch, the same bulk path bcp uses for its batches.
+
+    python benchmarks/datagen.py --scale 10 --workers 4 --reset
+"""
+
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "migration" / "python"))
+
+from common.connections import connect_sqlserver  # noqa: E402
+
+BASE_ROWS = {"Customers": 10_000, "Products": 1_000, "Orders": 50_000}
+MAX_ITEMS_PER_ORDER = 4
+CHUNK_ROWS = 10_000
+BATCH_ROWS = 5_000
+
+COLUMNS = {
+    "Customers": ["CustomerID", "FirstName", "LastName", "Email", "Phone", "CreatedDate", "ModifiedDate"],
+    "Products": ["ProductID", "ProductName", "Category", "Price", "StockQuantity", "CreatedDate"],
+    "Orders": ["OrderID", "CustomerID", "OrderDate", "TotalAmount", "Status"],
+    "OrderItems": ["OrderItemID", "OrderID", "ProductID", "Quantity", "UnitPrice"],
+}
+
+FIRST_NAMES = ["John", "Jane", "Bob", "Alice", "Charlie", "María", "Zoë", "Łukasz", "Aiko", "Oluwaseun"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Williams", "Brown", "García", "Müller", "O'Brien", "Nguyen", "Kowalski"]
+CATEGORIES = ["Electronics", "Accessories", "Office", "Audio", "Storage", None]
+STATUSES = ["Pending", "Processing", "Shipped", "Completed", "Cancelled"]
+
+EPOCH = datetime(2020, 1, 1)
+SPAN_SECONDS = 5 * 365 * 24 * 3600
+CENT = Decimal("0.01")
+
+
+class Sizes(NamedTuple):
+    customers: int
+    products: int
+    orders: int
+
+
+def sizes(scale: float) -> Sizes:
+    return Sizes(*(max(1, int(BASE_ROWS[t] * scale)) for t in ("Customers", "Products", "Orders")))
+
+
+def _rng(seed: int, table: str, chunk: int) -> random.Random:
+    return random.Random(f"{seed}:{table}:{chunk}")
+
+
+def _timestamp(rng: random.Random) -> datetime:
+    # whole seconds: identical after DATETIME's 1/300 s rounding
+    return EPOCH + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+
+
+def _money(rng: random.Random, low: float, high: float) -> Decimal:
+    return Decimal(str(rng.uniform(low, high))).quantize(CENT)
+
+
+def customer_rows(seed: int, chunk: int, lo: int, hi: int) -> List[tuple]:
+    rng = _rng(seed, "Customers", chunk)
+    rows = []
+    for cid in range(lo, hi + 1):
+        created = _timestamp(rng)
+        phone = f"555-{rng.randrange(10000):04d}" if rng.random() < 0.9 else None
+        rows.append((
+            cid, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"user{cid}@example.com", phone,
+            created, created + timedelta(seconds=rng.randrange(86400 * 30)),
+        ))
+    return rows
+
+
+def product_rows(seed: int, chunk: int, lo: int, hi: int) -> List[tuple]:
+    rng = _rng(seed, "Products", chunk)
+    return [
+        (pid, f"Product {pid}", rng.choice(CATEGORIES), _money(rng, 1, 2000), rng.randrange(1000), _timestamp(rng))
+        for pid in range(lo, hi + 1)
+    ]
+
+
+def order_rows(seed: int, chunk: int, lo: int, hi: int, size: Sizes) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Orders lo..hi with their items; TotalAmount is the sum of the items.
+    """
+    rng = _rng(seed, "Orders", chunk)
+    orders, items = [], []
+    for oid in range(lo, hi + 1):
+        total = Decimal(0)
+        for slot in range(rng.randint(1, MAX_ITEMS_PER_ORDER)):
+            quantity, price = rng.randint(1, 5), _money(rng, 1, 500)
+            total += quantity * price
+            items.append(((oid - 1) * MAX_ITEMS_PER_ORDER + slot + 1, oid, rng.randint(1, size.products), quantity, price))
+        orders.append((oid, rng.randint(1, size.customers), _timestamp(rng), total, rng.choice(STATUSES)))
+    return orders, items
+
+
+def insert_rows(cur, table: str, rows: List[tuple]) -> None:
+    cols = COLUMNS[table]
+    sql = f"INSERT INTO dbo.[{table}] ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})"
+    cur.execute(f"SET IDENTITY_INSERT dbo.[{table}] ON")
+    for start in range(0, len(rows), BATCH_ROWS):
+        cur.executemany(sql, rows[start:start + BATCH_ROWS])
+    cur.execute(f"SET IDENTITY_INSERT dbo.[{table}] OFF")
+
+
+def load_chunk(seed: int, table: str, chunk: int, lo: int, hi: int, size: Sizes) -> int:
+    conn = connect_sqlserver("bulk_load")
+    try:
+        cur = conn.cursor()
+        cur.fast_executemany = True
+        if table == "Customers":
+            rows = customer_rows(seed, chunk, lo, hi)
+            insert_rows(cur, table, rows)
+        elif table == "Products":
+            rows = product_rows(seed, chunk, lo, hi)
+            insert_rows(cur, table, rows)
+        else:
+            rows, items = order_rows(seed, chunk, lo, hi, size)
+            insert_rows(cur, "Orders", rows)
+            insert_rows(cur, "OrderItems", items)
+            rows += items
+        conn.commit()
+        return len(rows)
+    finally:
+        conn.close()
+
+
+def reset() -> None:
+    """
+    Empty the four tables. TRUNCATE is refused on tables referenced by a
+    FK, so the FKs from init.sql are dropped around it and re-added.
+    """
+    conn = connect_sqlserver("bulk_load", autocommit=True)
+    try:
+        cur = conn.cursor()
+        cur.execute("ALTER TABLE dbo.OrderItems DROP CONSTRAINT FK_OrderItems_Orders, FK_OrderItems_Products")
+        cur.execute("ALTER TABLE dbo.Orders DROP CONSTRAINT FK_Orders_Customers")
+        for table in ("OrderItems", "Orders", "Products", "Customers"):
+            cur.execute(f"TRUNCATE TABLE dbo.[{table}]")
+        cur.execute(
+            "ALTER TABLE dbo.Orders ADD CONSTRAINT FK_Orders_Customers "
+            "FOREIGN KEY (CustomerID) REFERENCES dbo.Customers(CustomerID)"
+        )
+        cur.execute(
+            "ALTER TABLE dbo.OrderItems ADD "
+            "CONSTRAINT FK_OrderItems_Orders FOREIGN KEY (OrderID) REFERENCES dbo.Orders(OrderID), "
+            "CONSTRAINT FK_OrderItems_Products FOREIGN KEY (ProductID) REFERENCES dbo.Products(ProductID)"
+        )
+    finally:
+        conn.close()
+
+
+def existing_rows() -> int:
+    conn = connect_sqlserver("bulk_load")
+    try:
+        cur = conn.cursor()
+        counts = " + ".join(f"(SELECT COUNT_BIG(*) FROM dbo.[{table}])" for table in COLUMNS)
+        cur.execute(f"SELECT {counts}")
+        return int(cur.fetchone()[0])
+    finally:
+        conn.close()
+
+
+def _chunks(count: int) -> List[Tuple[int, int, int]]:
+    return [(n, lo, min(lo + CHUNK_ROWS - 1, count)) for n, lo in enumerate(range(1, count + 1, CHUNK_ROWS))]
+
+
+def generate(scale: float, seed: int = 42, workers: int = 4) -> int:
+    """
+    Insert the data set; parents first so the FKs hold. Returns rows inserted.
+    """
+    size = sizes(scale)
+    waves = [
+        [("Customers", c) for c in _chunks(size.customers)] + [("Products", c) for c in _chunks(size.products)],
+        [("Orders", c) for c in _chunks(size.orders)],
+    ]
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for wave in waves:
+            futures = [pool.submit(load_chunk, seed, table, n, lo, hi, size) for table, (n, lo, hi) in wave]
+            total += sum(f.result() for f in futures)
+    return total
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate AdventureWorksLite source data")
+    parser.add_argument("--scale", type=float, default=1.0, help="1.0 = 10k customers, 1k products, 50k orders")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--reset", action="store_true", help="truncate the source tables first")
+    args = parser.parse_args(argv)
+
+    if args.reset:
+        reset()
+    elif existing_rows():
+        # keys are explicit from 1 and would collide with the rows already there
+        parser.error("the source tables are not empty (e.g. the CI seed data); pass --reset to truncate them")
+    started = time.perf_counter()
+    rows = generate(args.scale, args.seed, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"{rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
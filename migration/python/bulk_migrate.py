@@ -2,92 +2,433 @@
 Bulk migrate data: SQL Server -> PostgreSQL
 """
 
-import pyodbc
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional
+
 import psycopg
 from colorama import Fore, Style, init
 
+from common import columnar, metrics
+from common.catalog import get_catalog
+from common.connections import connect_sqlserver, postgres_params
+from loader import constraints, pgcopy
+from loader.ledger import PostgresChunkLedger, SqliteChunkLedger, high_water_mark
+
 init(autoreset=True)
 
-# SQL Server (source)
-SOURCE_CONN_STR = (
-    "DRIVER={ODBC Driver 18 for SQL Server};"
-    "SERVER=localhost,1433;"
-    "DATABASE=AdventureWorksLite;"
-    "UID=sa;"
-    "PWD=MigrationLab123!;"
-    "Encrypt=yes;"
-    "TrustServerCertificate=yes;"
-)
-
-# PostgreSQL (target)
-TARGET_CONN = {
-    "host": "localhost",
-    "port": 5432,
-    "dbname": "migration_target",
-    "user": "postgres",
-    "password": "MigrationLab123!",
-}
-
-TABLE_PAIRS = [
-    (
-        "Customers",
-        "adventureworkslite_dbo.customers",
-        # Drop CustomerID; let Postgres assign customerid
-        ["FirstName", "LastName", "Email", "Phone", "CreatedDate", "ModifiedDate"],
-        ["firstname", "lastname", "email", "phone", "createddate", "modifieddate"],
-    ),
-    (
-        "Products",
-        "adventureworkslite_dbo.products",
-        # Drop ProductID
-        ["ProductName", "Category", "Price", "StockQuantity", "CreatedDate"],
-        ["productname", "category", "price", "stockquantity", "createddate"],
-    ),
-    (
-        "Orders",
-        "adventureworkslite_dbo.orders",
-        # Drop OrderID
-        ["CustomerID", "OrderDate", "TotalAmount", "Status"],
-        ["customerid", "orderdate", "totalamount", "status"],
-    ),
-    (
-        "OrderItems",
-        "adventureworkslite_dbo.orderitems",
-        # Drop OrderItemID
-        ["OrderID", "ProductID", "Quantity", "UnitPrice"],
-        ["orderid", "productid", "quantity", "unitprice"],
-    ),
-]
-
-
-def migrate_table(src_cur, tgt_cur, src_table, tgt_table, src_cols, tgt_cols):
-    print(f"{Fore.CYAN}Migrating {src_table} -> {tgt_table}{Style.RESET_ALL}")
-
-    # Fetch all rows from source
+# Source and target connections come from common.settings (environment
+# variables or envs/<env>.yaml) with the bulk_load session tuning.
+TARGET_CONN = postgres_params("bulk_load")
+
+# Tables, columns, keys, identities and FK parents come from common.catalog:
+# every source table with a target table is loaded, parents first.
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+class Chunk(NamedTuple):
+    src_table: str
+    tgt_table: str
+    src_cols: List[str]
+    tgt_cols: List[str]
+    key: str
+    lo: Optional[int]
+    hi: Optional[int]
+    index: int
+    total: int
+
+    @property
+    def label(self):
+        if self.lo is None:
+            return f"{self.src_table} chunk {self.index}/{self.total}"
+        return f"{self.src_table} chunk {self.index}/{self.total} ({self.key} {self.lo}-{self.hi})"
+
+
+def iter_source_batches(src_cur, sql, batch_size, params=()):
+    """
+    Yield lists of pyodbc Row objects of at most batch_size rows, so memory
+    stays bounded by one batch no matter how large the source table is.
+    """
+    src_cur.execute(sql, *params)
+    while True:
+        rows = src_cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def _row_bytes(row):
+    # Rough wire size: text and binary values by length, everything else
+    # (numbers, dates) as 8 bytes.
+    return sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in row if v is not None)
+
+
+def observe_batches(batches, tgt_table):
+    """
+    Pass batches through, counting rows, batch sizes and bytes. Bytes are
+    estimated from the first row of each batch so the hot loop stays free
+    of per-row bookkeeping.
+    """
+    for rows in batches:
+        metrics.ROWS.inc(len(rows), phase="bulk_load", table=tgt_table)
+        metrics.BATCH_ROWS.observe(len(rows), phase="bulk_load", table=tgt_table)
+        metrics.BYTES.inc(_row_bytes(rows[0]) * len(rows), phase="bulk_load", table=tgt_table)
+        yield rows
+
+
+def copy_batches(tgt_cur, tgt_table, tgt_cols, batches, copy_format="text", into=None):
+    """
+    Stream batches into tgt_table with COPY FROM STDIN. In text format rows
+    are handed to psycopg as-is (pyodbc Rows are sequences); in binary
+    format each batch is encoded into one buffer by a loader.pgcopy
+    RowEncoder for the target column types and written in one go (or, on
+    a psycopg without its encoder, rows go through write_row() with the
+    types set).
+
+    into names a table with tgt_table's columns (a staging table) to COPY
+    into instead.
+    """
+    tgt_col_list = ", ".join(tgt_cols)
+    copy_sql = f"COPY {into or tgt_table} ({tgt_col_list}) FROM STDIN"
+    oids = None
+    if copy_format == "binary":
+        oids = pgcopy.type_oids(tgt_cur, tgt_table, tgt_cols)
+        copy_sql += " (FORMAT BINARY)"
+        if pgcopy.available():
+            return _copy_binary(tgt_cur, tgt_table, copy_sql, pgcopy.RowEncoder(oids, tgt_cur), batches)
+
+    count = 0
+    with tgt_cur.copy(copy_sql) as copy:
+        if oids is not None:
+            copy.set_types(oids)
+        for rows in batches:
+            with metrics.span("bulk_load.write", table=tgt_table):
+                for row in rows:
+                    copy.write_row(row)
+            count += len(rows)
+    return count
+
+
+def _copy_binary(tgt_cur, tgt_table, copy_sql, encoder, batches):
+    # In block mode psycopg sends the buffers untouched: the signature and
+    # the trailer are ours to write.
+    count = 0
+    with tgt_cur.copy(copy_sql) as copy:
+        copy.write(encoder.header())
+        for rows in batches:
+            with metrics.span("bulk_load.transform", table=tgt_table):
+                data = encoder.encode(rows)
+            with metrics.span("bulk_load.write", table=tgt_table):
+                copy.write(data)
+            count += len(rows)
+        copy.write(encoder.trailer())
+    return count
+
+
+def observe_record_batches(batches, tgt_table):
+    """
+    observe_batches for Arrow record batches, whose size is known exactly.
+    """
+    for batch in batches:
+        metrics.ROWS.inc(batch.num_rows, phase="bulk_load", table=tgt_table)
+        metrics.BATCH_ROWS.observe(batch.num_rows, phase="bulk_load", table=tgt_table)
+        metrics.BYTES.inc(batch.nbytes, phase="bulk_load", table=tgt_table)
+        yield batch
+
+
+def copy_record_batches(tgt_cur, tgt_table, tgt_cols, batches, into=None):
+    """
+    COPY Arrow record batches as CSV. pyarrow encodes each batch in C++ and
+    it is written in one piece: no Python object per row or value.
+    """
+    tgt_col_list = ", ".join(tgt_cols)
+    copy_sql = f"COPY {into or tgt_table} ({tgt_col_list}) FROM STDIN {columnar.COPY_OPTIONS}"
+    count = 0
+    with tgt_cur.copy(copy_sql) as copy:
+        for batch in batches:
+            with metrics.span("bulk_load.transform", table=tgt_table):
+                data = columnar.to_copy_csv(batch)
+            with metrics.span("bulk_load.write", table=tgt_table):
+                copy.write(data)
+            count += batch.num_rows
+    return count
+
+
+def csv_copy_ok(tgt_table, tgt_cols):
+    """
+    Whether copy_record_batches() can load these columns (no bytea).
+    """
+    target_types = {c.target: c.target_type for c in get_catalog().by_target(tgt_table).columns}
+    return columnar.supports([target_types[c] for c in tgt_cols])
+
+
+def table_pairs(preserve_ids=False):
+    """
+    (source table, target table, source columns, target columns) for every
+    catalog table, parents first. Identity columns are left to Postgres
+    unless preserve_ids, in which case the source key values are loaded
+    as-is.
+    """
+    pairs = []
+    for table in get_catalog().tables():
+        columns = [c for c in table.columns if preserve_ids or not c.identity]
+        pairs.append((table.source, table.target, [c.source for c in columns], [c.target for c in columns]))
+    return pairs
+
+
+def _identity_column(tgt_table):
+    identity = get_catalog().by_target(tgt_table).identity
+    return identity.target if identity is not None else None
+
+
+def insert_batches(tgt_cur, tgt_table, tgt_cols, batches):
+    """
+    Fallback path: one executemany per batch. psycopg pipelines executemany,
+    but this is still much slower than COPY.
+    """
+    tgt_col_list = ", ".join(tgt_cols)
+    placeholders = ", ".join(["%s"] * len(tgt_cols))
+    # COPY always takes supplied identity values; INSERT has to be told to.
+    overriding = " OVERRIDING SYSTEM VALUE" if _identity_column(tgt_table) in tgt_cols else ""
+    insert_sql = f"INSERT INTO {tgt_table} ({tgt_col_list}){overriding} VALUES ({placeholders})"
+
+    count = 0
+    for rows in batches:
+        with metrics.span("bulk_load.write", table=tgt_table):
+            tgt_cur.executemany(insert_sql, rows)
+        count += len(rows)
+    return count
+
+
+def load_rows(
+    src_cur, tgt_cur, select_sql, params, tgt_table, tgt_cols, mode, copy_format, batch_size, fetch="rows",
+    into=None,
+):
+    # fetch covers the SELECT and every fetchmany; write covers handing a
+    # batch to COPY/executemany, which in text format is also where psycopg
+    # adapts values (binary COPY and Arrow time that separately as transform).
+    # With into (COPY only) the rows land in that staging table instead.
+    if fetch == "arrow" and mode == "copy" and columnar.available() and csv_copy_ok(tgt_table, tgt_cols):
+        # Read on arrow-odbc's own connection; src_cur stays unused.
+        batches = metrics.timed_iter(
+            columnar.read_batches(select_sql, params, batch_size, "bulk_load"), "bulk_load.fetch", table=tgt_table,
+        )
+        return copy_record_batches(tgt_cur, tgt_table, tgt_cols, observe_record_batches(batches, tgt_table), into)
+
+    batches = metrics.timed_iter(
+        iter_source_batches(src_cur, select_sql, batch_size, params), "bulk_load.fetch", table=tgt_table,
+    )
+    batches = observe_batches(batches, tgt_table)
+    if mode == "copy":
+        return copy_batches(tgt_cur, tgt_table, tgt_cols, batches, copy_format, into)
+    return insert_batches(tgt_cur, tgt_table, tgt_cols, batches)
+
+
+def migrate_table(
+    src_cur,
+    tgt_cur,
+    src_table,
+    tgt_table,
+    src_cols,
+    tgt_cols,
+    mode="copy",
+    copy_format="text",
+    batch_size=DEFAULT_BATCH_SIZE,
+    fetch="rows",
+):
+    print(f"{Fore.CYAN}Migrating {src_table} -> {tgt_table} ({mode}){Style.RESET_ALL}")
+
     src_col_list = ", ".join(src_cols)
-    src_cur.execute(f"SELECT {src_col_list} FROM {src_table}")
-    rows = src_cur.fetchall()
+    count = load_rows(
+        src_cur, tgt_cur, f"SELECT {src_col_list} FROM {src_table}", (),
+        tgt_table, tgt_cols, mode, copy_format, batch_size, fetch,
+    )
 
-    if not rows:
+    if not count:
         print(f"  {Fore.YELLOW}No rows to migrate{Style.RESET_ALL}")
         return 0
 
-    # Prepare INSERT for target
-    tgt_col_list = ", ".join(tgt_cols)
-    placeholders = ", ".join(["%s"] * len(tgt_cols))
-    insert_sql = f"INSERT INTO {tgt_table} ({tgt_col_list}) VALUES ({placeholders})"
+    print(f"  {Fore.GREEN}Inserted {count} rows{Style.RESET_ALL}")
+    return count
+
+
+def plan_chunks(src_cur, src_table, tgt_table, src_cols, tgt_cols, chunk_size):
+    """
+    Split a table into contiguous key ranges of chunk_size key values.
+    With chunk_size 0, an empty table or no integer key the whole table is
+    one chunk.
+    """
+    key = get_catalog().table(src_table).chunk_key
+    lo = hi = None
+    if chunk_size and key:
+        src_cur.execute(f"SELECT MIN({key}), MAX({key}) FROM {src_table}")
+        lo, hi = src_cur.fetchone()
+    if lo is None:
+        return [Chunk(src_table, tgt_table, src_cols, tgt_cols, key, None, None, 1, 1)]
+
+    # Boundaries are aligned to multiples of chunk_size so a restarted run
+    # plans exactly the same ranges as the one recorded in the ledger.
+    starts = range(lo - lo % chunk_size, hi + 1, chunk_size)
+    return [
+        Chunk(src_table, tgt_table, src_cols, tgt_cols, key, start, start + chunk_size - 1, n, len(starts))
+        for n, start in enumerate(starts, start=1)
+    ]
+
+
+def load_waves(table_pairs):
+    """
+    Group table_pairs() entries into waves that can load concurrently:
+    every table in a wave only depends (via its FK parents) on earlier waves.
+    """
+    catalog = get_catalog()
+    names = {pair[0] for pair in table_pairs}
+    done = set()
+    pending = list(table_pairs)
+    waves = []
+    while pending:
+        wave = [
+            pair for pair in pending
+            if all(parent in done for parent in catalog.table(pair[0]).parents if parent in names)
+        ]
+        if not wave:
+            raise ValueError(f"Cyclic foreign keys among {[p[0] for p in pending]}")
+        waves.append(wave)
+        done.update(pair[0] for pair in wave)
+        pending = [pair for pair in pending if pair not in wave]
+    return waves
+
+
+class WorkerConnections:
+    """
+    One pyodbc + psycopg connection pair per worker thread, reused across
+    the chunks that thread picks up and closed together at the end.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def get(self):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            src_conn = connect_sqlserver("bulk_load")
+            tgt_conn = psycopg.connect(**TARGET_CONN)
+            conns = (src_conn, tgt_conn)
+            self._local.conns = conns
+            with self._lock:
+                self._opened.append(conns)
+        return conns
 
-    # Convert pyodbc Row objects to plain tuples
-    data = [tuple(r) for r in rows]
+    def close_all(self):
+        with self._lock:
+            for src_conn, tgt_conn in self._opened:
+                src_conn.close()
+                tgt_conn.close()
+            self._opened = []
 
-    tgt_cur.executemany(insert_sql, data)
-    print(f"  {Fore.GREEN}Inserted {len(data)} rows{Style.RESET_ALL}")
-    return len(data)
 
+class ChunkProgress:
+    def __init__(self, chunks):
+        self._lock = threading.Lock()
+        self._remaining = {}
+        self._rows = {}
+        for chunk in chunks:
+            self._remaining[chunk.src_table] = self._remaining.get(chunk.src_table, 0) + 1
+            self._rows.setdefault(chunk.src_table, 0)
 
-def main():
+    def chunk_done(self, chunk, count, elapsed):
+        with self._lock:
+            self._remaining[chunk.src_table] -= 1
+            self._rows[chunk.src_table] += count
+            rate = count / elapsed if elapsed > 0 else 0.0
+            print(
+                f"  {Fore.GREEN}{chunk.label}: {count} rows in {elapsed:.1f}s "
+                f"({rate:,.0f} rows/s){Style.RESET_ALL}"
+            )
+            if not self._remaining[chunk.src_table]:
+                print(f"{Fore.CYAN}{chunk.src_table} done: {self._rows[chunk.src_table]} rows{Style.RESET_ALL}")
+
+
+def chunk_select(chunk):
+    """
+    (SELECT with ? placeholders, parameters) reading one chunk in key order.
+    """
+    src_col_list = ", ".join(chunk.src_cols)
+    select_sql = f"SELECT {src_col_list} FROM {chunk.src_table}"
+    params = ()
+    if chunk.lo is not None:
+        select_sql += f" WHERE {chunk.key} BETWEEN ? AND ?"
+        params = (chunk.lo, chunk.hi)
+    if chunk.key is not None:
+        select_sql += f" ORDER BY {chunk.key}"
+    return select_sql, params
+
+
+def migrate_chunk(conns, chunk, progress, mode, copy_format, batch_size, ledger=None, fetch="rows"):
+    """
+    Load one chunk on the calling worker's own connections and commit it,
+    recording it in the ledger (inside the same transaction when the ledger
+    lives in Postgres).
+    """
+    src_conn, tgt_conn = conns.get()
+    select_sql, params = chunk_select(chunk)
+
+    started = time.perf_counter()
+    src_cur = src_conn.cursor()
+    try:
+        with tgt_conn.cursor() as tgt_cur:
+            count = load_rows(
+                src_cur, tgt_cur, select_sql, params,
+                chunk.tgt_table, chunk.tgt_cols, mode, copy_format, batch_size, fetch,
+            )
+        if ledger is not None and ledger.transactional:
+            ledger.record(tgt_conn, chunk.src_table, chunk.lo, chunk.hi, count)
+        elif ledger is not None:
+            # The ledger row follows the commit, so the commit has to be
+            # durable first (the bulk_load role commits asynchronously).
+            tgt_conn.execute("SET LOCAL synchronous_commit = on")
+        with metrics.span("bulk_load.commit", table=chunk.tgt_table):
+            tgt_conn.commit()
+    except Exception:
+        tgt_conn.rollback()
+        raise
+    finally:
+        src_cur.close()
+
+    if ledger is not None and not ledger.transactional:
+        ledger.record(tgt_conn, chunk.src_table, chunk.lo, chunk.hi, count)
+
+    progress.chunk_done(chunk, count, time.perf_counter() - started)
+    return count
+
+
+def resync_identities(pairs):
+    """
+    Move each identity sequence past the loaded keys with a single setval
+    per table (MAX comes straight off the primary key index).
+    """
+    with psycopg.connect(**TARGET_CONN) as tgt_conn:
+        for src_table, tgt_table, _, _ in pairs:
+            identity = get_catalog().table(src_table).identity
+            if identity is None:
+                continue
+            tgt_id = identity.target
+            (value,) = tgt_conn.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({tgt_id}), 1), MAX({tgt_id}) IS NOT NULL) "
+                f"FROM {tgt_table}",
+                (tgt_table, tgt_id),
+            ).fetchone()
+            print(f"  {tgt_table}.{tgt_id} sequence set to {value}")
+
+
+def run_sequential(args):
     # Connect to source and target
-    src_conn = pyodbc.connect(SOURCE_CONN_STR)
+    src_conn = connect_sqlserver("bulk_load")
     src_cur = src_conn.cursor()
 
     tgt_conn = psycopg.connect(**TARGET_CONN)
@@ -96,17 +437,22 @@ def main():
 
     try:
         total = 0
-        for src_table, tgt_table, src_cols, tgt_cols in TABLE_PAIRS:
+        for src_table, tgt_table, src_cols, tgt_cols in table_pairs(args.preserve_ids):
             # Optional: clear target before loading (idempotent runs)
             tgt_cur.execute(f"TRUNCATE TABLE {tgt_table} RESTART IDENTITY CASCADE;")
-            inserted = migrate_table(src_cur, tgt_cur, src_table, tgt_table, src_cols, tgt_cols)
+            inserted = migrate_table(
+                src_cur, tgt_cur, src_table, tgt_table, src_cols, tgt_cols,
+                mode=args.mode,
+                copy_format=args.copy_format,
+                batch_size=args.batch_size,
+                fetch=args.fetch,
+            )
             total += inserted
 
         tgt_conn.commit()
-        print(f"\n{Fore.GREEN}Bulk migration completed. Total rows inserted: {total}{Style.RESET_ALL}")
-    except Exception as exc:
+        return total
+    except Exception:
         tgt_conn.rollback()
-        print(f"{Fore.RED}Migration failed: {exc}{Style.RESET_ALL}")
         raise
     finally:
         src_cur.close()
@@ -115,5 +461,225 @@ def main():
         tgt_conn.close()
 
 
+def open_ledger(args):
+    if args.ledger == "sqlite":
+        ledger = SqliteChunkLedger(args.ledger_path)
+    else:
+        ledger = PostgresChunkLedger(TARGET_CONN)
+    ledger.setup()
+    return ledger
+
+
+def skip_completed(chunks_by_table, done):
+    """
+    Drop chunks already recorded in the ledger and report where each table
+    resumes. Refuses to resume if the ledger was written with other ranges.
+    """
+    remaining = {}
+    for src_table, chunks in chunks_by_table.items():
+        planned = {(c.lo, c.hi) for c in chunks}
+        finished = done.get(src_table, set())
+        unknown = finished - planned
+        if unknown:
+            raise ValueError(
+                f"Ledger ranges for {src_table} do not match --chunk-size "
+                f"(e.g. {sorted(unknown)[0]}); rerun with the original chunk size"
+            )
+        remaining[src_table] = [c for c in chunks if (c.lo, c.hi) not in finished]
+        if finished:
+            mark = high_water_mark(planned, finished)
+            print(
+                f"{Fore.YELLOW}{src_table}: {len(finished)}/{len(chunks)} chunks already loaded, "
+                f"high-water mark {chunks[0].key}={mark}{Style.RESET_ALL}"
+            )
+    return remaining
+
+
+def run_parallel(args):
+    """
+    Truncate all targets up front, then load the chunks of each wave of
+    tables on a pool of workers. Every chunk commits on its own.
+
+    In resumable mode the truncate only happens when the ledger is empty;
+    otherwise chunks recorded as done are skipped. The ledger is cleared
+    once every table loaded completely.
+    """
+    pairs = table_pairs(args.preserve_ids)
+    src_conn = connect_sqlserver("bulk_load")
+    try:
+        src_cur = src_conn.cursor()
+        chunks_by_table = {
+            src_table: plan_chunks(src_cur, src_table, tgt_table, src_cols, tgt_cols, args.chunk_size)
+            for src_table, tgt_table, src_cols, tgt_cols in pairs
+        }
+        src_cur.close()
+    finally:
+        src_conn.close()
+
+    ledger = open_ledger(args) if args.resumable else None
+    done = ledger.completed() if ledger is not None else {}
+    if any(done.values()):
+        chunks_by_table = skip_completed(chunks_by_table, done)
+    else:
+        with psycopg.connect(**TARGET_CONN) as tgt_conn:
+            targets = ", ".join(pair[1] for pair in pairs)
+            tgt_conn.execute(f"TRUNCATE TABLE {targets} RESTART IDENTITY CASCADE;")
+
+    progress = ChunkProgress([c for chunks in chunks_by_table.values() for c in chunks])
+    conns = WorkerConnections()
+    total = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for wave in load_waves(pairs):
+                print(f"{Fore.CYAN}Loading {', '.join(pair[0] for pair in wave)} "
+                      f"with {args.workers} workers{Style.RESET_ALL}")
+                futures = [
+                    pool.submit(
+                        migrate_chunk, conns, chunk, progress,
+                        args.mode, args.copy_format, args.batch_size, ledger, args.fetch,
+                    )
+                    for pair in wave
+                    for chunk in chunks_by_table[pair[0]]
+                ]
+                try:
+                    for future in as_completed(futures):
+                        total += future.result()
+                except Exception:
+                    for future in futures:
+                        future.cancel()
+                    raise
+    finally:
+        conns.close_all()
+
+    if ledger is not None:
+        ledger.clear(pair[0] for pair in pairs)
+    return total
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk migrate SQL Server -> PostgreSQL")
+    parser.add_argument(
+        "--mode",
+        choices=["copy", "executemany"],
+        default="copy",
+        help="copy streams rows with COPY FROM STDIN; executemany is the slower fallback",
+    )
+    parser.add_argument(
+        "--copy-format",
+        choices=["text", "binary"],
+        default="text",
+        help="binary encodes each batch with precomputed per-table type adapters (loader.pgcopy)",
+    )
+    parser.add_argument(
+        "--fetch",
+        choices=["rows", "arrow"],
+        default="rows",
+        help="arrow reads record batches with arrow-odbc and COPYs them as CSV (copy mode; tables with "
+             "binary columns and installs without arrow-odbc use rows)",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker threads, each with its own source/target connections",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=0,
+        help="split tables into primary-key ranges of this many key values (0 = whole table)",
+    )
+    parser.add_argument(
+        "--resumable",
+        action="store_true",
+        help="record finished chunks in a ledger and skip them when a failed run is restarted",
+    )
+    parser.add_argument(
+        "--preserve-ids",
+        action="store_true",
+        help="load the source identity values (CustomerID, OrderID, ...) and resync the sequences afterwards; "
+             "required with --workers > 1, --chunk-size and --resumable",
+    )
+    parser.add_argument(
+        "--defer-constraints",
+        action="store_true",
+        help="drop FKs and secondary indexes during the load and rebuild them (using --workers) afterwards",
+    )
+    parser.add_argument("--ledger", choices=["postgres", "sqlite"], default="postgres")
+    parser.add_argument("--ledger-path", default="bulk_migrate_ledger.sqlite")
+    args = parser.parse_args(argv)
+    if args.resumable and not args.chunk_size:
+        parser.error("--resumable requires --chunk-size")
+    # Chunks commit in any order, so regenerated parent identities would not
+    # match the source IDs the child FK columns still carry.
+    if (args.workers > 1 or args.chunk_size or args.resumable) and not args.preserve_ids:
+        parser.error("--workers > 1, --chunk-size and --resumable require --preserve-ids")
+    return args
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    print(f"{Fore.CYAN}[{name}] started{Style.RESET_ALL}")
+    with metrics.span("bulk_load.phase", phase=name):
+        yield
+    print(f"{Fore.CYAN}[{name}] finished in {time.perf_counter() - started:.1f}s{Style.RESET_ALL}")
+
+
+def load(args):
+    if args.fetch == "arrow" and not columnar.available():
+        print(f"{Fore.YELLOW}arrow-odbc/pyarrow not installed, fetching rows with pyodbc{Style.RESET_ALL}")
+        args.fetch = "rows"
+    if args.workers > 1 or args.chunk_size or args.resumable:
+        total = run_parallel(args)
+    else:
+        total = run_sequential(args)
+    if args.preserve_ids:
+        with phase("resync identities"):
+            resync_identities(table_pairs(args.preserve_ids))
+    return total
+
+
+def load_with_deferred_constraints(args):
+    """
+    Drop FKs and secondary indexes, load, then rebuild indexes in parallel,
+    add FKs as NOT VALID + VALIDATE, and ANALYZE -- timing every phase.
+    """
+    tables = [table.target for table in get_catalog().tables()]
+    with phase("drop constraints"):
+        deferred = constraints.drop_deferred(TARGET_CONN, tables)
+        print(f"  dropped {len(deferred)} indexes/constraints")
+    with phase("load"):
+        total = load(args)
+    with phase("rebuild indexes"):
+        constraints.rebuild_indexes(TARGET_CONN, deferred, args.workers)
+    with phase("validate foreign keys"):
+        constraints.rebuild_foreign_keys(TARGET_CONN, deferred, args.workers)
+    constraints.forget(TARGET_CONN)
+    with phase("analyze"):
+        constraints.analyze(TARGET_CONN, tables, args.workers)
+    return total
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.start_from_env()
+
+    try:
+        if args.defer_constraints:
+            total = load_with_deferred_constraints(args)
+        else:
+            total = load(args)
+        print(f"\n{Fore.GREEN}Bulk migration completed. Total rows inserted: {total}{Style.RESET_ALL}")
+    except Exception as exc:
+        print(f"{Fore.RED}Migration failed: {exc}{Style.RESET_ALL}")
+        raise
+    finally:
+        metrics.flush()
+        for line in metrics.span_summary("bulk_load."):
+            print(f"  {line}")
+
+
 if __name__ == "__main__":
     main()
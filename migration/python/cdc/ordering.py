@@ -0,0 +1,96 @@
+"""
+Foreign-key order for applying a window of CDC records.
+
+Records of different tables come from different topics and partitions,
+so a window holds them in no particular order across tables, and apply
+lanes commit independently. The target's FKs are ON DELETE NO ACTION, so
+a child row written before its parent, or a parent deleted before its
+children, fails the statement.
+
+A window is therefore applied in phases, table wave by table wave:
+
+  1. deletes, children first: a deleted row frees its key and its UNIQUE
+     values (e.g. a customer's email) for an insert in the same window
+  2. upserts, parents first
+  3. deletes held back from phase 1, children first: those of tables whose
+     children are updated in the window, and of their ancestors, since an
+     update may move a child off a parent deleted after it
+
+A window that both moves children off a parent and reuses a unique value
+of that parent cannot be ordered without the source's own order; it fails
+until a smaller --max-records puts the two in different windows.
+
+Each row keeps only its last event (see cdc.coalesce): an intermediate
+delete or insert of a parent row could not be ordered against its
+children's events, and since events carry the full row and deletes are
+idempotent the final state is the same.
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from cdc.coalesce import Coalescer, envelope_op
+
+
+class FkOrder(NamedTuple):
+    # FK wave of every table (table_depths)
+    depths: Dict[str, int]
+    # tables referencing each table, by source name
+    children: Dict[str, List[str]]
+
+
+def table_depths(catalog) -> Dict[str, int]:
+    """
+    FK wave of every catalog table by source name: 0 without parents,
+    otherwise one more than its deepest parent.
+    """
+    depths: Dict[str, int] = {}
+    # catalog.tables() lists parents first
+    for table in catalog.tables():
+        depths[table.source] = 1 + max((depths[p] for p in table.parents if p in depths), default=-1)
+    return depths
+
+
+def fk_order(catalog) -> FkOrder:
+    children: Dict[str, List[str]] = {}
+    for table in catalog.tables():
+        for parent in table.parents:
+            children.setdefault(parent, []).append(table.source)
+    return FkOrder(table_depths(catalog), children)
+
+
+def fk_phases(
+    records: List[Any],
+    order: FkOrder,
+    table_of: Callable[[str], str],
+    op_getter: Callable[[Any], Optional[str]] = envelope_op,
+    coalescer: Optional[Coalescer] = None,
+) -> List[List[Any]]:
+    """
+    The records to apply, as phases to run one after the other. Records of
+    one phase can be applied concurrently; tables missing from the order
+    count as wave 0 without children. Pass a coalescer to keep its
+    counters across windows.
+    """
+    records = (coalescer or Coalescer(op_getter)).compact(records)
+    updated = {table_of(r.topic) for r in records if op_getter(r.value) == "u"}
+    held: set = set()
+    for table in sorted(order.depths, key=order.depths.get, reverse=True):
+        if any(c in updated or c in held for c in order.children.get(table, ())):
+            held.add(table)
+
+    early: Dict[int, List[Any]] = {}
+    upserts: Dict[int, List[Any]] = {}
+    late: Dict[int, List[Any]] = {}
+    for record in records:
+        table = table_of(record.topic)
+        depth = order.depths.get(table, 0)
+        if op_getter(record.value) != "d":
+            phase = upserts
+        else:
+            phase = late if table in held else early
+        phase.setdefault(depth, []).append(record)
+    return (
+        [early[d] for d in sorted(early, reverse=True)]
+        + [upserts[d] for d in sorted(upserts)]
+        + [late[d] for d in sorted(late, reverse=True)]
+    )
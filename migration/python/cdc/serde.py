@@ -0,0 +1,121 @@
+"""
+Deserializers for Debezium JSON change events.
+
+With the JSON converter's schemas enabled, most of every message is the
+`schema` block, which never changes between events of a table. The fast
+paths avoid paying for it on every record:
+
+- "msgspec": decodes into typed structs that only materialize op/before/
+  after; `schema` is kept as a msgspec.Raw slice of the message bytes
+  (no copy, no parse) and only compared byte-wise against the cached one.
+- "orjson": full parse, but several times faster than the stdlib.
+- "json": stdlib fallback, same behaviour as before.
+
+Decimal strings (decimal.handling.mode=string) and Debezium epoch-based
+temporal values are left untouched here; cdc.statements converts them in
+SQL, so there is no per-field Python work on any path.
+"""
+
+import json
+from typing import Any, Callable, NamedTuple, Optional
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional fast path
+    msgspec = None
+
+
+class CdcEvent(NamedTuple):
+    op: Optional[str]
+    before: Optional[dict]
+    after: Optional[dict]
+    # Parsed schema dict, raw schema bytes (msgspec.Raw) or None when the
+    # converter runs with schemas disabled.
+    schema: Any
+    # payload.source.ts_ms: when the change was committed on SQL Server
+    source_ts_ms: Optional[int] = None
+
+
+def event_op(event: Optional[CdcEvent]) -> Optional[str]:
+    return event.op if event is not None else None
+
+
+def _from_envelope(envelope: Any) -> Optional[CdcEvent]:
+    if not envelope:
+        return None
+    payload = envelope.get("payload", envelope)
+    if not payload:
+        return None
+    source = payload.get("source") or {}
+    return CdcEvent(
+        payload.get("op"), payload.get("before"), payload.get("after"), envelope.get("schema"), source.get("ts_ms"),
+    )
+
+
+def decode_json(message: Optional[bytes]) -> Optional[CdcEvent]:
+    if not message:
+        return None
+    return _from_envelope(json.loads(message))
+
+
+def decode_orjson(message: Optional[bytes]) -> Optional[CdcEvent]:
+    if not message:
+        return None
+    return _from_envelope(orjson.loads(message))
+
+
+if msgspec is not None:
+
+    class _Source(msgspec.Struct):
+        ts_ms: Optional[int] = None
+
+    class _Payload(msgspec.Struct):
+        op: Optional[str] = None
+        before: Optional[dict] = None
+        after: Optional[dict] = None
+        source: Optional[_Source] = None
+
+    class _Envelope(msgspec.Struct):
+        # An empty Raw means the message had no schema block.
+        schema: msgspec.Raw = msgspec.Raw()
+        payload: Optional[_Payload] = None
+        # schemas.enable=false: the payload fields sit at the top level
+        op: Optional[str] = None
+        before: Optional[dict] = None
+        after: Optional[dict] = None
+        source: Optional[_Source] = None
+
+    _envelope_decoder = msgspec.json.Decoder(_Envelope)
+
+    def decode_msgspec(message: Optional[bytes]) -> Optional[CdcEvent]:
+        if not message:
+            return None
+        envelope = _envelope_decoder.decode(message)
+        payload = envelope.payload or envelope
+        source_ts_ms = payload.source.ts_ms if payload.source is not None else None
+        return CdcEvent(payload.op, payload.before, payload.after, envelope.schema or None, source_ts_ms)
+
+
+DESERIALIZERS = {"json": decode_json}
+if orjson is not None:
+    DESERIALIZERS["orjson"] = decode_orjson
+if msgspec is not None:
+    DESERIALIZERS["msgspec"] = decode_msgspec
+
+
+def get_deserializer(name: str = "auto") -> Callable[[Optional[bytes]], Optional[CdcEvent]]:
+    """
+    Return the named deserializer; "auto" picks the fastest one installed.
+    """
+    if name == "auto":
+        for candidate in ("msgspec", "orjson", "json"):
+            if candidate in DESERIALIZERS:
+                return DESERIALIZERS[candidate]
+    if name not in DESERIALIZERS:
+        raise ValueError(f"Deserializer {name!r} is not available (installed: {', '.join(DESERIALIZERS)})")
+    return DESERIALIZERS[name]
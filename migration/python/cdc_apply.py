@@ -1,22 +1,38 @@
-import json
+import argparse
+import re
 import signal
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from kafka import KafkaConsumer
 import psycopg
 from colorama import Fore, Style, init
 
+from cdc.coalesce import Coalescer
+from cdc.ordering import fk_order, fk_phases
+from common import metrics
+from common.catalog import get_catalog
+from common.connections import postgres_params
+from common.settings import load_settings
+from cdc.serde import event_op, get_deserializer
+from cdc.statements import CdcTable, StatementCache
+
 init(autoreset=True)
 
-KAFKA_BOOTSTRAP = "localhost:29092"  # from your Docker compose
-TOPIC = "migrationlab-sqlserver.AdventureWorksLite.dbo.Customers"
+SETTINGS = load_settings()
+KAFKA_BOOTSTRAP = SETTINGS.kafka_bootstrap
+TOPIC_PREFIX = "migrationlab-sqlserver.AdventureWorksLite.dbo"
+
+# One topic per captured table (table.include.list in
+# connectors/sqlserver-adventureworks.json); tables the connector starts
+# capturing later are picked up by the pattern subscription.
+TOPIC_PATTERN = rf"^{re.escape(TOPIC_PREFIX)}\.[^.]+$"
+
+PG_CONN = postgres_params("cdc_apply", SETTINGS.postgres_conn)
 
-PG_CONN = {
-    "host": "localhost",
-    "port": 5432,
-    "dbname": "migration_target",
-    "user": "postgres",
-    "password": "MigrationLab123!",
-}
+# end_offsets is a broker round trip; consumer lag is refreshed this often
+LAG_INTERVAL_S = 10.0
 
 running = True
 
@@ -31,98 +47,288 @@ signal.signal(signal.SIGINT, shutdown)
 signal.signal(signal.SIGTERM, shutdown)
 
 
-def apply_event(cur, payload):
-    op = payload.get("op")
-    after = payload.get("after")
-    before = payload.get("before")
-
-    # Debezium op codes: c=create, r=read (snapshot), u=update, d=delete
-    if op in ("c", "r"):
-        # Insert new row
-        cur.execute(
-            """
-            INSERT INTO customers (customer_id, first_name, last_name, email, phone, created_date, modified_date)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (customer_id) DO UPDATE
-              SET first_name = EXCLUDED.first_name,
-                  last_name = EXCLUDED.last_name,
-                  email = EXCLUDED.email,
-                  phone = EXCLUDED.phone,
-                  created_date = EXCLUDED.created_date,
-                  modified_date = EXCLUDED.modified_date;
-            """,
-            (
-                after["CustomerID"],
-                after["FirstName"],
-                after["LastName"],
-                after.get("Email"),
-                after.get("Phone"),
-                after.get("CreatedDate"),
-                after.get("ModifiedDate"),
-            ),
-        )
-    elif op == "u":
-        # Update existing row
-        cur.execute(
-            """
-            UPDATE customers
-               SET first_name = %s,
-                   last_name = %s,
-                   email = %s,
-                   phone = %s,
-                   created_date = %s,
-                   modified_date = %s
-             WHERE customer_id = %s;
-            """,
-            (
-                after["FirstName"],
-                after["LastName"],
-                after.get("Email"),
-                after.get("Phone"),
-                after.get("CreatedDate"),
-                after.get("ModifiedDate"),
-                after["CustomerID"],
-            ),
-        )
-    elif op == "d":
-        # Delete row
-        key_id = before["CustomerID"] if before else after["CustomerID"]
-        cur.execute(
-            "DELETE FROM customers WHERE customer_id = %s;",
-            (key_id,),
-        )
-
-
-def main():
-    print(f"{Fore.CYAN}Starting CDC applier for topic: {TOPIC}{Style.RESET_ALL}")
+def cdc_tables(catalog):
+    """
+    CdcTable per catalog table with a primary key, keyed by source table
+    name like the topics. Events of unmapped tables are skipped.
+    """
+    return {
+        t.source: CdcTable(t.target, t.primary_key, {c.source: c.target for c in t.columns})
+        for t in catalog.tables()
+        if t.primary_key
+    }
+
+
+def table_for_topic(topic):
+    return topic.rsplit(".", 1)[-1]
+
+
+def apply_event(cur, statements, topic, envelope):
+    stmt = statements.statement(table_for_topic(topic), envelope)
+    if stmt is not None:
+        cur.execute(*stmt)
+
+
+def apply_batch(cur, statements, records):
+    """
+    Apply records in order. Consecutive events that share a statement are
+    sent as one executemany, which psycopg pipelines into a single round
+    trip. Returns the number of events applied.
+    """
+    applied = 0
+    sql, params = None, []
+    for record in records:
+        stmt = statements.statement(table_for_topic(record.topic), record.value)
+        if stmt is None:
+            continue
+        if stmt[0] is not sql and params:
+            cur.executemany(sql, params)
+            params = []
+        sql = stmt[0]
+        params.append(stmt[1])
+        applied += 1
+    if params:
+        cur.executemany(sql, params)
+    return applied
+
+
+def poll_batch(consumer, max_records, max_latency_ms):
+    """
+    Collect records until max_records are buffered or max_latency_ms has
+    passed since the first poll, whichever comes first.
+    """
+    deadline = time.monotonic() + max_latency_ms / 1000.0
+    records = []
+    while running and len(records) < max_records:
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            break
+        polled = consumer.poll(timeout_ms=remaining_ms, max_records=max_records - len(records))
+        for partition_records in polled.values():
+            records.extend(partition_records)
+    return records
+
+
+def lane_for(record, lanes):
+    # Debezium keys messages by primary key, so hashing the raw key bytes
+    # keeps every change of one row on the same lane, in offset order.
+    return hash((record.topic, record.key)) % lanes
+
+
+def apply_on_connection(conn, statements, records):
+    try:
+        with metrics.span("cdc.apply"), conn.cursor() as cur:
+            applied = apply_batch(cur, statements, records)
+        with metrics.span("cdc.commit"):
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied
+
+
+def fk_ordered(records, order, coalescer=None):
+    """
+    The batch as phases in FK order (cdc.ordering): deletes children first,
+    upserts parents first, then the deletes that had to wait for them, one
+    event per row.
+    """
+    return fk_phases(records, order, table_for_topic, event_op, coalescer)
+
+
+def apply_lanes(executor, conns, statements, records, order, coalescer=None):
+    """
+    Apply a batch phase by phase in FK order. Each phase is split into
+    per-key lanes applied concurrently, one pooled connection per lane, and
+    finishes before the next starts. Each lane commits on its own; a
+    failure leaves the Kafka offsets uncommitted, so the whole batch is
+    replayed (upserts/deletes are idempotent).
+    """
+    applied = 0
+    for phase in fk_ordered(records, order, coalescer):
+        lanes = [[] for _ in conns]
+        for record in phase:
+            lanes[lane_for(record, len(conns))].append(record)
+        futures = [
+            executor.submit(apply_on_connection, conn, statements, lane)
+            for conn, lane in zip(conns, lanes)
+            if lane
+        ]
+        applied += sum(future.result() for future in futures)
+    return applied
 
+
+def make_consumer(args, value_deserializer):
     consumer = KafkaConsumer(
-        TOPIC,
         bootstrap_servers=[KAFKA_BOOTSTRAP],
         auto_offset_reset="earliest",
         enable_auto_commit=False,
-        # NOTE: no group_id here – simpler on Windows
-        value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+        # NOTE: without --group-id no offsets are stored (simpler on Windows)
+        group_id=args.group_id,
+        value_deserializer=value_deserializer,
+    )
+    consumer.subscribe(pattern=TOPIC_PATTERN)
+    return consumer
+
+
+def observe_batch(records, applied):
+    """
+    Rows, bytes and batch size of a committed batch, and per event the lag
+    from its SQL Server commit (Debezium source.ts_ms) until now.
+    """
+    metrics.ROWS.inc(applied, phase="cdc_apply")
+    metrics.BATCH_ROWS.observe(len(records), phase="cdc_apply")
+    metrics.BYTES.inc(sum(max(r.serialized_value_size, 0) for r in records), phase="cdc_apply")
+    now_ms = time.time() * 1000
+    lags = [
+        (now_ms - r.value.source_ts_ms) / 1000
+        for r in records
+        if r.value is not None and r.value.source_ts_ms is not None
+    ]
+    if lags:
+        metrics.CDC_LAG_SECONDS.observe_many(lags)
+
+
+def observe_consumer_lag(consumer):
+    partitions = list(consumer.assignment())
+    if not partitions:
+        return
+    for tp, end in consumer.end_offsets(partitions).items():
+        lag = max(end - consumer.position(tp), 0)
+        metrics.KAFKA_CONSUMER_LAG.set(lag, topic=tp.topic, partition=tp.partition)
+
+
+def run_consumer(worker_id, args, statements, order):
+    """
+    One consumer-group member: owns whatever partitions Kafka assigns it
+    and applies its batches over --apply-lanes Postgres connections.
+    """
+    # Records are decoded inside poll(); the time is added up per call and
+    # recorded once per batch.
+    decode_timer = metrics.SpanTimer("cdc.deserialize")
+    consumer = make_consumer(args, decode_timer.wrap(get_deserializer(args.deserializer)))
+    conns = [psycopg.connect(**PG_CONN) for _ in range(args.apply_lanes)]
+    executor = ThreadPoolExecutor(max_workers=args.apply_lanes) if args.apply_lanes > 1 else None
+    # fk_ordered always compacts; this one only keeps the counters
+    coalescer = Coalescer(event_op)
+    lag_checked = 0.0
+    try:
+        while running:
+            with metrics.span("cdc.poll"):
+                records = poll_batch(consumer, args.max_records, args.max_latency_ms)
+            decode_timer.flush()
+            if time.monotonic() - lag_checked >= LAG_INTERVAL_S:
+                observe_consumer_lag(consumer)
+                lag_checked = time.monotonic()
+            metrics.flush(min_interval=LAG_INTERVAL_S)
+            if not records:
+                continue
+            if executor is not None:
+                applied = apply_lanes(executor, conns, statements, records, order, coalescer)
+            else:
+                ordered = [record for phase in fk_ordered(records, order, coalescer) for record in phase]
+                applied = apply_on_connection(conns[0], statements, ordered)
+            # Offsets only move after Postgres committed: at-least-once.
+            if args.group_id:
+                consumer.commit()
+            observe_batch(records, applied)
+            print(
+                f"{Fore.GREEN}[consumer {worker_id}] Applied {applied} changes to PostgreSQL "
+                f"({len(records)} records, collapse ratio {coalescer.ratio:.1f}x){Style.RESET_ALL}"
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        for conn in conns:
+            conn.close()
+        consumer.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Apply Debezium CDC events to PostgreSQL")
+    parser.add_argument(
+        "--max-records",
+        type=int,
+        default=500,
+        help="max events per batch; each batch is collapsed to the final state per primary key",
+    )
+    parser.add_argument("--max-latency-ms", type=int, default=200, help="max time to wait while filling a batch")
+    parser.add_argument(
+        "--group-id",
+        default=None,
+        help="Kafka consumer group; offsets are committed only when one is set",
+    )
+    parser.add_argument(
+        "--consumers",
+        type=int,
+        default=1,
+        help=(
+            "consumer threads in the group, each owning a share of the partitions; tables owned by "
+            "different consumers are applied independently, so FK order holds only within one consumer"
+        ),
+    )
+    parser.add_argument(
+        "--apply-lanes",
+        type=int,
+        default=1,
+        help="Postgres connections per consumer; events are spread over them by primary key",
+    )
+    parser.add_argument(
+        "--deserializer",
+        choices=["auto", "msgspec", "orjson", "json"],
+        default="auto",
+        help="auto picks msgspec, then orjson, then the stdlib json module",
     )
+    args = parser.parse_args(argv)
+    if args.consumers > 1 and not args.group_id:
+        parser.error("--consumers > 1 requires --group-id")
+    return args
 
-    with psycopg.connect(**PG_CONN) as conn:
-        with conn.cursor() as cur:
-            try:
-                for record in consumer:
-                    payload = record.value.get("payload") if record.value else None
-                    if not payload:
-                        continue
-                    apply_event(cur, payload)
-                    conn.commit()
-                    print(f"{Fore.GREEN}Applied 1 change to PostgreSQL{Style.RESET_ALL}")
-                    if not running:
-                        break
-            finally:
-                consumer.close()
-                print(f"{Fore.CYAN}CDC applier stopped.{Style.RESET_ALL}")
 
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.start_from_env()
+    tables = cdc_tables(get_catalog())
+    print(f"{Fore.CYAN}Starting CDC applier for {TOPIC_PATTERN} ({', '.join(tables)}){Style.RESET_ALL}")
+
+    statements = StatementCache(tables)
+    order = fk_order(get_catalog())
+    if args.consumers == 1:
+        try:
+            run_consumer(0, args, statements, order)
+        finally:
+            metrics.flush()
+            print(f"{Fore.CYAN}CDC applier stopped.{Style.RESET_ALL}")
+        return 0
+
+    print(
+        f"{Fore.YELLOW}{args.consumers} consumers: tables owned by different consumers are applied "
+        f"independently, a child event may be applied before its parent's{Style.RESET_ALL}"
+    )
+    errors = []
+
+    def worker(worker_id):
+        global running
+        try:
+            run_consumer(worker_id, args, statements, order)
+        except Exception as exc:
+            errors.append(exc)
+            print(f"{Fore.RED}[consumer {worker_id}] failed: {exc}{Style.RESET_ALL}")
+            running = False
 
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(args.consumers)]
+    for thread in threads:
+        thread.start()
+    # Join with a timeout so SIGINT/SIGTERM still reach the main thread.
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+    metrics.flush()
+    print(f"{Fore.CYAN}CDC applier stopped.{Style.RESET_ALL}")
+    if errors:
+        raise errors[0]
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,406 @@
+"""
+Catalog of the migrated tables: one place for table and column mappings,
+primary keys, identities, types and FK parents.
+
+Only the naming rules are declared here (SOURCE_SCHEMA -> TARGET_SCHEMA,
+lower-cased names as SCT generated them, plus TABLE_RULES for exceptions).
+Everything else is read from INFORMATION_SCHEMA on both engines: every
+source base table that has a target table is migrated, with the columns
+present on both sides, so a new table needs no code edits to be loaded,
+replicated and validated.
+
+Introspection runs once per schema version. load_catalog() first asks
+each engine for a fingerprint of its schema (one query each); a catalog
+cached under that fingerprint (CATALOG_CACHE_DIR, JSON) is reused, and the
+result is memoized for the rest of the process.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SCHEMA = "dbo"
+TARGET_SCHEMA = "adventureworkslite_dbo"
+
+# Bumped whenever the cached JSON layout changes
+CATALOG_VERSION = 1
+
+CACHE_DIR = pathlib.Path(os.getenv("CATALOG_CACHE_DIR", pathlib.Path.home() / ".cache" / "migration-lab"))
+
+
+class TableRule(NamedTuple):
+    # target table name in TARGET_SCHEMA (default: lower-cased source name)
+    target: Optional[str] = None
+    # source column -> target column, where it is not just lower-cased
+    columns: Dict[str, str] = {}
+    # source columns that are not migrated
+    exclude: Sequence[str] = ()
+    skip: bool = False
+
+
+# Exceptions to the naming rules, by source table
+TABLE_RULES: Dict[str, TableRule] = {}
+
+# SQL Server DATA_TYPE -> comparison kind used by the validators (canonical
+# text for the hash check, normalizer for sampling, aggregates for "int" and
+# "money"). Columns of other types are loaded but not compared.
+SOURCE_KINDS = {
+    "int": "int", "bigint": "int", "smallint": "int", "tinyint": "int",
+    "money": "money", "smallmoney": "money", "decimal": "money", "numeric": "money",
+    "datetime": "datetime", "datetime2": "datetime", "smalldatetime": "datetime",
+    "char": "text", "varchar": "text", "nchar": "text", "nvarchar": "text",
+}
+
+
+class Column(NamedTuple):
+    source: str
+    target: str
+    source_type: str
+    target_type: str
+    kind: Optional[str]
+    nullable: bool
+    identity: bool
+
+
+class TableMapping(NamedTuple):
+    source: str
+    # schema-qualified target table
+    target: str
+    # in source ordinal order, primary key included
+    columns: List[Column]
+    primary_key: List[str]
+    # source tables referenced by foreign keys
+    parents: List[str]
+
+    @property
+    def pk(self) -> Optional[Column]:
+        """
+        The single-column primary key, or None for composite/missing keys.
+        """
+        if len(self.primary_key) != 1:
+            return None
+        return self.column(self.primary_key[0])
+
+    @property
+    def pk_src(self) -> str:
+        return self.pk.source
+
+    @property
+    def pk_tgt(self) -> str:
+        return self.pk.target
+
+    @property
+    def chunk_key(self) -> Optional[str]:
+        """
+        Source column to split the table into key ranges on: an integer
+        single-column primary key.
+        """
+        pk = self.pk
+        return pk.source if pk is not None and pk.kind == "int" else None
+
+    @property
+    def identity(self) -> Optional[Column]:
+        return next((c for c in self.columns if c.identity), None)
+
+    @property
+    def compared_columns(self) -> List[Column]:
+        """
+        Non-key columns with a comparison kind, for hashes and samples.
+        """
+        return [c for c in self.columns if c.kind is not None and c.source not in self.primary_key]
+
+    @property
+    def numeric_columns(self) -> List[Column]:
+        """
+        The key first, then every int/money column, for aggregate checks.
+        """
+        rest = [c for c in self.compared_columns if c.kind in ("int", "money")]
+        return ([self.pk] if self.chunk_key else []) + rest
+
+    def column(self, source: str) -> Column:
+        for c in self.columns:
+            if c.source == source:
+                return c
+        raise KeyError(f"{self.source} has no column {source!r}")
+
+
+class Catalog:
+    def __init__(self, tables: Iterable[TableMapping], fingerprint: str = ""):
+        self.fingerprint = fingerprint
+        self._tables = {t.source: t for t in _parents_first(list(tables))}
+        self._by_target = {t.target: t for t in self._tables.values()}
+
+    def tables(self) -> List[TableMapping]:
+        """
+        Every mapped table, parents before the tables referencing them.
+        """
+        return list(self._tables.values())
+
+    def keyed_tables(self) -> List[TableMapping]:
+        """
+        Tables with an integer single-column key: what the PK-range checks
+        (hash buckets, partitioned counts, sample probes) and chunked
+        loading need.
+        """
+        return [t for t in self._tables.values() if t.chunk_key is not None]
+
+    def table(self, source: str) -> TableMapping:
+        return self._tables[source]
+
+    def by_target(self, target: str) -> TableMapping:
+        return self._by_target[target]
+
+    def __contains__(self, source: str) -> bool:
+        return source in self._tables
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "version": CATALOG_VERSION,
+            "fingerprint": self.fingerprint,
+            "tables": [t._asdict() for t in self._tables.values()],
+        }, indent=1)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Catalog":
+        data = json.loads(text)
+        if data.get("version") != CATALOG_VERSION:
+            raise ValueError(f"Catalog cache version {data.get('version')} != {CATALOG_VERSION}")
+        tables = [
+            TableMapping(**{**t, "columns": [Column(*c) for c in t["columns"]]})
+            for t in data["tables"]
+        ]
+        return cls(tables, data["fingerprint"])
+
+
+def _parents_first(tables: List[TableMapping]) -> List[TableMapping]:
+    names = {t.source for t in tables}
+    ordered: List[TableMapping] = []
+    done: set = set()
+    pending = sorted(tables, key=lambda t: t.source)
+    while pending:
+        ready = [t for t in pending if all(p in done or p == t.source for p in t.parents if p in names)]
+        if not ready:
+            raise ValueError(f"Cyclic foreign keys among {[t.source for t in pending]}")
+        ordered += ready
+        done.update(t.source for t in ready)
+        pending = [t for t in pending if t.source not in done]
+    return ordered
+
+
+# Introspection rows, as returned by the queries below
+SourceColumnRow = Tuple[str, str, str, str, int, Optional[int]]  # table, column, type, nullable, identity, pk pos
+TargetColumnRow = Tuple[str, str, str]                           # table, column, type
+ForeignKeyRow = Tuple[str, str]                                  # table, referenced table
+
+
+def build_catalog(
+    source_columns: Iterable[SourceColumnRow],
+    foreign_keys: Iterable[ForeignKeyRow],
+    target_columns: Iterable[TargetColumnRow],
+    rules: Optional[Dict[str, TableRule]] = None,
+    fingerprint: str = "",
+) -> Catalog:
+    """
+    Match introspected source and target columns through the naming rules.
+    """
+    rules = TABLE_RULES if rules is None else rules
+    target_types: Dict[str, Dict[str, str]] = {}
+    for table, column, data_type in target_columns:
+        target_types.setdefault(table, {})[column] = data_type
+
+    parents: Dict[str, List[str]] = {}
+    for table, referenced in foreign_keys:
+        parents.setdefault(table, []).append(referenced)
+
+    by_table: Dict[str, List[SourceColumnRow]] = {}
+    for row in source_columns:
+        by_table.setdefault(row[0], []).append(row)
+
+    tables = []
+    for source, rows in by_table.items():
+        rule = rules.get(source, TableRule())
+        target_name = rule.target or source.lower()
+        if rule.skip:
+            continue
+        if target_name not in target_types:
+            logger.info("Catalog: %s.%s has no target table, not migrated", SOURCE_SCHEMA, source)
+            continue
+
+        columns, pk = [], []
+        for _, name, data_type, nullable, identity, pk_pos in rows:
+            if name in rule.exclude:
+                continue
+            target = rule.columns.get(name, name.lower())
+            target_type = target_types[target_name].get(target)
+            if target_type is None:
+                logger.warning("Catalog: %s.%s has no target column %s, not migrated", source, name, target)
+                continue
+            columns.append(Column(
+                name, target, data_type, target_type, SOURCE_KINDS.get(data_type.lower()),
+                nullable == "YES", bool(identity),
+            ))
+            if pk_pos is not None:
+                pk.append((pk_pos, name))
+        tables.append(TableMapping(
+            source,
+            f"{TARGET_SCHEMA}.{target_name}",
+            columns,
+            [name for _, name in sorted(pk)],
+            sorted(set(parents.get(source, [])) - {source}),
+        ))
+    return Catalog(tables, fingerprint)
+
+
+SQLSERVER_FINGERPRINT = """
+    SELECT CONVERT(VARCHAR(64), HASHBYTES('SHA2_256', STRING_AGG(CAST(CONCAT_WS(':',
+               o.type, o.name, o.modify_date, c.name, c.system_type_id, c.max_length,
+               c.precision, c.scale, c.is_nullable, c.is_identity) AS NVARCHAR(MAX)), ',')
+           WITHIN GROUP (ORDER BY o.name, c.column_id)), 2)
+    FROM sys.objects o
+    LEFT JOIN sys.columns c ON c.object_id = o.object_id AND o.type = 'U'
+    WHERE o.schema_id = SCHEMA_ID(?) AND o.type IN ('U', 'PK', 'F')
+"""
+
+POSTGRES_FINGERPRINT = """
+    SELECT md5(string_agg(concat_ws(':', c.relname, a.attname, a.atttypid, a.atttypmod, a.attnotnull),
+                          ',' ORDER BY c.relname, a.attnum))
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    WHERE n.nspname = %s AND c.relkind IN ('r', 'p')
+"""
+
+SQLSERVER_COLUMNS = """
+    SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE,
+           COLUMNPROPERTY(OBJECT_ID(QUOTENAME(c.TABLE_SCHEMA) + '.' + QUOTENAME(c.TABLE_NAME)),
+                          c.COLUMN_NAME, 'IsIdentity'),
+           k.ORDINAL_POSITION
+    FROM INFORMATION_SCHEMA.COLUMNS c
+    JOIN INFORMATION_SCHEMA.TABLES t
+      ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME AND t.TABLE_TYPE = 'BASE TABLE'
+    LEFT JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+      ON tc.TABLE_SCHEMA = c.TABLE_SCHEMA AND tc.TABLE_NAME = c.TABLE_NAME AND tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+    LEFT JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE k
+      ON k.CONSTRAINT_SCHEMA = tc.CONSTRAINT_SCHEMA AND k.CONSTRAINT_NAME = tc.CONSTRAINT_NAME
+     AND k.COLUMN_NAME = c.COLUMN_NAME
+    WHERE c.TABLE_SCHEMA = ?
+    ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+"""
+
+SQLSERVER_FOREIGN_KEYS = """
+    SELECT fk.TABLE_NAME, pk.TABLE_NAME
+    FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc
+    JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS fk
+      ON fk.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA AND fk.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
+    JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS pk
+      ON pk.CONSTRAINT_SCHEMA = rc.UNIQUE_CONSTRAINT_SCHEMA AND pk.CONSTRAINT_NAME = rc.UNIQUE_CONSTRAINT_NAME
+    WHERE fk.TABLE_SCHEMA = ?
+"""
+
+POSTGRES_COLUMNS = """
+    SELECT c.table_name, c.column_name, c.data_type
+    FROM information_schema.columns c
+    JOIN information_schema.tables t
+      ON t.table_schema = c.table_schema AND t.table_name = c.table_name AND t.table_type = 'BASE TABLE'
+    WHERE c.table_schema = %s
+    ORDER BY c.table_name, c.ordinal_position
+"""
+
+
+def fingerprint(src_cur, tgt_conn) -> str:
+    src_cur.execute(SQLSERVER_FINGERPRINT, SOURCE_SCHEMA)
+    (src,) = src_cur.fetchone()
+    (tgt,) = tgt_conn.execute(POSTGRES_FINGERPRINT, (TARGET_SCHEMA,)).fetchone()
+    rules = repr(sorted((name, rule) for name, rule in TABLE_RULES.items()))
+    key = f"{CATALOG_VERSION}|{SOURCE_SCHEMA}:{src}|{TARGET_SCHEMA}:{tgt}|{rules}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def introspect(src_cur, tgt_conn, fp: str = "") -> Catalog:
+    src_cur.execute(SQLSERVER_COLUMNS, SOURCE_SCHEMA)
+    source_columns = [tuple(row) for row in src_cur.fetchall()]
+    src_cur.execute(SQLSERVER_FOREIGN_KEYS, SOURCE_SCHEMA)
+    foreign_keys = [tuple(row) for row in src_cur.fetchall()]
+    target_columns = tgt_conn.execute(POSTGRES_COLUMNS, (TARGET_SCHEMA,)).fetchall()
+    return build_catalog(source_columns, foreign_keys, target_columns, fingerprint=fp)
+
+
+def _cache_path(fp: str) -> pathlib.Path:
+    return CACHE_DIR / f"catalog-{fp[:16]}.json"
+
+
+def _read_cache(fp: str) -> Optional[Catalog]:
+    try:
+        catalog = Catalog.from_json(_cache_path(fp).read_text(encoding="utf-8"))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return catalog if catalog.fingerprint == fp else None
+
+
+def _write_cache(catalog: Catalog) -> None:
+    path = _cache_path(catalog.fingerprint)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(catalog.to_json(), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as exc:
+        logger.warning("Catalog: could not cache to %s: %s", path, exc)
+
+
+_lock = threading.Lock()
+_current: Optional[Catalog] = None
+
+
+def load_catalog(
+    sqlserver_conn: Optional[str] = None, postgres_conn: Optional[str] = None, refresh: bool = False,
+) -> Catalog:
+    """
+    Fingerprint both schemas and return the matching cached catalog, or
+    introspect and cache it. The result becomes the process's catalog
+    (get_catalog()).
+    """
+    global _current
+    # Drivers are only needed here; the model above stays importable without them.
+    from common.connections import connect_postgres, connect_sqlserver
+
+    with _lock:
+        with connect_sqlserver("default", sqlserver_conn) as src_conn, \
+                connect_postgres("default", postgres_conn) as tgt_conn:
+            src_cur = src_conn.cursor()
+            fp = fingerprint(src_cur, tgt_conn)
+            if not refresh and _current is not None and _current.fingerprint == fp:
+                return _current
+            catalog = None if refresh else _read_cache(fp)
+            if catalog is None:
+                catalog = introspect(src_cur, tgt_conn, fp)
+                _write_cache(catalog)
+                logger.info("Catalog: introspected %d tables (%s)", len(catalog), fp[:16])
+        _current = catalog
+        return catalog
+
+
+def get_catalog() -> Catalog:
+    """
+    The catalog loaded by load_catalog(), loading it with the default
+    connection settings on first use.
+    """
+    return _current if _current is not None else load_catalog()
+
+
+def set_catalog(catalog: Optional[Catalog]) -> None:
+    global _current
+    with _lock:
+        _current = catalog
@@ -0,0 +1,131 @@
+"""
+Optional columnar reads from SQL Server through arrow-odbc.
+
+pyodbc builds a Row, and a Python object per value, for every row it
+fetches. arrow-odbc binds column buffers instead and hands back pyarrow
+RecordBatches, so a wide scan stays in C until something actually needs
+Python values. Memory is bounded by one batch: at most batch_size rows
+and MAX_BYTES_PER_BATCH of transit buffer.
+
+Batches go to Postgres as COPY CSV produced by pyarrow's C++ CSV writer
+(bulk_migrate --fetch arrow) or become Arrow tables / DataFrames for the
+validators. Everything here is optional: callers check available() and
+keep the pyodbc row path otherwise.
+
+    for batch in columnar.read_batches("SELECT ... WHERE id BETWEEN ? AND ?", (lo, hi), 50000):
+        copy.write(columnar.to_copy_csv(batch))
+"""
+
+import threading
+from typing import Any, Iterator, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # optional fast path
+    pa = None
+
+try:
+    import arrow_odbc
+except (ImportError, OSError):  # optional fast path; OSError when libodbc is missing
+    arrow_odbc = None
+
+DEFAULT_BATCH_SIZE = 50000
+# Transit buffer cap per batch; arrow-odbc sizes it by the widest possible
+# row, so wide tables get fewer rows per batch rather than more memory.
+MAX_BYTES_PER_BATCH = 64 * 1024 * 1024
+# Upper bound assumed for NVARCHAR(MAX)/VARCHAR(MAX) values, which would
+# otherwise make every row 2 GB wide for the buffer sizing.
+MAX_TEXT_SIZE = 8000
+
+# Appended to "COPY table (cols) FROM STDIN" for to_copy_csv() data.
+COPY_OPTIONS = "(FORMAT csv)"
+
+_pooling_lock = threading.Lock()
+_pooling_enabled = False
+
+
+def available() -> bool:
+    return pa is not None and arrow_odbc is not None
+
+
+def _enable_pooling() -> None:
+    # ODBC connection pooling has to be switched on before the first
+    # connection; it keeps the TLS handshake out of every read_batches().
+    global _pooling_enabled
+    with _pooling_lock:
+        if not _pooling_enabled:
+            arrow_odbc.enable_odbc_connection_pooling()
+            _pooling_enabled = True
+
+
+def _parameter(value: Any) -> Optional[str]:
+    # arrow-odbc binds every parameter as VARCHAR; SQL Server converts
+    # them back to the column type in the comparison.
+    return None if value is None else str(value)
+
+
+def _reader(sql: str, params: Sequence[Any], batch_size: int, role: str, conn_str: Optional[str]):
+    # pyodbc is only needed here; the CSV encoding stays importable without it.
+    from common.connections import SQLSERVER_SESSION, sqlserver_conn_str
+
+    if not available():
+        raise RuntimeError("Columnar reads need the arrow-odbc and pyarrow packages")
+    _enable_pooling()
+    return arrow_odbc.read_arrow_batches_from_odbc(
+        query=sql,
+        connection_string=sqlserver_conn_str(role, conn_str),
+        batch_size=batch_size,
+        parameters=[_parameter(p) for p in params],
+        max_bytes_per_batch=MAX_BYTES_PER_BATCH,
+        max_text_size=MAX_TEXT_SIZE,
+        packet_size=SQLSERVER_SESSION.get(role, {}).get("packet_size"),
+    )
+
+
+def read_batches(
+    sql: str,
+    params: Sequence[Any] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    role: str = "default",
+    conn_str: Optional[str] = None,
+) -> Iterator["pa.RecordBatch"]:
+    """
+    Run sql (with ? placeholders) on its own ODBC connection and yield its
+    result as RecordBatches of at most batch_size rows.
+    """
+    yield from _reader(sql, params, batch_size, role, conn_str)
+
+
+def read_table(
+    sql: str,
+    params: Sequence[Any] = (),
+    role: str = "default",
+    conn_str: Optional[str] = None,
+) -> "pa.Table":
+    """
+    The whole result as one Arrow table, for small reads such as sampled
+    rows or the leaf ranges of a hash diff.
+    """
+    reader = _reader(sql, params, DEFAULT_BATCH_SIZE, role, conn_str)
+    return pa.Table.from_batches(list(reader), schema=reader.schema)
+
+
+def supports(target_types: Sequence[str]) -> bool:
+    """
+    Whether columns of these Postgres types (information_schema data types)
+    round-trip through to_copy_csv(). Binary columns do not: the CSV writer
+    emits their raw bytes, where COPY expects bytea's hex format.
+    """
+    return "bytea" not in target_types
+
+
+def to_copy_csv(batch: "pa.RecordBatch") -> "pa.Buffer":
+    """
+    Encode a batch for COPY ... (FORMAT csv). NULLs are written unquoted
+    and empty, every string is quoted (so "" stays an empty string),
+    decimals keep their scale and timestamps are ISO with a space.
+    """
+    out = pa.BufferOutputStream()
+    pa_csv.write_csv(batch, out, pa_csv.WriteOptions(include_header=False))
+    return out.getvalue()
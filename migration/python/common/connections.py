@@ -0,0 +1,130 @@
+"""
+Connections and pools per role, with session tuning applied at connect time.
+
+Postgres settings travel in the libpq `options` startup parameter, so they
+cost no extra round trip. SQL Server gets ODBC connection attributes
+(network packet size) and connection-string keywords.
+
+Pools keep connections -- and their TLS sessions (Encrypt=yes) -- open
+across checks and record how long callers wait to acquire one.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import psycopg
+import pyodbc
+from psycopg_pool import AsyncConnectionPool
+from psycopg_pool import ConnectionPool as PsycopgPool
+
+from common.pool import AcquireMetrics, ConnectionPool
+from common.settings import load_settings
+
+POSTGRES_SESSION = {
+    # With the Postgres chunk ledger a commit lost to a server crash is lost
+    # together with its ledger row, so the chunk is simply loaded again on
+    # resume. The SQLite ledger is written after the commit returns:
+    # bulk_migrate.migrate_chunk turns synchronous_commit back on for it.
+    "bulk_load": {"synchronous_commit": "off", "work_mem": "64MB", "maintenance_work_mem": "1GB"},
+    # Kafka offsets are committed after Postgres: every commit must be durable.
+    "cdc_apply": {"synchronous_commit": "on"},
+    "validation": {"work_mem": "256MB", "default_transaction_read_only": "on"},
+    "migrations": {"maintenance_work_mem": "1GB"},
+}
+
+# ODBC connection attribute, must be set before connecting
+SQL_ATTR_PACKET_SIZE = 112
+
+SQLSERVER_SESSION = {
+    # Largest TDS packet: fewer round trips for wide result sets
+    "bulk_load": {"packet_size": 32767},
+    "validation": {"packet_size": 32767, "keywords": "ApplicationIntent=ReadOnly;"},
+}
+
+
+def postgres_options(role: str) -> str:
+    return " ".join(f"-c {name}={value}" for name, value in POSTGRES_SESSION.get(role, {}).items())
+
+
+def postgres_params(role: str = "default", conninfo: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Keyword arguments for psycopg.connect(**params).
+    """
+    params: Dict[str, Any] = {"conninfo": conninfo or load_settings().postgres_conn}
+    options = postgres_options(role)
+    if options:
+        params["options"] = options
+    return params
+
+
+def connect_postgres(role: str = "default", conninfo: Optional[str] = None, **kwargs) -> psycopg.Connection:
+    return psycopg.connect(**postgres_params(role, conninfo), **kwargs)
+
+
+def sqlserver_conn_str(role: str = "default", conn_str: Optional[str] = None) -> str:
+    conn_str = (conn_str or load_settings().sqlserver_conn).strip()
+    keywords = SQLSERVER_SESSION.get(role, {}).get("keywords")
+    if keywords:
+        conn_str = conn_str.rstrip(";") + ";" + keywords
+    return conn_str
+
+
+def connect_sqlserver(role: str = "default", conn_str: Optional[str] = None, **kwargs) -> pyodbc.Connection:
+    packet_size = SQLSERVER_SESSION.get(role, {}).get("packet_size")
+    if packet_size:
+        kwargs.setdefault("attrs_before", {SQL_ATTR_PACKET_SIZE: packet_size})
+    return pyodbc.connect(sqlserver_conn_str(role, conn_str), **kwargs)
+
+
+def sqlserver_pool(role: str, max_size: int, conn_str: Optional[str] = None) -> ConnectionPool:
+    return ConnectionPool(lambda: connect_sqlserver(role, conn_str), max_size, name=f"sqlserver-{role}")
+
+
+class PostgresPool:
+    """
+    psycopg_pool.ConnectionPool behind the interface of common.pool's
+    ConnectionPool: connection() commits on success, rolls back on error,
+    and acquisitions are timed.
+    """
+
+    def __init__(self, role: str, max_size: int, conninfo: Optional[str] = None, min_size: int = 1):
+        params = postgres_params(role, conninfo)
+        self.metrics = AcquireMetrics(f"postgres-{role}")
+        self._pool = PsycopgPool(
+            params.pop("conninfo"),
+            kwargs=params,
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            configure=lambda conn: self.metrics.connected(),
+            name=self.metrics.name,
+            open=True,
+        )
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[psycopg.Connection]:
+        started = time.perf_counter()
+        with self._pool.connection(timeout=timeout) as conn:
+            self.metrics.record(time.perf_counter() - started)
+            yield conn
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def postgres_async_pool(
+    role: str, max_size: int, conninfo: Optional[str] = None, min_size: int = 1,
+) -> AsyncConnectionPool:
+    """
+    Unopened async pool with the role's session settings; use it as
+    `async with postgres_async_pool(...) as pool:`.
+    """
+    params = postgres_params(role, conninfo)
+    return AsyncConnectionPool(
+        params.pop("conninfo"),
+        kwargs=params,
+        min_size=min(min_size, max_size),
+        max_size=max_size,
+        name=f"postgres-{role}-async",
+        open=False,
+    )
@@ -0,0 +1,369 @@
+"""
+Process-wide counters, gauges, histograms and timing spans.
+
+There is no client library behind this: the registry renders the
+Prometheus text format itself, to a file for node_exporter's textfile
+collector (METRICS_TEXTFILE), over HTTP (METRICS_PORT) and as a plain
+dict for JSON reports such as validation-report.json.
+
+    with metrics.span("bulk_load.write", table=tgt_table):
+        ...
+    metrics.ROWS.inc(len(rows), phase="bulk_load", table=tgt_table)
+"""
+
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+LAG_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._series: Dict[Labels, Any] = {}
+
+    def _lines(self) -> List[str]:
+        raise NotImplementedError
+
+    def _snapshot(self, value: Any) -> Any:
+        return value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self._lines()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            series = list(self._series.items())
+        return [{"labels": dict(labels), **self._snapshot(value)} for labels, value in series]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._series.get(_labels(labels), 0)
+
+    def _lines(self) -> List[str]:
+        with self._lock:
+            series = list(self._series.items())
+        return [f"{self.name}{_format_labels(labels)} {_number(value)}" for labels, value in series]
+
+    def _snapshot(self, value: float) -> Dict[str, Any]:
+        return {"value": value}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._series[_labels(labels)] = value
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self, buckets: int):
+        # Per bucket, not cumulative; the last slot is +Inf.
+        self.counts = [0] * (buckets + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = TIME_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self.observe_many((value,), **labels)
+
+    def observe_many(self, values: Iterable[float], **labels: Any) -> None:
+        """
+        Several observations of one series under a single lock round.
+        """
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            for value in values:
+                series.counts[bisect_left(self.buckets, value)] += 1
+                series.count += 1
+                series.sum += value
+                if value > series.max:
+                    series.max = value
+
+    def _lines(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for labels, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), series.counts):
+                    cumulative += count
+                    le = _format_labels(labels + (("le", _number(bound)),))
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_number(series.sum)}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series.count}")
+        return lines
+
+    def _snapshot(self, series: _HistogramSeries) -> Dict[str, Any]:
+        return {
+            "count": series.count,
+            "sum": round(series.sum, 6),
+            "avg": round(series.sum / series.count, 6) if series.count else None,
+            "max": round(series.max, 6),
+        }
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if type(existing) is not type(metric):
+            raise ValueError(f"Metric {metric.name!r} is already registered as a {existing.kind}")
+        return existing
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._register(Gauge(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = TIME_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, buckets))
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Every series that has been recorded, JSON-serializable.
+        """
+        return {metric.name: series for metric in self.metrics() if (series := metric.snapshot())}
+
+    def clear(self) -> None:
+        for metric in self.metrics():
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+ROWS = REGISTRY.counter("migration_rows_total", "Rows read, loaded or applied")
+BYTES = REGISTRY.counter("migration_bytes_total", "Payload bytes read, loaded or applied")
+BATCH_ROWS = REGISTRY.histogram("migration_batch_rows", "Rows per batch", SIZE_BUCKETS)
+SPAN_SECONDS = REGISTRY.histogram("migration_span_seconds", "Wall time of instrumented spans", TIME_BUCKETS)
+CDC_LAG_SECONDS = REGISTRY.histogram(
+    "cdc_lag_seconds", "Source commit (Debezium source.ts_ms) to Postgres commit, per event", LAG_BUCKETS,
+)
+KAFKA_CONSUMER_LAG = REGISTRY.gauge("kafka_consumer_lag_messages", "Partition end offset minus consumer position")
+POOL_ACQUIRE_SECONDS = REGISTRY.histogram("db_pool_acquire_seconds", "Time spent waiting for a pooled connection")
+POOL_CONNECTS = REGISTRY.counter("db_pool_connects_total", "Connections opened by a pool")
+
+
+@contextmanager
+def span(name: str, **labels: Any) -> Iterator[None]:
+    """
+    Time the block into migration_span_seconds{span=name, ...}; failed
+    blocks are recorded too.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - started, span=name, **labels)
+
+
+def timed_iter(iterable: Iterable[Any], name: str, **labels: Any) -> Iterator[Any]:
+    """
+    Yield from iterable, timing each next() as a span: for generators that
+    do their I/O lazily (fetchmany loops).
+    """
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            SPAN_SECONDS.observe(time.perf_counter() - started, span=name, **labels)
+        yield item
+
+
+class SpanTimer:
+    """
+    Adds up many short calls (per-message decoding) and records them as one
+    span observation per flush(), so the bookkeeping costs one clock read
+    pair per call instead of a locked histogram update. Not thread-safe:
+    use one per thread.
+    """
+
+    def __init__(self, name: str, **labels: Any):
+        self.name = name
+        self.labels = labels
+        self.seconds = 0.0
+        self.calls = 0
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - started
+                self.calls += 1
+
+        return timed
+
+    def flush(self) -> None:
+        if self.calls:
+            SPAN_SECONDS.observe(self.seconds, span=self.name, **self.labels)
+            self.seconds = 0.0
+            self.calls = 0
+
+
+def span_summary(prefix: str = "") -> List[str]:
+    """
+    One line per recorded span series: calls, total and max seconds.
+    """
+    lines = []
+    for entry in SPAN_SECONDS.snapshot():
+        labels = dict(entry["labels"])
+        name = labels.pop("span")
+        if not name.startswith(prefix):
+            continue
+        extra = " ".join(f"{k}={v}" for k, v in labels.items())
+        lines.append(
+            f"{name:<28} {extra:<40} {entry['count']:>7} x {entry['sum']:>10.2f}s  max {entry['max']:.3f}s"
+        )
+    return sorted(lines)
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY) -> None:
+    """
+    Write atomically: the textfile collector must never read a partial file.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, addr: str = "", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Serve the registry for Prometheus scrapes on a daemon thread.
+    """
+    server = ThreadingHTTPServer((addr, port), _Handler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def start_from_env() -> Optional[ThreadingHTTPServer]:
+    """
+    Start the HTTP endpoint when METRICS_PORT is set.
+    """
+    port = os.getenv("METRICS_PORT")
+    return serve(int(port)) if port else None
+
+
+def flush(min_interval: float = 0.0) -> None:
+    """
+    Rewrite METRICS_TEXTFILE, if set, at most once per min_interval seconds.
+    """
+    global _last_flush
+    path = os.getenv("METRICS_TEXTFILE")
+    if not path:
+        return
+    with _flush_lock:
+        now = time.monotonic()
+        if min_interval and now - _last_flush < min_interval:
+            return
+        _last_flush = now
+        write_textfile(path)
@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List
+
+from common import metrics
+
+
+class AcquireMetrics:
+    """
+    How long callers waited for a connection, and how many of those
+    acquisitions had to open (and TLS-handshake) a new one.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.acquires = 0
+        self.connects = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.acquires += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        metrics.POOL_ACQUIRE_SECONDS.observe(seconds, pool=self.name)
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connects += 1
+        metrics.POOL_CONNECTS.inc(pool=self.name)
+
+    def summary(self) -> str:
+        avg_ms = 1000 * self.wait_seconds / max(self.acquires, 1)
+        return (
+            f"{self.name}: {self.acquires} acquires, {self.connects} new connections, "
+            f"wait avg {avg_ms:.1f} ms max {1000 * self.max_wait_seconds:.1f} ms"
+        )
+
+
+class ConnectionPool:
+    """
+    Small bounded pool: at most max_size connections are open, idle ones
+    are reused, and callers block while all of them are checked out.
+    Works for any DB-API connection; used for pyodbc, which has no pool
+    of its own that survives closing the connection object.
+    """
+
+    def __init__(self, connect: Callable[[], Any], max_size: int, name: str = "pool"):
+        self._connect = connect
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._all: List[Any] = []
+        self.metrics = AcquireMetrics(name)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        started = time.perf_counter()
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                self.metrics.connected()
+                with self._lock:
+                    self._all.append(conn)
+            self.metrics.record(time.perf_counter() - started)
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
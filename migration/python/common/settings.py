@@ -0,0 +1,81 @@
+"""
+Connection settings shared by every migration script.
+
+Resolution order, per value:
+  1. full connection strings from the environment (SRC_SQLSERVER_CONN_STR,
+     TGT_POSTGRES_CONN_STR, KAFKA_BOOTSTRAP), as set by the CI workflow
+  2. individual variables (POSTGRES_HOST, POSTGRES_PASSWORD, ...)
+  3. envs/<env>.yaml, where <env> is the --env argument or $ENVIRONMENT
+  4. the docker-compose defaults of the lab
+"""
+
+import os
+import pathlib
+from typing import Any, Dict, NamedTuple, Optional
+
+import yaml
+
+ENVS_DIR = pathlib.Path(__file__).resolve().parents[3] / "envs"
+
+DEFAULT_PASSWORD = "MigrationLab123!"
+
+
+class ConnectionSettings(NamedTuple):
+    env: str
+    sqlserver_conn: str
+    postgres_conn: str
+    kafka_bootstrap: str
+
+
+def _load_env_file(env: str) -> Dict[str, Any]:
+    path = ENVS_DIR / f"{env}.yaml"
+    if not path.exists():
+        return {}
+    with path.open(encoding="utf-8") as fh:
+        return yaml.safe_load(fh) or {}
+
+
+def _pick(env_var: Optional[str], section: Dict[str, Any], key: str, default: Any) -> str:
+    if env_var and os.environ.get(env_var):
+        return os.environ[env_var]
+    return str(section.get(key, default))
+
+
+def _sqlserver_conn(section: Dict[str, Any]) -> str:
+    if os.environ.get("SRC_SQLSERVER_CONN_STR"):
+        return os.environ["SRC_SQLSERVER_CONN_STR"]
+    host = _pick("SQLSERVER_HOST", section, "host", "localhost")
+    port = _pick("SQLSERVER_PORT", section, "port", 1433)
+    database = _pick("SQLSERVER_DB", section, "database", "AdventureWorksLite")
+    user = _pick("SQLSERVER_USER", section, "user", "sa")
+    password = _pick("SQLSERVER_PASSWORD", section, "password", DEFAULT_PASSWORD)
+    return (
+        "Driver={ODBC Driver 18 for SQL Server};"
+        f"Server={host},{port};Database={database};Uid={user};Pwd={password};"
+        "Encrypt=yes;TrustServerCertificate=yes;"
+    )
+
+
+def _postgres_conn(section: Dict[str, Any]) -> str:
+    if os.environ.get("TGT_POSTGRES_CONN_STR"):
+        return os.environ["TGT_POSTGRES_CONN_STR"].strip()
+    host = _pick("POSTGRES_HOST", section, "host", "localhost")
+    port = _pick("POSTGRES_PORT", section, "port", 5432)
+    dbname = _pick("POSTGRES_DB", section, "dbname", "migration_target")
+    user = _pick("POSTGRES_USER", section, "user", "postgres")
+    password = (
+        os.environ.get("DB_DEV_PASSWORD")
+        or _pick("POSTGRES_PASSWORD", section, "password", DEFAULT_PASSWORD)
+    )
+    return f"host={host} port={port} dbname={dbname} user={user} password={password}"
+
+
+def load_settings(env: Optional[str] = None) -> ConnectionSettings:
+    env = env or os.environ.get("ENVIRONMENT", "dev")
+    conf = _load_env_file(env)
+    return ConnectionSettings(
+        env=env,
+        sqlserver_conn=_sqlserver_conn(conf.get("sqlserver") or {}),
+        postgres_conn=_postgres_conn(conf.get("postgres") or {}),
+        kafka_bootstrap=_pick("KAFKA_BOOTSTRAP", conf.get("kafka") or {}, "bootstrap_servers", "localhost:29092"),
+    )
@@ -5,55 +5,32 @@ Tests connections to all source and target databases
 
 import sys
 from colorama import init, Fore, Style
-import psycopg
-import pyodbc
 #import cx_Oracle
 from kafka import KafkaConsumer
 from kafka.errors import NoBrokersAvailable
 
+from common.connections import connect_postgres, connect_sqlserver
+from common.settings import load_settings
+
 # Initialize colorama for Windows
 init(autoreset=True)
 
-# Connection configurations
-CONNECTIONS = {
-    "postgresql": {
-        "host": "localhost",
-        "port": 5432,
-        "database": "migration_target",
-        "user": "postgres",
-        "password": "MigrationLab123!"
-    },
-    "sqlserver": {
-        "server": "localhost",
-        "port": 1433,
-        "database": "master",
-        "user": "sa",
-        "password": "MigrationLab123!"
-    },
-    # "oracle": {
-    #     "host": "localhost",
-    #     "port": 1521,
-    #     "service": "XEPDB1",
-    #     "user": "system",
-    #     "password": "MigrationLab123!"
-    # },
-    "kafka": {
-        "bootstrap_servers": "localhost:29092"
-    }
-}
+# Connection settings (environment variables or envs/<env>.yaml)
+SETTINGS = load_settings()
+
+# ORACLE = {
+#     "host": "localhost",
+#     "port": 1521,
+#     "service": "XEPDB1",
+#     "user": "system",
+#     "password": "MigrationLab123!"
+# }
 
 
 def test_postgresql():
     """Test PostgreSQL connection"""
     try:
-        config = CONNECTIONS["postgresql"]
-        conn = psycopg.connect(
-            host=config["host"],
-            port=config["port"],
-            dbname=config["database"],
-            user=config["user"],
-            password=config["password"]
-        )
+        conn = connect_postgres(conninfo=SETTINGS.postgres_conn)
         cursor = conn.cursor()
         cursor.execute("SELECT version();")
         version = cursor.fetchone()[0]
@@ -71,16 +48,7 @@ def test_postgresql():
 def test_sqlserver():
     """Test SQL Server connection"""
     try:
-        config = CONNECTIONS["sqlserver"]
-        # Try ODBC Driver 17 for SQL Server
-        conn_string = (
-            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={config['server']},{config['port']};"
-            f"DATABASE={config['database']};"
-            f"UID={config['user']};"
-            f"PWD={config['password']}"
-        )
-        conn = pyodbc.connect(conn_string, timeout=10)
+        conn = connect_sqlserver(conn_str=SETTINGS.sqlserver_conn, timeout=10)
         cursor = conn.cursor()
         cursor.execute("SELECT @@VERSION;")
         version = cursor.fetchone()[0]
@@ -92,14 +60,14 @@ def test_sqlserver():
     except Exception as e:
         print(f"{Fore.RED}✗ SQL Server: Connection failed")
         print(f"  {Style.DIM}Error: {str(e)}")
-        print(f"  {Style.DIM}Tip: Ensure ODBC Driver 17 is installed or container is running")
+        print(f"  {Style.DIM}Tip: Ensure ODBC Driver 18 is installed or container is running")
         return False
 
 
 # def test_oracle():
 #     """Test Oracle connection"""
 #     try:
-#         config = CONNECTIONS["oracle"]
+#         config = ORACLE
 #         dsn = cx_Oracle.makedsn(
 #             config["host"],
 #             config["port"],
@@ -127,16 +95,15 @@ def test_sqlserver():
 def test_kafka():
     """Test Kafka connection"""
     try:
-        config = CONNECTIONS["kafka"]
         # Quick connection test - will fail fast if Kafka is down
         consumer = KafkaConsumer(
-            bootstrap_servers=config["bootstrap_servers"],
+            bootstrap_servers=SETTINGS.kafka_bootstrap,
             consumer_timeout_ms=5000,
             request_timeout_ms=5000
         )
         consumer.close()
         print(f"{Fore.GREEN}✓ Kafka: Connected successfully")
-        print(f"  {Style.DIM}Broker: {config['bootstrap_servers']}")
+        print(f"  {Style.DIM}Broker: {SETTINGS.kafka_bootstrap}")
         return True
     except NoBrokersAvailable:
         print(f"{Fore.RED}✗ Kafka: No brokers available")
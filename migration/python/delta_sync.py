@@ -0,0 +1,289 @@
+"""
+Delta sync: bring a bulk-loaded PostgreSQL target up to date with SQL Server
+
+    python delta_sync.py --workers 4
+    python delta_sync.py --tables Customers Orders --full
+
+Instead of truncating and reloading (bulk_migrate.py), every table is
+synced in place, parents first:
+
+  * tables with a rowversion or ModifiedDate column read only the rows
+    changed since their high-water mark (loader/delta.py), COPY them into
+    a temporary staging table and upsert them; the new mark is committed
+    with the rows
+  * a primary-key hash diff (validation.checks_hash) then finds rows the
+    watermark cannot see: deleted ones, and inserts that never got a
+    ModifiedDate
+  * tables with an integer key but no watermark column are diffed on
+    their full content and only the differing rows up to the table's
+    highest key at the start of the sync are copied
+
+Deletes run last, children first; a row still referenced by a child that
+was not deleted is kept for the next sync. Target keys have to equal source keys:
+the initial load must have used bulk_migrate.py --preserve-ids. Tables
+without a single-column primary key are skipped.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple
+
+import psycopg
+from colorama import Fore, Style, init
+
+import bulk_migrate
+from common import columnar, metrics
+from common.catalog import get_catalog
+from common.connections import connect_sqlserver
+from loader import delta
+from validation import checks_hash
+
+init(autoreset=True)
+
+
+class TableSync(NamedTuple):
+    pair: tuple
+    read: int
+    upserted: int
+    deletes: List[int]
+
+
+def stage_and_upsert(src_cur, tgt_conn, pair, filters, args):
+    """
+    COPY the source rows matching each (WHERE, params) filter into one
+    staging table and upsert it into the target. Returns (rows read, rows
+    inserted or updated); the caller commits.
+    """
+    src_table, tgt_table, src_cols, tgt_cols = pair
+    table = get_catalog().table(src_table)
+    overriding = table.identity is not None and table.identity.target in tgt_cols
+    read = 0
+    with tgt_conn.cursor() as tgt_cur:
+        tgt_cur.execute(delta.create_stage_sql(tgt_table, tgt_cols))
+        for where, params in filters:
+            read += bulk_migrate.load_rows(
+                src_cur, tgt_cur, f"SELECT {', '.join(src_cols)} FROM {src_table} {where}", params,
+                tgt_table, tgt_cols, "copy", args.copy_format, args.batch_size, args.fetch,
+                into=delta.STAGE_TABLE,
+            )
+        with metrics.span("delta.upsert", table=tgt_table):
+            tgt_cur.execute(delta.upsert_sql(tgt_table, tgt_cols, table.pk_tgt, overriding))
+            upserted = tgt_cur.rowcount
+    metrics.ROWS.inc(upserted, phase="delta_upsert", table=tgt_table)
+    return read, upserted
+
+
+def upper_bounds(pairs):
+    """
+    Upper bound of every table, read once before the first wave: the
+    watermark bound, or the highest key of a table with an integer key but
+    no watermark. Children are read before parents, and rowversion tables
+    share one MIN_ACTIVE_ROWVERSION, so no child bound is later than its
+    parents': a child row within it references a parent row within theirs.
+    """
+    uppers = {}
+    rowversion_upper = None
+    src_conn = connect_sqlserver("bulk_load")
+    src_cur = src_conn.cursor()
+    try:
+        for src_table, _, _, _ in reversed(pairs):
+            table = get_catalog().table(src_table)
+            watermark = delta.watermark_for(table)
+            if watermark is None:
+                if table.chunk_key is not None:
+                    src_cur.execute(delta.key_cutoff_sql(src_table, table.pk_src))
+                    (uppers[src_table],) = src_cur.fetchone()
+                continue
+            if watermark.rowversion and rowversion_upper is not None:
+                uppers[src_table] = rowversion_upper
+                continue
+            src_cur.execute(delta.upper_bound_sql(src_table, watermark))
+            (uppers[src_table],) = src_cur.fetchone()
+            if watermark.rowversion:
+                rowversion_upper = uppers[src_table]
+    finally:
+        src_cur.close()
+        src_conn.close()
+    return uppers
+
+
+def sync_table(pair, store, upper, args):
+    """
+    Upsert one table's changed and missing rows, up to its upper bound, on
+    its own connections and return the keys to delete (deleted later,
+    children first).
+    """
+    src_table, tgt_table, _, _ = pair
+    table = get_catalog().table(src_table)
+    watermark = delta.watermark_for(table)
+    read = upserted = 0
+    deletes = []
+
+    src_conn = connect_sqlserver("bulk_load")
+    src_cur = src_conn.cursor()
+    tgt_conn = psycopg.connect(**bulk_migrate.TARGET_CONN)
+    try:
+        if watermark is not None:
+            mark = None if args.full else store.get(src_table, watermark)
+            read, upserted = stage_and_upsert(
+                src_cur, tgt_conn, pair, [delta.changed_rows_filter(watermark, mark, upper)], args,
+            )
+            if upper is not None:
+                store.set(tgt_conn, src_table, watermark, upper, read)
+            tgt_conn.commit()
+
+        if table.chunk_key is None:
+            print(f"  {Fore.YELLOW}{src_table}: no integer key, deletes not detected{Style.RESET_ALL}")
+        else:
+            with metrics.span("delta.diff", table=tgt_table):
+                if watermark is not None:
+                    diffs = checks_hash.diff_keys_on(src_conn, tgt_conn, src_table, args.bucket_size, args.leaf_rows)
+                else:
+                    diffs = checks_hash.diff_table_on(src_conn, tgt_conn, src_table, args.bucket_size, args.leaf_rows)
+            tgt_conn.rollback()
+            deletes = [d.pk for d in diffs if d.kind == "missing_in_source"]
+            copy_keys = [d.pk for d in diffs if d.kind != "missing_in_source"]
+            if copy_keys:
+                # Rows past the upper bound (e.g. inserted since) wait for
+                # the next sync, with the parents they may reference
+                if watermark is not None:
+                    bound = delta.upper_bound_filter(watermark, upper)
+                else:
+                    bound = delta.key_cutoff_filter(table.pk_src, upper)
+                filters = [delta.keys_filter(table.pk_src, keys, bound) for keys in delta.key_batches(copy_keys)]
+                more_read, more_upserted = stage_and_upsert(src_cur, tgt_conn, pair, filters, args)
+                tgt_conn.commit()
+                read += more_read
+                upserted += more_upserted
+    except Exception:
+        tgt_conn.rollback()
+        raise
+    finally:
+        src_cur.close()
+        src_conn.close()
+        tgt_conn.close()
+
+    print(
+        f"  {Fore.GREEN}{src_table}: {read} rows read, {upserted} upserted, "
+        f"{len(deletes)} to delete{Style.RESET_ALL}"
+    )
+    return TableSync(pair, read, upserted, deletes)
+
+
+def delete_keys(tgt_conn, tgt_table, pk, keys):
+    """
+    Delete keys from tgt_table and return the number deleted. Rows still
+    referenced by a child row whose delete was not seen (its table has no
+    integer key, or is not in --tables) are kept for a later sync instead
+    of failing the rest.
+    """
+    sql = f"DELETE FROM {tgt_table} WHERE {pk} = ANY(%s)"
+    try:
+        with tgt_conn.transaction():
+            return tgt_conn.execute(sql, (keys,)).rowcount
+    except psycopg.errors.ForeignKeyViolation:
+        pass
+    deleted = kept = 0
+    for key in keys:
+        try:
+            with tgt_conn.transaction():
+                deleted += tgt_conn.execute(sql, ([key],)).rowcount
+        except psycopg.errors.ForeignKeyViolation:
+            kept += 1
+    print(f"  {Fore.YELLOW}{tgt_table}: {kept} rows still referenced, kept{Style.RESET_ALL}")
+    return deleted
+
+
+def delete_rows(results):
+    """
+    Delete rows gone from the source, children before parents, in one
+    transaction.
+    """
+    total = 0
+    with psycopg.connect(**bulk_migrate.TARGET_CONN) as tgt_conn, tgt_conn.transaction():
+        # delete_keys' transaction blocks are savepoints within this one
+        for result in results:
+            if not result.deletes:
+                continue
+            src_table, tgt_table, _, _ = result.pair
+            with metrics.span("delta.delete", table=tgt_table):
+                deleted = delete_keys(tgt_conn, tgt_table, get_catalog().table(src_table).pk_tgt, result.deletes)
+            metrics.ROWS.inc(deleted, phase="delta_delete", table=tgt_table)
+            print(f"  {tgt_table}: {deleted} rows deleted")
+            total += deleted
+    return total
+
+
+def sync(args):
+    if args.fetch == "arrow" and not columnar.available():
+        print(f"{Fore.YELLOW}arrow-odbc/pyarrow not installed, fetching rows with pyodbc{Style.RESET_ALL}")
+        args.fetch = "rows"
+
+    pairs = []
+    for pair in bulk_migrate.table_pairs(preserve_ids=True):
+        if args.tables and pair[0] not in args.tables:
+            continue
+        if get_catalog().table(pair[0]).pk is None:
+            print(f"{Fore.YELLOW}{pair[0]}: no single-column primary key, skipped{Style.RESET_ALL}")
+            continue
+        pairs.append(pair)
+
+    store = delta.WatermarkStore(bulk_migrate.TARGET_CONN)
+    store.setup()
+
+    waves = bulk_migrate.load_waves(pairs)
+    uppers = upper_bounds(pairs)
+    results = []
+    with bulk_migrate.phase("upsert"), ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for wave in waves:
+            print(f"{Fore.CYAN}Syncing {', '.join(pair[0] for pair in wave)}{Style.RESET_ALL}")
+            results.append(list(pool.map(lambda pair: sync_table(pair, store, uppers.get(pair[0]), args), wave)))
+
+    with bulk_migrate.phase("delete"):
+        deleted = delete_rows([result for wave in reversed(results) for result in wave])
+    with bulk_migrate.phase("resync identities"):
+        bulk_migrate.resync_identities(pairs)
+    upserted = sum(result.upserted for wave in results for result in wave)
+    return upserted, deleted
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental sync SQL Server -> PostgreSQL")
+    parser.add_argument("--tables", nargs="+", help="source tables to sync (default: every catalog table)")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="ignore the stored watermarks and re-read every row (unchanged rows are still not written)",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="tables synced at a time")
+    parser.add_argument("--copy-format", choices=["text", "binary"], default="text")
+    parser.add_argument("--fetch", choices=["rows", "arrow"], default="rows")
+    parser.add_argument("--batch-size", type=int, default=bulk_migrate.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--bucket-size", type=int, default=100000, help="key values per hash bucket of the diff")
+    parser.add_argument("--leaf-rows", type=int, default=1000, help="bucket size at which the diff compares rows")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.start_from_env()
+
+    started = time.perf_counter()
+    try:
+        upserted, deleted = sync(args)
+        print(
+            f"\n{Fore.GREEN}Delta sync completed in {time.perf_counter() - started:.1f}s: "
+            f"{upserted} rows upserted, {deleted} deleted{Style.RESET_ALL}"
+        )
+    except Exception as exc:
+        print(f"{Fore.RED}Delta sync failed: {exc}{Style.RESET_ALL}")
+        raise
+    finally:
+        metrics.flush()
+        for line in metrics.span_summary():
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
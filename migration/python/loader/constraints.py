@@ -0,0 +1,163 @@
+"""
+Drop secondary indexes and FK constraints before a bulk load and rebuild
+them afterwards.
+
+Primary keys stay in place (chunking and upserts rely on them). Everything
+else found in the catalog for the loaded tables -- UNIQUE constraints,
+plain indexes and foreign keys -- is saved to a control table, dropped,
+and recreated after the load: indexes in parallel, FKs as NOT VALID
+followed by VALIDATE CONSTRAINT.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple
+
+import psycopg
+
+DEFERRED_TABLE = "migration_control.deferred_constraints"
+
+
+class DeferredObject(NamedTuple):
+    kind: str  # "foreign_key", "unique" or "index"
+    table_name: str
+    name: str
+    definition: str
+
+    def drop_sql(self) -> str:
+        if self.kind == "index":
+            schema = self.table_name.split(".")[0]
+            return f"DROP INDEX IF EXISTS {schema}.{self.name}"
+        return f"ALTER TABLE {self.table_name} DROP CONSTRAINT IF EXISTS {self.name}"
+
+    def create_sql(self) -> str:
+        if self.kind == "index":
+            return self.definition
+        if self.kind == "foreign_key":
+            return f"ALTER TABLE {self.table_name} ADD CONSTRAINT {self.name} {self.definition} NOT VALID"
+        return f"ALTER TABLE {self.table_name} ADD CONSTRAINT {self.name} {self.definition}"
+
+
+_CAPTURE_SQL = """
+    SELECT CASE c.contype WHEN 'f' THEN 'foreign_key' ELSE 'unique' END,
+           c.conrelid::regclass::text,
+           c.conname,
+           pg_get_constraintdef(c.oid)
+    FROM pg_constraint c
+    WHERE c.conrelid = ANY(%(tables)s::regclass[])
+      AND c.contype IN ('f', 'u')
+    UNION ALL
+    SELECT 'index',
+           i.indrelid::regclass::text,
+           ic.relname,
+           pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    WHERE i.indrelid = ANY(%(tables)s::regclass[])
+      AND NOT i.indisprimary
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+"""
+
+# FKs go first on drop (they depend on the unique/PK indexes) and last on create.
+_DROP_ORDER = {"foreign_key": 0, "unique": 1, "index": 2}
+
+
+def _setup(conn: psycopg.Connection) -> None:
+    conn.execute("CREATE SCHEMA IF NOT EXISTS migration_control")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DEFERRED_TABLE} (
+            kind       TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            name       TEXT NOT NULL,
+            definition TEXT NOT NULL,
+            PRIMARY KEY (table_name, name)
+        )
+    """)
+
+
+def pending(conn_params: dict) -> List[DeferredObject]:
+    """
+    Objects dropped by an earlier run that were never rebuilt.
+    """
+    with psycopg.connect(**conn_params) as conn:
+        _setup(conn)
+        rows = conn.execute(f"SELECT kind, table_name, name, definition FROM {DEFERRED_TABLE}").fetchall()
+    return [DeferredObject(*row) for row in rows]
+
+
+def drop_deferred(conn_params: dict, tables: Iterable[str]) -> List[DeferredObject]:
+    """
+    Save and drop the FKs and secondary indexes of `tables` in one
+    transaction. If a previous run already dropped them (and crashed before
+    rebuilding), the saved definitions are returned instead.
+    """
+    saved = pending(conn_params)
+    if saved:
+        return saved
+
+    with psycopg.connect(**conn_params) as conn:
+        objs = [DeferredObject(*row) for row in conn.execute(_CAPTURE_SQL, {"tables": list(tables)}).fetchall()]
+        objs.sort(key=lambda o: _DROP_ORDER[o.kind])
+        with conn.cursor() as cur:
+            cur.executemany(
+                f"INSERT INTO {DEFERRED_TABLE} (kind, table_name, name, definition) VALUES (%s, %s, %s, %s)",
+                objs,
+            )
+            for obj in objs:
+                cur.execute(obj.drop_sql())
+    return objs
+
+
+def _run(conn_params: dict, statements: List[str]) -> None:
+    with psycopg.connect(**conn_params, autocommit=True) as conn:
+        for sql in statements:
+            conn.execute(sql)
+
+
+def _run_parallel(conn_params: dict, jobs: List[List[str]], workers: int) -> None:
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        for future in [pool.submit(_run, conn_params, statements) for statements in jobs]:
+            future.result()
+
+
+def rebuild_indexes(conn_params: dict, objs: List[DeferredObject], workers: int) -> None:
+    """
+    Recreate UNIQUE constraints and plain indexes, one connection each.
+    Each object is dropped first so a rebuild interrupted halfway can rerun.
+    """
+    _run_parallel(
+        conn_params,
+        [[o.drop_sql(), o.create_sql()] for o in objs if o.kind != "foreign_key"],
+        workers,
+    )
+
+
+def rebuild_foreign_keys(conn_params: dict, objs: List[DeferredObject], workers: int) -> None:
+    """
+    Add FKs as NOT VALID (metadata only, brief lock), then validate them in
+    parallel; VALIDATE only takes SHARE UPDATE EXCLUSIVE so reads and writes
+    continue meanwhile.
+    """
+    fks = [o for o in objs if o.kind == "foreign_key"]
+    with psycopg.connect(**conn_params) as conn:
+        for fk in fks:
+            conn.execute(fk.drop_sql())
+            conn.execute(fk.create_sql())
+    _run_parallel(
+        conn_params,
+        [[f"ALTER TABLE {fk.table_name} VALIDATE CONSTRAINT {fk.name}"] for fk in fks],
+        workers,
+    )
+
+
+def analyze(conn_params: dict, tables: Iterable[str], workers: int) -> None:
+    _run_parallel(conn_params, [[f"ANALYZE {t}"] for t in tables], workers)
+
+
+def forget(conn_params: dict) -> None:
+    """
+    Clear the saved definitions once everything has been rebuilt.
+    """
+    with psycopg.connect(**conn_params) as conn:
+        conn.execute(f"DELETE FROM {DEFERRED_TABLE}")
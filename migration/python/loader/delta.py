@@ -0,0 +1,213 @@
+"""
+Watermarks and SQL for incremental (delta) syncs after a bulk load.
+
+Each table with a rowversion column, or a ModifiedDate-style datetime
+column, keeps a high-water mark on the target. A sync reads only the
+source rows past the mark, COPYs them into a temporary staging table and
+upserts them, moving the mark in the same transaction:
+
+    rowversion   [rv] >= mark AND [rv] < MIN_ACTIVE_ROWVERSION()
+                 exact: every committed change is read once
+    datetime     [ModifiedDate] > mark - DATETIME_OVERLAP AND <= MAX(ModifiedDate)
+                 re-reads a short overlap for transactions that committed
+                 late; upserts are idempotent, so that costs nothing else
+
+Marks are stored as text: 0x-prefixed hex for rowversion, ISO 8601
+(style 121) for datetimes. A mark recorded for a different column than
+the table's current watermark column is ignored, i.e. the table starts
+over. Neither watermark sees deletes; delta_sync.py finds those with a
+primary-key hash diff.
+"""
+
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import psycopg
+
+from common.catalog import TableMapping
+
+WATERMARK_TABLE = "migration_control.delta_watermarks"
+
+# Datetime columns used as a watermark, in order of preference, when the
+# table has no rowversion column
+WATERMARK_COLUMNS = ("ModifiedDate",)
+ROWVERSION_TYPES = ("timestamp", "rowversion")
+DATETIME_OVERLAP_SECONDS = 300
+
+# SQL Server takes at most 2100 parameters per statement
+KEYS_PER_SELECT = 1000
+
+STAGE_TABLE = "delta_stage"
+
+
+class Watermark(NamedTuple):
+    column: str
+    rowversion: bool
+
+
+def watermark_for(table: TableMapping) -> Optional[Watermark]:
+    """
+    The table's rowversion column if it has one, else the first
+    WATERMARK_COLUMNS datetime column, else None.
+    """
+    for c in table.columns:
+        if c.source_type.lower() in ROWVERSION_TYPES:
+            return Watermark(c.source, True)
+    for name in WATERMARK_COLUMNS:
+        column = next((c for c in table.columns if c.source.lower() == name.lower()), None)
+        if column is not None and column.kind == "datetime":
+            return Watermark(column.source, False)
+    return None
+
+
+def upper_bound_sql(src_table: str, watermark: Watermark) -> str:
+    """
+    SELECT returning the exclusive (rowversion) or inclusive (datetime)
+    upper bound of this sync, as mark text. Taken for every table before
+    any rows are read, so changes made during the sync are left to the
+    next one and a child never reads rows newer than its parents' bound.
+    """
+    if watermark.rowversion:
+        # Anything below MIN_ACTIVE_ROWVERSION is committed: no gaps
+        return "SELECT CONVERT(VARCHAR(18), CAST(MIN_ACTIVE_ROWVERSION() AS BINARY(8)), 1)"
+    return f"SELECT CONVERT(VARCHAR(23), MAX([{watermark.column}]), 121) FROM {src_table}"
+
+
+def changed_rows_filter(watermark: Watermark, mark: Optional[str], upper: Optional[str]) -> Tuple[str, tuple]:
+    """
+    (WHERE clause with ? placeholders, parameters) selecting the rows
+    changed since mark, up to upper. mark None means a first sync.
+    """
+    col = f"[{watermark.column}]"
+    if watermark.rowversion:
+        bound = f"{col} < CONVERT(BINARY(8), ?, 1)"
+        if mark is None:
+            return f"WHERE {bound}", (upper,)
+        return f"WHERE {col} >= CONVERT(BINARY(8), ?, 1) AND {bound}", (mark, upper)
+
+    if upper is None:
+        # No dated rows at all: only a first sync has anything to read
+        return f"WHERE {col} IS NULL" if mark is None else "WHERE 1 = 0", ()
+    bound = f"{col} <= CONVERT(DATETIME2, ?, 121)"
+    if mark is None:
+        return f"WHERE ({bound} OR {col} IS NULL)", (upper,)
+    lower = f"{col} > DATEADD(SECOND, -{DATETIME_OVERLAP_SECONDS}, CONVERT(DATETIME2, ?, 121))"
+    return f"WHERE {lower} AND {bound}", (mark, upper)
+
+
+def create_stage_sql(tgt_table: str, tgt_cols: Sequence[str]) -> str:
+    # Same column types, none of the constraints, identities or indexes;
+    # gone at commit
+    return (
+        f"CREATE TEMP TABLE {STAGE_TABLE} ON COMMIT DROP AS "
+        f"SELECT {', '.join(tgt_cols)} FROM {tgt_table} WITH NO DATA"
+    )
+
+
+def upsert_sql(tgt_table: str, tgt_cols: Sequence[str], pk: str, overriding: bool = False) -> str:
+    """
+    Merge the staging table into tgt_table on its primary key. Rows equal
+    to the target are skipped, so re-reading unchanged rows writes nothing.
+    """
+    col_list = ", ".join(tgt_cols)
+    rest = [c for c in tgt_cols if c != pk]
+    override = " OVERRIDING SYSTEM VALUE" if overriding else ""
+    sql = (
+        f"INSERT INTO {tgt_table} AS t ({col_list}){override} "
+        f"SELECT {col_list} FROM {STAGE_TABLE} ON CONFLICT ({pk}) "
+    )
+    if not rest:
+        return sql + "DO NOTHING"
+    assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in rest)
+    old = ", ".join(f"t.{c}" for c in rest)
+    new = ", ".join(f"EXCLUDED.{c}" for c in rest)
+    return sql + f"DO UPDATE SET {assignments} WHERE ROW({old}) IS DISTINCT FROM ROW({new})"
+
+
+def key_batches(keys: Sequence[int], size: int = KEYS_PER_SELECT) -> Iterator[List[int]]:
+    keys = sorted(keys)
+    for start in range(0, len(keys), size):
+        yield keys[start:start + size]
+
+
+def upper_bound_filter(watermark: Watermark, upper: Optional[str]) -> Tuple[str, tuple]:
+    """
+    (condition, parameters) keeping only rows within this sync's upper
+    bound, for rows found by the key diff.
+    """
+    col = f"[{watermark.column}]"
+    if watermark.rowversion:
+        return f"{col} < CONVERT(BINARY(8), ?, 1)", (upper,)
+    if upper is None:
+        return f"{col} IS NULL", ()
+    return f"({col} <= CONVERT(DATETIME2, ?, 121) OR {col} IS NULL)", (upper,)
+
+
+def key_cutoff_sql(src_table: str, pk: str) -> str:
+    """
+    SELECT returning the highest key of a table without a watermark: rows
+    inserted after it are left to the next sync, like rows past an upper
+    bound. Updates of existing rows are not bounded.
+    """
+    return f"SELECT MAX([{pk}]) FROM {src_table}"
+
+
+def key_cutoff_filter(pk: str, cutoff: Optional[int]) -> Tuple[str, tuple]:
+    # None: the table was empty when the cutoff was read
+    if cutoff is None:
+        return "1 = 0", ()
+    return f"[{pk}] <= ?", (cutoff,)
+
+
+def keys_filter(pk: str, keys: Sequence[int], bound: Optional[Tuple[str, tuple]] = None) -> Tuple[str, tuple]:
+    where = f"WHERE [{pk}] IN ({', '.join('?' * len(keys))})"
+    if bound is None:
+        return where, tuple(keys)
+    return f"{where} AND {bound[0]}", tuple(keys) + bound[1]
+
+
+class WatermarkStore:
+    """
+    Marks kept in a control table on the target, next to the chunk ledger.
+    set() is called on the sync's own connection before its commit, so the
+    rows and the mark they reach are committed together.
+    """
+
+    def __init__(self, conn_params: dict):
+        self._conn_params = conn_params
+
+    def setup(self) -> None:
+        with psycopg.connect(**self._conn_params) as conn:
+            conn.execute("CREATE SCHEMA IF NOT EXISTS migration_control")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+                    src_table   TEXT        PRIMARY KEY,
+                    column_name TEXT        NOT NULL,
+                    mark        TEXT        NOT NULL,
+                    row_count   BIGINT      NOT NULL,
+                    synced_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+
+    def get(self, src_table: str, watermark: Watermark) -> Optional[str]:
+        with psycopg.connect(**self._conn_params) as conn:
+            row = conn.execute(
+                f"SELECT column_name, mark FROM {WATERMARK_TABLE} WHERE src_table = %s", (src_table,),
+            ).fetchone()
+        if row is None or row[0] != watermark.column:
+            return None
+        return row[1]
+
+    def set(self, tgt_conn: psycopg.Connection, src_table: str, watermark: Watermark, mark: str, rows: int) -> None:
+        tgt_conn.execute(
+            f"""
+            INSERT INTO {WATERMARK_TABLE} (src_table, column_name, mark, row_count) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (src_table) DO UPDATE
+            SET column_name = EXCLUDED.column_name, mark = EXCLUDED.mark,
+                row_count = EXCLUDED.row_count, synced_at = now()
+            """,
+            (src_table, watermark.column, mark, rows),
+        )
+
+    def clear(self, src_tables: Sequence[str]) -> None:
+        with psycopg.connect(**self._conn_params) as conn:
+            conn.execute(f"DELETE FROM {WATERMARK_TABLE} WHERE src_table = ANY(%s)", (list(src_tables),))
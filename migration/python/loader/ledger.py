@@ -0,0 +1,135 @@
+"""
+Chunk ledger for resumable bulk loads.
+
+Every completed key-range chunk is recorded per source table. A restarted
+load asks the ledger which chunks are already done and skips them.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import psycopg
+
+LEDGER_TABLE = "migration_control.bulk_load_chunks"
+
+ChunkRange = Tuple[Optional[int], Optional[int]]
+
+# Stored bounds of a whole-table chunk (lo and hi None: an empty table or
+# one without an integer key). No planned key range is empty like this one.
+WHOLE_TABLE = (0, -1)
+
+
+def _stored(lo: Optional[int], hi: Optional[int]) -> Tuple[int, int]:
+    return WHOLE_TABLE if lo is None else (lo, hi)
+
+
+def _planned(lo: int, hi: int) -> ChunkRange:
+    return (None, None) if (lo, hi) == WHOLE_TABLE else (lo, hi)
+
+
+class PostgresChunkLedger:
+    """
+    Ledger kept in a control table on the target. The ledger row is written
+    in the same transaction as the chunk data, so a chunk is either loaded
+    and recorded or neither.
+    """
+
+    transactional = True
+
+    def __init__(self, conn_params: dict):
+        self._conn_params = conn_params
+
+    def setup(self) -> None:
+        with psycopg.connect(**self._conn_params) as conn:
+            conn.execute("CREATE SCHEMA IF NOT EXISTS migration_control")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+                    src_table    TEXT        NOT NULL,
+                    chunk_lo     BIGINT      NOT NULL,
+                    chunk_hi     BIGINT      NOT NULL,
+                    row_count    BIGINT      NOT NULL,
+                    completed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    PRIMARY KEY (src_table, chunk_lo)
+                )
+            """)
+
+    def completed(self) -> Dict[str, Set[ChunkRange]]:
+        done: Dict[str, Set[ChunkRange]] = {}
+        with psycopg.connect(**self._conn_params) as conn:
+            rows = conn.execute(f"SELECT src_table, chunk_lo, chunk_hi FROM {LEDGER_TABLE}").fetchall()
+        for src_table, lo, hi in rows:
+            done.setdefault(src_table, set()).add(_planned(lo, hi))
+        return done
+
+    def record(
+        self, tgt_conn: psycopg.Connection, src_table: str, lo: Optional[int], hi: Optional[int], rows: int,
+    ) -> None:
+        tgt_conn.execute(
+            f"INSERT INTO {LEDGER_TABLE} (src_table, chunk_lo, chunk_hi, row_count) VALUES (%s, %s, %s, %s)",
+            (src_table, *_stored(lo, hi), rows),
+        )
+
+    def clear(self, src_tables: Iterable[str]) -> None:
+        with psycopg.connect(**self._conn_params) as conn:
+            conn.execute(f"DELETE FROM {LEDGER_TABLE} WHERE src_table = ANY(%s)", (list(src_tables),))
+
+
+class SqliteChunkLedger:
+    """
+    Ledger kept in a local SQLite file. It is written after the target
+    commit, so a crash between the two can reload (and duplicate) the
+    last chunk; prefer the Postgres ledger when that matters.
+    """
+
+    transactional = False
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+    def setup(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bulk_load_chunks (
+                    src_table    TEXT    NOT NULL,
+                    chunk_lo     INTEGER NOT NULL,
+                    chunk_hi     INTEGER NOT NULL,
+                    row_count    INTEGER NOT NULL,
+                    completed_at TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (src_table, chunk_lo)
+                )
+            """)
+
+    def completed(self) -> Dict[str, Set[ChunkRange]]:
+        done: Dict[str, Set[ChunkRange]] = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT src_table, chunk_lo, chunk_hi FROM bulk_load_chunks").fetchall()
+        for src_table, lo, hi in rows:
+            done.setdefault(src_table, set()).add(_planned(lo, hi))
+        return done
+
+    def record(self, tgt_conn, src_table: str, lo: Optional[int], hi: Optional[int], rows: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO bulk_load_chunks (src_table, chunk_lo, chunk_hi, row_count) VALUES (?, ?, ?, ?)",
+                (src_table, *_stored(lo, hi), rows),
+            )
+
+    def clear(self, src_tables: Iterable[str]) -> None:
+        tables = list(src_tables)
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM bulk_load_chunks WHERE src_table = ?", [(t,) for t in tables])
+
+
+def high_water_mark(planned: Iterable[ChunkRange], done: Set[ChunkRange]):
+    """
+    Upper key of the contiguous run of completed chunks from the start of
+    the plan, or None when the first chunk is not done yet.
+    """
+    mark = None
+    for lo, hi in sorted(planned):
+        if (lo, hi) not in done:
+            break
+        mark = hi
+    return mark
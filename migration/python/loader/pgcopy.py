@@ -0,0 +1,135 @@
+"""
+Binary COPY row encoding for the bulk loader.
+
+The column types of a target table are resolved once (from the catalog,
+or pg_attribute for types psycopg does not know by name) and every batch
+is encoded with psycopg's C dumpers straight into one COPY BINARY buffer:
+no per-row tuple copy, no per-value dumper lookup, and one copy.write()
+per batch instead of a write_row() call per row.
+
+    encoder = RowEncoder(type_oids(tgt_cur, tgt_table, tgt_cols))
+    with tgt_cur.copy(f"COPY {tgt_table} ({cols}) FROM STDIN (FORMAT BINARY)") as copy:
+        copy.write(encoder.header())
+        for rows in batches:
+            copy.write(encoder.encode(rows))
+        copy.write(encoder.trailer())
+
+format_row_binary is psycopg's internal tuple encoder (the one COPY uses
+itself), not public API: requirements.txt keeps psycopg to the minor
+versions it is known in, and without it available() is False and callers
+fall back to copy.set_types() + write_row().
+"""
+
+import struct
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from psycopg import pq
+from psycopg.abc import AdaptContext
+from psycopg.adapt import Transformer
+from psycopg.postgres import types as pg_types
+
+from common.catalog import get_catalog
+
+try:
+    from psycopg._copy_base import format_row_binary
+except ImportError:  # private: moved or renamed in a future psycopg
+    format_row_binary = None
+
+# PGCOPY signature, flags field, header extension length.
+HEADER = b"PGCOPY\n\xff\r\n\0" + struct.pack("!ii", 0, 0)
+TRAILER = struct.pack("!h", -1)
+
+_oid_lock = threading.Lock()
+_oid_cache: Dict[Tuple[str, Tuple[str, ...]], List[int]] = {}
+
+
+def _catalog_oids(tgt_table: str, tgt_cols: Sequence[str]) -> Optional[List[int]]:
+    # information_schema data types ("timestamp without time zone",
+    # "character varying") are also psycopg's type names; arrays, domains
+    # and user-defined types are not.
+    try:
+        table = get_catalog().by_target(tgt_table)
+    except KeyError:
+        return None
+    target_types = {c.target: c.target_type for c in table.columns}
+    oids = []
+    for column in tgt_cols:
+        info = pg_types.get(target_types.get(column, ""))
+        if info is None:
+            return None
+        oids.append(info.oid)
+    return oids
+
+
+def _attribute_oids(tgt_cur, tgt_table: str, tgt_cols: Sequence[str]) -> List[int]:
+    tgt_cur.execute(
+        """
+        SELECT attname, atttypid
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass
+          AND attnum > 0
+          AND NOT attisdropped
+        """,
+        (tgt_table,),
+    )
+    oids = dict(tgt_cur.fetchall())
+    return [oids[c] for c in tgt_cols]
+
+
+def available() -> bool:
+    return format_row_binary is not None
+
+
+def type_oids(tgt_cur, tgt_table: str, tgt_cols: Sequence[str]) -> List[int]:
+    """
+    Target type OIDs of tgt_cols, resolved once per table and column list.
+    Binary COPY needs the exact types: the Python-side dumpers would
+    otherwise pick e.g. int8 for an INTEGER column.
+    """
+    key = (tgt_table, tuple(tgt_cols))
+    with _oid_lock:
+        oids = _oid_cache.get(key)
+    if oids is None:
+        oids = _catalog_oids(tgt_table, tgt_cols) or _attribute_oids(tgt_cur, tgt_table, tgt_cols)
+        with _oid_lock:
+            _oid_cache[key] = oids
+    return oids
+
+
+class RowEncoder:
+    """
+    Encodes row sequences (pyodbc Rows included) as COPY BINARY tuples.
+
+    Dumpers are fixed up front for the target types, so MONEY Decimals go
+    through the numeric dumper, DATETIMEs through timestamp and NVARCHAR
+    strings through varchar without being inspected per value. A
+    Transformer caches state, so an encoder belongs to one thread; they
+    are cheap to build once the OIDs are known.
+    """
+
+    def __init__(self, oids: Sequence[int], context: Optional[AdaptContext] = None):
+        if not available():
+            raise RuntimeError("This psycopg version has no binary COPY row encoder; check pgcopy.available()")
+        self.oids = list(oids)
+        self._tx = Transformer(context)
+        self._tx.set_dumper_types(self.oids, pq.Format.BINARY)
+
+    @staticmethod
+    def header() -> bytes:
+        return HEADER
+
+    @staticmethod
+    def trailer() -> bytes:
+        return TRAILER
+
+    def encode(self, rows, out: Optional[bytearray] = None) -> bytearray:
+        """
+        Append the tuples for rows to out (a new buffer by default).
+        """
+        if out is None:
+            out = bytearray()
+        tx = self._tx
+        for row in rows:
+            format_row_binary(row, tx, out)
+        return out
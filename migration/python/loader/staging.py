@@ -0,0 +1,262 @@
+"""
+Staging files for a decoupled extract and load.
+
+The extract writes every key-range chunk of every table to its own
+compressed Parquet or Arrow IPC file under a stage root: a local directory
+or s3://bucket/prefix (LocalStack in the lab). The load reads the files
+back memory-mapped and COPYs them without touching SQL Server, so both
+sides scale on their own and a reload does not re-read the source.
+
+    <root>/manifest.json
+    <root>/<source table>/<chunk index>.parquet   (or .arrow)
+
+manifest.json lists the tables parents first, their columns and their
+chunk files. It is written last: a root without one holds an unfinished
+extract.
+"""
+
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: staging needs it, the row loader does not
+    pa = None
+
+MANIFEST = "manifest.json"
+# Bumped whenever the manifest layout changes
+MANIFEST_VERSION = 1
+
+FORMATS = {"parquet": ".parquet", "ipc": ".arrow"}
+COMPRESSION = "zstd"
+
+# S3 multipart upload: parts of this size, uploaded this many at a time
+MULTIPART_CHUNK_SIZE = 16 * 1024 * 1024
+MULTIPART_CONCURRENCY = 4
+
+# Arrow types for pyodbc values, by SQL Server data type. arrow-odbc picks
+# its own from the result set metadata; these only apply to the row path.
+# Types not listed are inferred from the first batch of a chunk.
+SOURCE_ARROW_TYPES = {
+    "int": lambda: pa.int32(),
+    "bigint": lambda: pa.int64(),
+    "smallint": lambda: pa.int16(),
+    "tinyint": lambda: pa.int16(),
+    "bit": lambda: pa.bool_(),
+    "money": lambda: pa.decimal128(19, 4),
+    "smallmoney": lambda: pa.decimal128(10, 4),
+    "datetime": lambda: pa.timestamp("ms"),
+    "smalldatetime": lambda: pa.timestamp("s"),
+    "datetime2": lambda: pa.timestamp("us"),
+    "date": lambda: pa.date32(),
+    "char": lambda: pa.string(),
+    "varchar": lambda: pa.string(),
+    "nchar": lambda: pa.string(),
+    "nvarchar": lambda: pa.string(),
+}
+
+
+class StagedChunk(NamedTuple):
+    index: int
+    lo: Optional[int]
+    hi: Optional[int]
+    # relative to the stage root; None for a chunk without rows
+    file: Optional[str]
+    rows: int
+    bytes: int
+
+
+def require_arrow() -> None:
+    if pa is None:
+        raise RuntimeError("Staging needs the pyarrow package")
+
+
+def chunk_file(src_table: str, index: int, fmt: str) -> str:
+    return f"{src_table}/{index:05d}{FORMATS[fmt]}"
+
+
+def source_arrow_types(source_types: Sequence[str]) -> List[Optional["pa.DataType"]]:
+    return [SOURCE_ARROW_TYPES[t]() if t in SOURCE_ARROW_TYPES else None for t in source_types]
+
+
+def batches_from_rows(batches: Iterable[Sequence[Sequence[Any]]], types: Sequence[Optional["pa.DataType"]]):
+    """
+    Turn batches of pyodbc rows into RecordBatches, column by column. The
+    schema is fixed by the first batch so every batch of a file matches.
+    """
+    schema = None
+    for rows in batches:
+        columns = list(zip(*rows))
+        if schema is None:
+            arrays = [pa.array(values, type=t) for values, t in zip(columns, types)]
+            schema = pa.schema([pa.field(f"c{n}", a.type) for n, a in enumerate(arrays)])
+        else:
+            arrays = [pa.array(values, type=f.type) for values, f in zip(columns, schema)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_chunk(path: pathlib.Path, batches: Iterable["pa.RecordBatch"], fmt: str) -> Tuple[int, int]:
+    """
+    Write batches to one file as they arrive, so memory stays at one batch.
+    Returns (rows, file bytes); no file is created when there are no rows.
+    """
+    writer = None
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(str(path), batch.schema, compression=COMPRESSION)
+                else:
+                    options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+                    writer = pa.ipc.new_file(str(path), batch.schema, options=options)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, path.stat().st_size if writer is not None else 0
+
+
+def read_chunk(path: pathlib.Path, fmt: str, batch_size: int) -> Iterator["pa.RecordBatch"]:
+    """
+    Record batches of a staged file, memory-mapped rather than read in.
+    """
+    if fmt == "parquet":
+        yield from pq.ParquetFile(str(path), memory_map=True).iter_batches(batch_size=batch_size)
+        return
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        for n in range(reader.num_record_batches):
+            yield reader.get_batch(n)
+
+
+class StageRoot:
+    """
+    Where the staged files live. For s3:// roots files are written to and
+    read from cache_dir and moved with (multipart) transfers; for local
+    roots the cache is the root itself.
+    """
+
+    def __init__(self, url: str, cache_dir: Optional[str] = None):
+        self.url = url
+        self.is_s3 = url.startswith("s3://")
+        if self.is_s3:
+            self.bucket, _, prefix = url[len("s3://"):].partition("/")
+            self.prefix = prefix.strip("/")
+            self.local = pathlib.Path(cache_dir or tempfile.mkdtemp(prefix="migration-stage-"))
+            self._s3 = None
+            self._lock = threading.Lock()
+        else:
+            self.local = pathlib.Path(url)
+
+    def _client(self):
+        # boto3 clients are thread-safe once created; creating one is not.
+        with self._lock:
+            if self._s3 is None:
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+
+                # Same LocalStack defaults as aws/upload_validation_report.py
+                self._s3 = boto3.client(
+                    "s3",
+                    endpoint_url=os.getenv("AWS_ENDPOINT_URL", "http://localhost:4566"),
+                    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", "test"),
+                    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", "test"),
+                    region_name=os.getenv("AWS_REGION", "us-east-1"),
+                )
+                self._transfer = TransferConfig(
+                    multipart_threshold=MULTIPART_CHUNK_SIZE,
+                    multipart_chunksize=MULTIPART_CHUNK_SIZE,
+                    max_concurrency=MULTIPART_CONCURRENCY,
+                )
+            return self._s3
+
+    def _key(self, relpath: str) -> str:
+        return f"{self.prefix}/{relpath}" if self.prefix else relpath
+
+    def path(self, relpath: str) -> pathlib.Path:
+        return self.local / relpath
+
+    def publish(self, relpath: str) -> None:
+        """
+        Make a file written under path(relpath) part of the stage. S3 roots
+        upload it and drop the local copy, so the extract needs no more
+        disk than the chunks in flight.
+        """
+        if not self.is_s3:
+            return
+        path = self.path(relpath)
+        self._client().upload_file(str(path), self.bucket, self._key(relpath), Config=self._transfer)
+        path.unlink()
+
+    def fetch(self, relpath: str) -> pathlib.Path:
+        """
+        Local path of a staged file, downloading it first for S3 roots.
+        """
+        path = self.path(relpath)
+        if self.is_s3 and not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".part")
+            self._client().download_file(self.bucket, self._key(relpath), str(tmp), Config=self._transfer)
+            os.replace(tmp, path)
+        return path
+
+    def discard(self, relpath: str) -> None:
+        """
+        Drop the local copy of a downloaded S3 file once it is loaded.
+        """
+        if self.is_s3:
+            self.path(relpath).unlink(missing_ok=True)
+
+    def write_manifest(self, manifest: Dict[str, Any]) -> None:
+        path = self.path(MANIFEST)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(MANIFEST + ".tmp")
+        tmp.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+        if self.is_s3:
+            self._client().upload_file(str(path), self.bucket, self._key(MANIFEST))
+
+    def read_manifest(self) -> Dict[str, Any]:
+        path = self.path(MANIFEST)
+        if self.is_s3:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._client().download_file(self.bucket, self._key(MANIFEST), str(path))
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Stage manifest version {manifest.get('version')} != {MANIFEST_VERSION}")
+        return manifest
+
+    def invalidate(self) -> None:
+        """
+        Remove the manifest of an earlier extract before overwriting its
+        chunks, so an interrupted extract is never taken for a complete one.
+        """
+        self.path(MANIFEST).unlink(missing_ok=True)
+        if self.is_s3:
+            self._client().delete_object(Bucket=self.bucket, Key=self._key(MANIFEST))
+
+
+def manifest_table(
+    src_table: str, tgt_table: str, src_cols: List[str], tgt_cols: List[str], key: Optional[str],
+    chunks: List[StagedChunk],
+) -> Dict[str, Any]:
+    return {
+        "source": src_table,
+        "target": tgt_table,
+        "source_columns": src_cols,
+        "target_columns": tgt_cols,
+        "key": key,
+        "chunks": [c._asdict() for c in sorted(chunks)],
+    }
+
+
+def staged_chunks(table: Dict[str, Any]) -> List[StagedChunk]:
+    return [StagedChunk(**c) for c in table["chunks"]]
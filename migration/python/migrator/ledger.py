@@ -0,0 +1,68 @@
+"""
+schema_migrations ledger: which migration files were applied, with the
+checksum of the content that was applied.
+"""
+
+import hashlib
+import pathlib
+from typing import Dict
+
+import psycopg
+
+LEDGER_TABLE = "migration_control.schema_migrations"
+
+# pg_advisory_lock key so two runners never apply migrations at once
+LOCK_KEY = 0x5C4E3A
+
+
+def checksum(path: pathlib.Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def setup(conn: psycopg.Connection) -> None:
+    conn.execute("CREATE SCHEMA IF NOT EXISTS migration_control")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+            name        TEXT PRIMARY KEY,
+            checksum    TEXT NOT NULL,
+            phase       TEXT NOT NULL,
+            statements  INTEGER NOT NULL,
+            duration_ms DOUBLE PRECISION NOT NULL,
+            applied_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    conn.commit()
+
+
+def lock(conn: psycopg.Connection) -> None:
+    """
+    Session-level lock, released when the connection closes.
+    """
+    conn.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+    conn.commit()
+
+
+def applied(conn: psycopg.Connection) -> Dict[str, str]:
+    rows = conn.execute(f"SELECT name, checksum FROM {LEDGER_TABLE}").fetchall()
+    conn.commit()
+    return dict(rows)
+
+
+def record(conn: psycopg.Connection, name: str, digest: str, phase: str, statements: int, seconds: float) -> None:
+    """
+    Record a file as applied; runs in the caller's transaction so it
+    commits together with the file's last statements.
+    """
+    conn.execute(
+        f"""
+        INSERT INTO {LEDGER_TABLE} (name, checksum, phase, statements, duration_ms)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (name) DO UPDATE
+            SET checksum = EXCLUDED.checksum,
+                phase = EXCLUDED.phase,
+                statements = EXCLUDED.statements,
+                duration_ms = EXCLUDED.duration_ms,
+                applied_at = now()
+        """,
+        (name, digest, phase, statements, seconds * 1000),
+    )
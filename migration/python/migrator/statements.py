@@ -0,0 +1,135 @@
+"""
+Split migration files into statements and group them for execution.
+
+The splitter understands everything that can hide a ';' in Postgres SQL:
+quoted literals and identifiers, dollar-quoted bodies ($$ ... $$,
+$fn$ ... $fn$), line comments and nested block comments.
+"""
+
+import re
+from typing import List, NamedTuple
+
+_DOLLAR_TAG = re.compile(r"\$([A-Za-z_][A-Za-z_0-9]*)?\$")
+
+# Statements that cannot run inside a transaction block. Consecutive ones
+# are treated as independent of each other and run in parallel.
+_AUTOCOMMIT = re.compile(
+    r"""^(
+        (CREATE\s+(UNIQUE\s+)?INDEX|DROP\s+INDEX)\s+CONCURRENTLY
+      | REINDEX\s+(\([^)]*\)\s*)?(INDEX|TABLE|SCHEMA|DATABASE|SYSTEM)\s+CONCURRENTLY
+      | VACUUM
+      | (CREATE|DROP)\s+DATABASE
+      | ALTER\s+SYSTEM
+    )\b""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+class Segment(NamedTuple):
+    transactional: bool
+    statements: List[str]
+
+
+def _skip_quoted(sql: str, i: int) -> int:
+    quote = sql[i]
+    i += 1
+    while i < len(sql):
+        if sql[i] == quote:
+            if sql.startswith(quote * 2, i):
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_block_comment(sql: str, i: int) -> int:
+    depth, i = 1, i + 2
+    while i < len(sql) and depth:
+        if sql.startswith("/*", i):
+            depth, i = depth + 1, i + 2
+        elif sql.startswith("*/", i):
+            depth, i = depth - 1, i + 2
+        else:
+            i += 1
+    return i
+
+
+def _skip_line_comment(sql: str, i: int) -> int:
+    end = sql.find("\n", i)
+    return len(sql) if end < 0 else end + 1
+
+
+def _code_start(sql: str) -> int:
+    """
+    Offset of the first character that is neither whitespace nor comment.
+    """
+    i = 0
+    while i < len(sql):
+        if sql[i].isspace():
+            i += 1
+        elif sql.startswith("--", i):
+            i = _skip_line_comment(sql, i)
+        elif sql.startswith("/*", i):
+            i = _skip_block_comment(sql, i)
+        else:
+            break
+    return i
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Statements of a script without their terminating ';' and leading
+    comments; comment-only fragments are dropped.
+    """
+    statements = []
+    start = i = 0
+    while i < len(sql):
+        c = sql[i]
+        if c in "'\"":
+            i = _skip_quoted(sql, i)
+        elif sql.startswith("--", i):
+            i = _skip_line_comment(sql, i)
+        elif sql.startswith("/*", i):
+            i = _skip_block_comment(sql, i)
+        elif c == "$" and (match := _DOLLAR_TAG.match(sql, i)):
+            end = sql.find(match.group(0), match.end())
+            i = len(sql) if end < 0 else end + len(match.group(0))
+        elif c == ";":
+            statements.append(sql[start:i])
+            start = i = i + 1
+        else:
+            i += 1
+    statements.append(sql[start:])
+
+    result = []
+    for stmt in statements:
+        stmt = stmt[_code_start(stmt):].rstrip()
+        if stmt:
+            result.append(stmt)
+    return result
+
+
+def needs_autocommit(statement: str) -> bool:
+    return bool(_AUTOCOMMIT.match(statement))
+
+
+def plan_segments(statements: List[str]) -> List[Segment]:
+    """
+    Group statements into runs that share one transaction and runs of
+    autocommit statements (CREATE INDEX CONCURRENTLY, ...) that can go
+    out on separate connections at once.
+    """
+    segments: List[Segment] = []
+    for stmt in statements:
+        transactional = not needs_autocommit(stmt)
+        if segments and segments[-1].transactional == transactional:
+            segments[-1].statements.append(stmt)
+        else:
+            segments.append(Segment(transactional, [stmt]))
+    return segments
+
+
+def summary(statement: str, width: int = 72) -> str:
+    line = " ".join(statement.split())
+    return line if len(line) <= width else line[: width - 3] + "..."
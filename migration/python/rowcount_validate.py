@@ -1,64 +1,28 @@
 """
 Row Count Validation: SQL Server -> PostgreSQL
+
+Thin report over validation.checks_rowcount. The default "tiered" mode
+compares catalog counts (sys.partitions / pg statistics) and only runs
+exact, PK-range-parallel counts for tables whose estimates disagree.
 """
 
-import psycopg
-import pyodbc
+import argparse
+
 from tabulate import tabulate
 from colorama import Fore, Style, init
 
-init(autoreset=True)
-
-# SQL Server connection (source)
-SOURCE_CONN_STR = (
-    "DRIVER={ODBC Driver 18 for SQL Server};"
-    "SERVER=localhost,1433;"
-    "DATABASE=AdventureWorksLite;"
-    "UID=sa;"
-    "PWD=MigrationLab123!;"
-    "Encrypt=yes;"
-    "TrustServerCertificate=yes;"
-)
-
-# PostgreSQL connection (target)
-TARGET_CONN = {
-    "host": "localhost",
-    "port": 5432,
-    "dbname": "migration_target",
-    "user": "postgres",
-    "password": "MigrationLab123!",
-}
-
-TABLES = ["Customers", "Products", "Orders", "OrderItems"]
-
-TABLE_NAME_MAP = {
-    "Customers": "customers",
-    "Products": "products",
-    "Orders": "orders",
-    "OrderItems": "order_items",  # important: underscore here
-}
-
-def get_row_counts():
-    results = []
-
-    # Connect to SQL Server
-    src_conn = pyodbc.connect(SOURCE_CONN_STR)
-    src_cur = src_conn.cursor()
+from validation.checks_rowcount import validate_rowcounts
+from validation.config import load_config
 
-    # Connect to PostgreSQL
-    tgt_conn = psycopg.connect(**TARGET_CONN)
-    tgt_cur = tgt_conn.cursor()
+init(autoreset=True)
 
-    for table in TABLES:
-        # Source count
-        src_cur.execute(f"SELECT COUNT(*) FROM {table}")
-        src_count = src_cur.fetchone()[0]
 
-        # Target table names are lowercase
-        tgt_table = TABLE_NAME_MAP[table]
-        tgt_cur.execute(f"SELECT COUNT(*) FROM {tgt_table}")
-        tgt_count = tgt_cur.fetchone()[0]
+def get_row_counts(mode="tiered", partitions=4, env=None):
+    cfg = load_config(env)
+    _, details = validate_rowcounts(cfg.sqlserver_conn, cfg.postgres_conn, mode, partitions)
 
+    results = []
+    for table, (src_count, tgt_count) in details.items():
         diff = tgt_count - src_count
         status = "MATCH" if diff == 0 else "MISMATCH"
         color = Fore.GREEN if diff == 0 else Fore.RED
@@ -72,21 +36,35 @@ def get_row_counts():
                 f"{color}{status}{Style.RESET_ALL}",
             ]
         )
+    return results
 
-    src_cur.close()
-    src_conn.close()
-    tgt_cur.close()
-    tgt_conn.close()
 
-    return results
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare SQL Server and PostgreSQL row counts")
+    parser.add_argument("--env", default=None, help="settings from envs/<env>.yaml (default: $ENVIRONMENT or dev)")
+    parser.add_argument(
+        "--mode",
+        choices=["estimate", "tiered", "exact"],
+        default="tiered",
+        help="estimate: catalog counts only; tiered: exact counts where estimates differ; exact: count everything",
+    )
+    parser.add_argument(
+        "--partitions",
+        type=int,
+        default=4,
+        help="PK ranges counted concurrently per table for exact counts",
+    )
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+
     print(f"\n{Fore.CYAN}{'='*70}")
-    print(f"{Fore.CYAN}Row Count Validation Report")
+    print(f"{Fore.CYAN}Row Count Validation Report ({args.mode})")
     print(f"{Fore.CYAN}{'='*70}\n")
 
-    results = get_row_counts()
+    results = get_row_counts(args.mode, args.partitions, args.env)
 
     headers = [
         "Table",
@@ -1,11 +1,18 @@
 import argparse
 import logging
-import os
 import pathlib
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Tuple
 
 import psycopg
 
+from common.connections import connect_postgres
+from common.settings import load_settings
+from migrator import ledger
+from migrator.statements import plan_segments, split_statements, summary
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,44 +23,134 @@ logger = logging.getLogger("run_migrations")
 
 def get_postgres_dsn(env_name: str) -> str:
     """
-    Build a DSN for the target Postgres in CI.
-    For the dev workflow, we connect to the GitHub Actions postgres service.
+    DSN of the target Postgres for the given environment. In CI the
+    GitHub Actions postgres service is exposed on localhost:5432 with
+    user/password from env (see common.settings for the lookup order).
     """
-    # In CI, the service is exposed on localhost:5432 with user/password from env.
-    user = os.environ.get("POSTGRES_USER", "postgres")
-    password = os.environ.get("DB_DEV_PASSWORD") or os.environ.get("POSTGRES_PASSWORD", "")
-    host = os.environ.get("POSTGRES_HOST", "localhost")
-    port = int(os.environ.get("POSTGRES_PORT", "5432"))
-    dbname = os.environ.get("POSTGRES_DB", "migration_target")
+    return load_settings(env_name).postgres_conn
 
-    if not password:
-        logger.warning("No password found in DB_DEV_PASSWORD/POSTGRES_PASSWORD; connecting without password")
 
-    dsn = f"host={host} port={port} dbname={dbname} user={user}"
-    if password:
-        dsn += f" password={password}"
-    return dsn
+def _masked(dsn: str) -> str:
+    return re.sub(r"password=\S+", "password=****", dsn)
 
 
-def apply_sql_file(conn: psycopg.Connection, sql_path: pathlib.Path) -> None:
-    logger.info("Applying %s", sql_path)
-    sql = sql_path.read_text(encoding="utf-8")
-    # Very simple splitter; assumes each file is a single statement or uses plain ';' terminators.
-    with conn.cursor() as cur:
-        cur.execute(sql)
-    conn.commit()
+class StatementTiming(NamedTuple):
+    file: str
+    statement: str
+    seconds: float
 
 
-def apply_directory(conn: psycopg.Connection, source_dir: pathlib.Path) -> None:
+def _timed(name: str, conn: psycopg.Connection, sql: str) -> StatementTiming:
+    started = time.perf_counter()
+    conn.execute(sql)
+    timing = StatementTiming(name, sql, time.perf_counter() - started)
+    logger.info("  %8.1f ms  %s", 1000 * timing.seconds, summary(sql))
+    return timing
+
+
+def _run_autocommit(dsn: str, name: str, sql: str) -> StatementTiming:
+    with connect_postgres("migrations", dsn, autocommit=True) as conn:
+        return _timed(name, conn, sql)
+
+
+def apply_sql_file(
+    conn: psycopg.Connection,
+    dsn: str,
+    name: str,
+    sql_path: pathlib.Path,
+    jobs: int = 4,
+    pipeline: bool = False,
+) -> Tuple[List[StatementTiming], int]:
+    """
+    Run one file statement by statement. Transactional runs of statements
+    share the caller's transaction; runs of autocommit statements
+    (CREATE INDEX CONCURRENTLY, VACUUM, ...) first commit it and then go
+    out in parallel on their own connections. Whatever ran before a
+    failing statement of such a file stays applied, so files mixing both
+    kinds should use IF [NOT] EXISTS.
+    """
+    logger.info("Applying %s", name)
+    statements = split_statements(sql_path.read_text(encoding="utf-8"))
+    timings: List[StatementTiming] = []
+
+    for segment in plan_segments(statements):
+        if segment.transactional and pipeline:
+            # One round trip for the whole run; only its total is timed.
+            started = time.perf_counter()
+            with conn.pipeline():
+                for sql in segment.statements:
+                    conn.execute(sql)
+            seconds = time.perf_counter() - started
+            label = f"{len(segment.statements)} statements (pipeline)"
+            logger.info("  %8.1f ms  %s", 1000 * seconds, label)
+            timings.append(StatementTiming(name, label, seconds))
+        elif segment.transactional:
+            timings += [_timed(name, conn, sql) for sql in segment.statements]
+        else:
+            conn.commit()
+            with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(segment.statements)))) as pool:
+                futures = [pool.submit(_run_autocommit, dsn, name, sql) for sql in segment.statements]
+                timings += [f.result() for f in futures]
+    return timings, len(statements)
+
+
+def apply_directory(
+    conn: psycopg.Connection,
+    dsn: str,
+    source_dir: pathlib.Path,
+    phase: str,
+    jobs: int = 4,
+    pipeline: bool = False,
+    reapply_changed: bool = False,
+) -> List[StatementTiming]:
+    """
+    Apply the files under source_dir that the schema_migrations ledger
+    has not seen with their current checksum. Each file commits together
+    with its ledger row; unchanged files cost one checksum each.
+    """
     sql_files = sorted(source_dir.rglob("*.sql"))
     if not sql_files:
         logger.info("No .sql files found under %s, nothing to do", source_dir)
-        return
+        return []
 
     logger.info("Found %d .sql files under %s", len(sql_files), source_dir)
 
+    ledger.setup(conn)
+    ledger.lock(conn)
+    done = ledger.applied(conn)
+
+    pending = []
     for sql_file in sql_files:
-        apply_sql_file(conn, sql_file)
+        name = f"{source_dir.name}/{sql_file.relative_to(source_dir).as_posix()}"
+        digest = ledger.checksum(sql_file)
+        if done.get(name) == digest:
+            continue
+        if name in done and not reapply_changed:
+            raise RuntimeError(
+                f"{name} changed after it was applied (checksum {done[name][:12]} -> {digest[:12]}); "
+                "add a new migration file or rerun with --reapply-changed"
+            )
+        pending.append((name, digest, sql_file))
+
+    logger.info("%d already applied, %d to apply", len(sql_files) - len(pending), len(pending))
+
+    timings: List[StatementTiming] = []
+    for name, digest, sql_file in pending:
+        started = time.perf_counter()
+        file_timings, count = apply_sql_file(conn, dsn, name, sql_file, jobs, pipeline)
+        ledger.record(conn, name, digest, phase, count, time.perf_counter() - started)
+        conn.commit()
+        timings += file_timings
+    return timings
+
+
+def report_timings(timings: List[StatementTiming], top: int = 10) -> None:
+    if not timings:
+        return
+    total = sum(t.seconds for t in timings)
+    logger.info("%d statements in %.2fs; slowest:", len(timings), total)
+    for t in sorted(timings, key=lambda t: t.seconds, reverse=True)[:top]:
+        logger.info("  %8.1f ms  %-32s %s", 1000 * t.seconds, t.file, summary(t.statement, 60))
 
 
 def main() -> int:
@@ -61,6 +158,22 @@ def main() -> int:
     parser.add_argument("--env", required=True)
     parser.add_argument("--phase", required=True, choices=["schema", "data"])
     parser.add_argument("--source", required=True)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="connections for consecutive autocommit statements such as CREATE INDEX CONCURRENTLY",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="send each file's transactional statements in one pipeline (timed per run, not per statement)",
+    )
+    parser.add_argument(
+        "--reapply-changed",
+        action="store_true",
+        help="re-run files whose checksum changed since they were applied instead of failing",
+    )
     args = parser.parse_args()
 
     source_dir = pathlib.Path(args.source)
@@ -69,16 +182,19 @@ def main() -> int:
         return 0
 
     dsn = get_postgres_dsn(args.env)
-    logger.info("Connecting to Postgres with DSN: %s", dsn.replace(password if (password := os.environ.get('DB_DEV_PASSWORD')) else "", "****"))
+    logger.info("Connecting to Postgres with DSN: %s", _masked(dsn))
 
     try:
-        with psycopg.connect(dsn) as conn:
+        with connect_postgres("migrations", dsn) as conn:
             logger.info("Connected. Applying %s migrations from %s", args.phase, source_dir)
-            apply_directory(conn, source_dir)
+            timings = apply_directory(
+                conn, dsn, source_dir, args.phase, args.jobs, args.pipeline, args.reapply_changed,
+            )
     except Exception as exc:
         logger.error("Migration failed: %s", exc, exc_info=True)
         return 1
 
+    report_timings(timings)
     logger.info("Migrations completed successfully")
     return 0
 
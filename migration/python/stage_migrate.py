@@ -0,0 +1,258 @@
+"""
+Staged bulk migrate: SQL Server -> Parquet/Arrow IPC files -> PostgreSQL
+
+    python stage_migrate.py extract --stage-dir stage/ --chunk-size 100000 --workers 4
+    python stage_migrate.py load --stage-dir stage/ --workers 8
+
+extract reads every catalog table in primary-key chunks (arrow-odbc when
+installed, pyodbc rows otherwise) into one compressed file per chunk.
+load truncates the targets and COPYs the files in parallel, parents
+first, one transaction per chunk, with the source identity values
+(sequences are resynced afterwards). The two stages run independently: a
+load can be repeated, or run elsewhere, without reading the source again.
+--stage-dir s3://bucket/prefix stages through S3 (LocalStack) with
+multipart uploads. See loader/staging.py for the file layout.
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from colorama import Fore, Style, init
+
+import bulk_migrate
+from common import columnar, metrics
+from common.catalog import Catalog, get_catalog, set_catalog
+from common.connections import PostgresPool, sqlserver_pool
+from loader import staging
+
+init(autoreset=True)
+
+
+def _run_all(pool, fn, jobs):
+    """
+    Run fn(*job) for every job on the pool; the first failure cancels the
+    jobs that have not started yet.
+    """
+    futures = {pool.submit(fn, *job): job for job in jobs}
+    try:
+        return [(futures[future], future.result()) for future in as_completed(futures)]
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def extract_chunk(root, chunk, types, src_pool, progress, args):
+    """
+    Write one chunk to its staging file, streaming batch by batch, and
+    publish it (upload it for S3 roots).
+    """
+    started = time.perf_counter()
+    select_sql, params = bulk_migrate.chunk_select(chunk)
+    relpath = staging.chunk_file(chunk.src_table, chunk.index, args.format)
+    path = root.path(relpath)
+
+    if args.fetch == "arrow":
+        batches = columnar.read_batches(select_sql, params, args.batch_size, "bulk_load")
+        batches = metrics.timed_iter(batches, "stage.fetch", table=chunk.src_table)
+        rows, size = staging.write_chunk(path, batches, args.format)
+    else:
+        with src_pool.connection() as src_conn:
+            src_cur = src_conn.cursor()
+            try:
+                batches = bulk_migrate.iter_source_batches(src_cur, select_sql, args.batch_size, params)
+                batches = metrics.timed_iter(batches, "stage.fetch", table=chunk.src_table)
+                rows, size = staging.write_chunk(path, staging.batches_from_rows(batches, types), args.format)
+            finally:
+                src_cur.close()
+
+    if rows:
+        with metrics.span("stage.upload", table=chunk.src_table):
+            root.publish(relpath)
+    metrics.ROWS.inc(rows, phase="extract", table=chunk.src_table)
+    metrics.BYTES.inc(size, phase="extract", table=chunk.src_table)
+    progress.chunk_done(chunk, rows, time.perf_counter() - started)
+    return staging.StagedChunk(chunk.index, chunk.lo, chunk.hi, relpath if rows else None, rows, size)
+
+
+def extract(args):
+    staging.require_arrow()
+    if args.fetch == "arrow" and not columnar.available():
+        print(f"{Fore.YELLOW}arrow-odbc not installed, fetching rows with pyodbc{Style.RESET_ALL}")
+        args.fetch = "rows"
+
+    root = staging.StageRoot(args.stage_dir, args.cache_dir)
+    root.invalidate()
+    catalog = get_catalog()
+    # The load commits chunks in any order, so identities are always staged
+    # with their source values (as bulk_migrate --preserve-ids)
+    pairs = bulk_migrate.table_pairs(preserve_ids=True)
+
+    src_pool = sqlserver_pool("bulk_load", args.workers)
+    try:
+        with src_pool.connection() as src_conn:
+            src_cur = src_conn.cursor()
+            chunks_by_table = {
+                src_table: bulk_migrate.plan_chunks(src_cur, src_table, tgt_table, src_cols, tgt_cols, args.chunk_size)
+                for src_table, tgt_table, src_cols, tgt_cols in pairs
+            }
+            src_cur.close()
+        types = {
+            src_table: staging.source_arrow_types(
+                [catalog.table(src_table).column(c).source_type for c in src_cols]
+            )
+            for src_table, _, src_cols, _ in pairs
+        }
+        chunks = [c for table_chunks in chunks_by_table.values() for c in table_chunks]
+        progress = bulk_migrate.ChunkProgress(chunks)
+        print(f"{Fore.CYAN}Extracting {len(chunks)} chunks to {args.stage_dir} "
+              f"({args.format}, {args.workers} workers){Style.RESET_ALL}")
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            done = _run_all(
+                pool, extract_chunk,
+                [(root, c, types[c.src_table], src_pool, progress, args) for c in chunks],
+            )
+    finally:
+        src_pool.close()
+
+    staged = {}
+    for job, result in done:
+        staged.setdefault(job[1].src_table, []).append(result)
+    root.write_manifest({
+        "version": staging.MANIFEST_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "format": args.format,
+        "compression": staging.COMPRESSION,
+        "preserve_ids": True,
+        # the load resolves keys, identities and FK order from this copy,
+        # so it never has to connect to SQL Server
+        "catalog": json.loads(catalog.to_json()),
+        "tables": [
+            staging.manifest_table(
+                src_table, tgt_table, src_cols, tgt_cols, chunks_by_table[src_table][0].key,
+                staged.get(src_table, []),
+            )
+            for src_table, tgt_table, src_cols, tgt_cols in pairs
+        ],
+    })
+    return sum(c.rows for table_chunks in staged.values() for c in table_chunks)
+
+
+def load_chunk(root, fmt, chunk, staged, tgt_pool, progress, args):
+    """
+    COPY one staged file in its own transaction. A row count that differs
+    from the manifest rolls the chunk back.
+    """
+    started = time.perf_counter()
+    count = 0
+    if staged.file is not None:
+        with metrics.span("stage.download", table=chunk.src_table):
+            path = root.fetch(staged.file)
+        batches = metrics.timed_iter(staging.read_chunk(path, fmt, args.batch_size), "stage.read", table=chunk.tgt_table)
+        with tgt_pool.connection() as tgt_conn, tgt_conn.cursor() as tgt_cur:
+            if bulk_migrate.csv_copy_ok(chunk.tgt_table, chunk.tgt_cols):
+                batches = bulk_migrate.observe_record_batches(batches, chunk.tgt_table)
+                count = bulk_migrate.copy_record_batches(tgt_cur, chunk.tgt_table, chunk.tgt_cols, batches)
+            else:
+                # bytea columns: back to Python rows for psycopg's adapters
+                rows = (list(zip(*(column.to_pylist() for column in b.columns))) for b in batches)
+                count = bulk_migrate.copy_batches(tgt_cur, chunk.tgt_table, chunk.tgt_cols, rows)
+            if count != staged.rows:
+                raise ValueError(f"{chunk.label}: loaded {count} rows, manifest lists {staged.rows}")
+        root.discard(staged.file)
+    progress.chunk_done(chunk, count, time.perf_counter() - started)
+    return count
+
+
+def load(args):
+    staging.require_arrow()
+    root = staging.StageRoot(args.stage_dir, args.cache_dir)
+    manifest = root.read_manifest()
+    set_catalog(Catalog.from_json(json.dumps(manifest["catalog"])))
+
+    pairs = []
+    jobs_by_table = {}
+    for table in manifest["tables"]:
+        pair = (table["source"], table["target"], table["source_columns"], table["target_columns"])
+        pairs.append(pair)
+        staged_chunks = staging.staged_chunks(table)
+        jobs_by_table[table["source"]] = [
+            (bulk_migrate.Chunk(*pair, table["key"], s.lo, s.hi, s.index, len(staged_chunks)), s)
+            for s in staged_chunks
+        ]
+
+    tgt_pool = PostgresPool("bulk_load", args.workers)
+    total = 0
+    try:
+        with tgt_pool.connection() as tgt_conn:
+            targets = ", ".join(pair[1] for pair in pairs)
+            tgt_conn.execute(f"TRUNCATE TABLE {targets} RESTART IDENTITY CASCADE;")
+
+        progress = bulk_migrate.ChunkProgress([chunk for jobs in jobs_by_table.values() for chunk, _ in jobs])
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for wave in bulk_migrate.load_waves(pairs):
+                print(f"{Fore.CYAN}Loading {', '.join(pair[0] for pair in wave)} "
+                      f"with {args.workers} workers{Style.RESET_ALL}")
+                done = _run_all(
+                    pool, load_chunk,
+                    [
+                        (root, manifest["format"], chunk, staged, tgt_pool, progress, args)
+                        for pair in wave
+                        for chunk, staged in jobs_by_table[pair[0]]
+                    ],
+                )
+                total += sum(count for _, count in done)
+    finally:
+        tgt_pool.close()
+
+    if manifest["preserve_ids"]:
+        with bulk_migrate.phase("resync identities"):
+            bulk_migrate.resync_identities(pairs)
+    return total
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Staged bulk migrate SQL Server -> files -> PostgreSQL")
+    parser.add_argument("stage", choices=["extract", "load"])
+    parser.add_argument(
+        "--stage-dir",
+        required=True,
+        help="local directory or s3://bucket/prefix (AWS_ENDPOINT_URL, default LocalStack)",
+    )
+    parser.add_argument("--cache-dir", help="local copy of an S3 stage (default: a temporary directory)")
+    parser.add_argument("--workers", type=int, default=4, help="chunks extracted or loaded at a time")
+    parser.add_argument("--batch-size", type=int, default=bulk_migrate.DEFAULT_BATCH_SIZE)
+    # extract only
+    parser.add_argument("--format", choices=sorted(staging.FORMATS), default="parquet")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100000,
+        help="key values per chunk file (0 = one file per table)",
+    )
+    parser.add_argument("--fetch", choices=["rows", "arrow"], default="arrow")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.start_from_env()
+
+    try:
+        with bulk_migrate.phase(args.stage):
+            total = extract(args) if args.stage == "extract" else load(args)
+        print(f"\n{Fore.GREEN}Staged {args.stage} completed: {total} rows{Style.RESET_ALL}")
+    except Exception as exc:
+        print(f"{Fore.RED}Staged {args.stage} failed: {exc}{Style.RESET_ALL}")
+        raise
+    finally:
+        metrics.flush()
+        for line in metrics.span_summary():
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
+import json
 import logging
+import os
 import sys
+from datetime import datetime, timezone
+from pathlib import Path
 
+from common import metrics
+from common.settings import load_settings
 from validation.config import load_config
-from validation.checks_rowcount import validate_rowcounts
-from validation.checks_metrics import validate_metrics
-from validation.checks_samples import validate_samples
+from validation.runner import ValidationRunner
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,44 +17,61 @@ logging.basicConfig(
 
 logger = logging.getLogger("validate_migration")
 
+# Picked up by aws/upload_validation_report.py and aws/send_status_message.py
+REPORT_PATH = Path(os.getenv("VALIDATION_REPORT_PATH", "validation-report.json"))
+
+
+def write_report(results) -> None:
+    ok = all(result.ok for result in results)
+    report = {
+        "environment": load_settings().env,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "phase": os.getenv("MIGRATION_PHASE"),
+        "status": "completed" if ok else "failed",
+        "checks": [
+            {"name": result.name, "ok": result.ok, "seconds": round(result.seconds, 3)} for result in results
+        ],
+        "rowcounts": {
+            table: {"source": src, "target": tgt}
+            for result in results
+            if result.name == "rowcount"
+            for table, (src, tgt) in sorted(result.details.items())
+        },
+        "metrics": metrics.REGISTRY.snapshot(),
+    }
+    REPORT_PATH.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    logger.info("Report written to %s", REPORT_PATH)
+
+
 def main() -> int:
     cfg = load_config()
+    metrics.start_from_env()
 
     logger.info("Starting migration validation...")
 
-    ok_rowcount, details = validate_rowcounts(
-        sqlserver_conn=cfg.sqlserver_conn,
-        postgres_conn=cfg.postgres_conn,
-    )
+    results = ValidationRunner(cfg).run()
+    write_report(results)
+    metrics.flush()
 
-    for table, (src, tgt) in sorted(details.items()):
-        status = "OK" if src == tgt else "MISMATCH"
-        logger.info("Table %-20s src=%-6d tgt=%-6d [%s]", table, src, tgt, status)
+    for result in results:
+        if result.name == "rowcount":
+            for table, (src, tgt) in sorted(result.details.items()):
+                status = "OK" if src == tgt else "MISMATCH"
+                logger.info("Table %-20s src=%-6d tgt=%-6d [%s]", table, src, tgt, status)
 
-    ok_metrics = validate_metrics(
-        sqlserver_conn=cfg.sqlserver_conn,
-        postgres_conn=cfg.postgres_conn,
-    )
+    for result in results:
+        logger.info("Check %-10s %-4s %.2fs", result.name, "OK" if result.ok else "FAIL", result.seconds)
 
-    ok_samples = validate_samples(
-        sqlserver_conn=cfg.sqlserver_conn,
-        postgres_conn=cfg.postgres_conn,
-        sample_size=3,
-    )
-
-    if not ok_rowcount or not ok_metrics or not ok_samples:
+    if not all(result.ok for result in results):
         logger.error(
-            "Validation FAILED (rowcount_ok=%s metrics_ok=%s samples_ok=%s)",
-            ok_rowcount, ok_metrics, ok_samples,
+            "Validation FAILED (%s)",
+            " ".join(f"{result.name}_ok={result.ok}" for result in results),
         )
         return 1
 
-    if not ok_rowcount or not ok_metrics:
-        logger.error("Validation FAILED (rowcount_ok=%s metrics_ok=%s)", ok_rowcount, ok_metrics)
-        return 1
-
     logger.info("All validations PASSED")
     return 0
 
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,273 @@
+import logging
+from concurrent.futures import Executor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pyodbc
+import psycopg
+
+from common import columnar
+from common.catalog import TableMapping, get_catalog, load_catalog
+from common.connections import connect_postgres, connect_sqlserver
+
+logger = logging.getLogger(__name__)
+
+
+# Both engines render every column to the same text and hash the row's
+# '|'-joined UTF-8 bytes with MD5. NULL is rendered as \N.
+_SQLSERVER_CANONICAL = {
+    "int": "CONVERT(VARCHAR(20), [{c}])",
+    "money": "CONVERT(VARCHAR(40), CAST([{c}] AS DECIMAL(19,4)))",
+    "datetime": "CONVERT(VARCHAR(23), [{c}], 121)",
+    # NVARCHAR -> UTF-8 bytes, matching what md5() sees on Postgres
+    "text": "CONVERT(VARCHAR(MAX), [{c}] COLLATE Latin1_General_100_BIN2_UTF8)",
+}
+
+_POSTGRES_CANONICAL = {
+    "int": "{c}::text",
+    "money": "{c}::numeric(19,4)::text",
+    "datetime": "to_char({c}, 'YYYY-MM-DD HH24:MI:SS.MS')",
+    "text": "{c}::text",
+}
+
+
+class RangeHash(NamedTuple):
+    rows: int
+    h1: int
+    h2: int
+
+
+def _sqlserver_row_hash(table: TableMapping) -> str:
+    parts = [f"CONVERT(VARCHAR(20), [{table.pk_src}])"]
+    parts += [f"ISNULL({_SQLSERVER_CANONICAL[c.kind].format(c=c.source)}, '\\N')" for c in table.compared_columns]
+    # CONCAT_WS wants at least two values; a key-only hash is just the key
+    text = parts[0] if len(parts) == 1 else f"CONCAT_WS('|', {', '.join(parts)})"
+    digest = f"HASHBYTES('MD5', {text})"
+    # First and second 4 bytes of the digest as unsigned 32-bit integers
+    return (
+        f"CAST(SUBSTRING({digest}, 1, 4) AS BIGINT) AS h1, "
+        f"CAST(SUBSTRING({digest}, 5, 4) AS BIGINT) AS h2"
+    )
+
+
+def _postgres_row_hash(table: TableMapping) -> str:
+    parts = [f"{table.pk_tgt}::text"]
+    parts += [f"coalesce({_POSTGRES_CANONICAL[c.kind].format(c=c.target)}, '\\N')" for c in table.compared_columns]
+    digest = f"md5(concat_ws('|', {', '.join(parts)}))"
+    return (
+        f"('x' || substr({digest}, 1, 8))::bit(32)::bigint AS h1, "
+        f"('x' || substr({digest}, 9, 8))::bit(32)::bigint AS h2"
+    )
+
+
+class _SqlServerSide:
+    def __init__(self, cur: pyodbc.Cursor, table: TableMapping):
+        self._cur = cur
+        self._from = f"dbo.[{table.source}]"
+        self._pk = f"[{table.pk_src}]"
+        self._hash = _sqlserver_row_hash(table)
+
+    def bucket_hashes(self, bucket_size: int) -> Dict[int, RangeHash]:
+        self._cur.execute(f"""
+            SELECT bucket, COUNT(*), SUM(h1), SUM(h2)
+            FROM (SELECT {self._pk} / ? AS bucket, {self._hash} FROM {self._from}) x
+            GROUP BY bucket
+        """, bucket_size)
+        return {b: RangeHash(int(n), int(h1), int(h2)) for b, n, h1, h2 in self._cur.fetchall()}
+
+    def range_hash(self, lo: int, hi: int) -> RangeHash:
+        self._cur.execute(f"""
+            SELECT COUNT(*), ISNULL(SUM(h1), 0), ISNULL(SUM(h2), 0)
+            FROM (SELECT {self._hash} FROM {self._from} WHERE {self._pk} BETWEEN ? AND ?) x
+        """, lo, hi)
+        return RangeHash(*(int(v) for v in self._cur.fetchone()))
+
+    def row_hashes(self, lo: int, hi: int) -> Dict[int, Tuple[int, int]]:
+        self._cur.execute(
+            f"SELECT {self._pk}, {self._hash} FROM {self._from} WHERE {self._pk} BETWEEN ? AND ?",
+            lo, hi,
+        )
+        return {pk: (h1, h2) for pk, h1, h2 in self._cur.fetchall()}
+
+
+class _ColumnarSqlServerSide(_SqlServerSide):
+    """
+    Reads leaf row hashes through arrow-odbc on its own connection: no
+    pyodbc Row per row, the three columns convert to Python values in bulk.
+    """
+
+    def __init__(self, cur: pyodbc.Cursor, table: TableMapping, conn_str: str):
+        super().__init__(cur, table)
+        self._conn_str = conn_str
+
+    def row_hashes(self, lo: int, hi: int) -> Dict[int, Tuple[int, int]]:
+        result = columnar.read_table(
+            f"SELECT {self._pk}, {self._hash} FROM {self._from} WHERE {self._pk} BETWEEN ? AND ?",
+            (lo, hi), "validation", self._conn_str,
+        )
+        pks, h1, h2 = (column.to_pylist() for column in result.columns)
+        return dict(zip(pks, zip(h1, h2)))
+
+
+class _PostgresSide:
+    def __init__(self, cur: psycopg.Cursor, table: TableMapping):
+        self._cur = cur
+        self._from = table.target
+        self._pk = table.pk_tgt
+        self._hash = _postgres_row_hash(table)
+
+    def bucket_hashes(self, bucket_size: int) -> Dict[int, RangeHash]:
+        self._cur.execute(f"""
+            SELECT {self._pk} / %(size)s AS bucket, COUNT(*), SUM(h1), SUM(h2)
+            FROM (SELECT {self._pk}, {self._hash} FROM {self._from}) x
+            GROUP BY 1
+        """, {"size": bucket_size})
+        return {b: RangeHash(int(n), int(h1), int(h2)) for b, n, h1, h2 in self._cur.fetchall()}
+
+    def range_hash(self, lo: int, hi: int) -> RangeHash:
+        self._cur.execute(f"""
+            SELECT COUNT(*), coalesce(SUM(h1), 0), coalesce(SUM(h2), 0)
+            FROM (SELECT {self._hash} FROM {self._from} WHERE {self._pk} BETWEEN %s AND %s) x
+        """, (lo, hi))
+        return RangeHash(*(int(v) for v in self._cur.fetchone()))
+
+    def row_hashes(self, lo: int, hi: int) -> Dict[int, Tuple[int, int]]:
+        self._cur.execute(
+            f"SELECT {self._pk}, {self._hash} FROM {self._from} WHERE {self._pk} BETWEEN %s AND %s",
+            (lo, hi),
+        )
+        return {pk: (h1, h2) for pk, h1, h2 in self._cur.fetchall()}
+
+
+class RowDiff(NamedTuple):
+    pk: int
+    kind: str  # "missing_in_target", "missing_in_source" or "changed"
+
+
+def _diff_rows(src, tgt, lo: int, hi: int) -> List[RowDiff]:
+    src_rows = src.row_hashes(lo, hi)
+    tgt_rows = tgt.row_hashes(lo, hi)
+    diffs = [RowDiff(pk, "missing_in_target") for pk in src_rows.keys() - tgt_rows.keys()]
+    diffs += [RowDiff(pk, "missing_in_source") for pk in tgt_rows.keys() - src_rows.keys()]
+    diffs += [RowDiff(pk, "changed") for pk in src_rows.keys() & tgt_rows.keys() if src_rows[pk] != tgt_rows[pk]]
+    return sorted(diffs)
+
+
+def bisect_range(src, tgt, lo: int, hi: int, leaf_rows: int) -> List[RowDiff]:
+    """
+    Compare [lo, hi] by hash and split it in halves until the mismatching
+    ranges are small enough to compare row hashes directly. Only ranges
+    that differ are ever descended into.
+    """
+    src_hash = src.range_hash(lo, hi)
+    tgt_hash = tgt.range_hash(lo, hi)
+    if src_hash == tgt_hash:
+        return []
+    if lo == hi or max(src_hash.rows, tgt_hash.rows) <= leaf_rows:
+        return _diff_rows(src, tgt, lo, hi)
+    mid = (lo + hi) // 2
+    return bisect_range(src, tgt, lo, mid, leaf_rows) + bisect_range(src, tgt, mid + 1, hi, leaf_rows)
+
+
+def diff_table(src, tgt, bucket_size: int, leaf_rows: int, executor: Optional[Executor] = None) -> List[RowDiff]:
+    """
+    One grouped scan per side hashes every bucket of bucket_size keys;
+    mismatching buckets are then bisected down to the differing rows.
+    With an executor the two bucket scans run concurrently.
+    """
+    if executor is not None:
+        src_future = executor.submit(src.bucket_hashes, bucket_size)
+        tgt_buckets = tgt.bucket_hashes(bucket_size)
+        src_buckets = src_future.result()
+    else:
+        src_buckets = src.bucket_hashes(bucket_size)
+        tgt_buckets = tgt.bucket_hashes(bucket_size)
+    diffs: List[RowDiff] = []
+    for bucket in sorted(src_buckets.keys() | tgt_buckets.keys()):
+        if src_buckets.get(bucket) == tgt_buckets.get(bucket):
+            continue
+        lo = bucket * bucket_size
+        diffs += bisect_range(src, tgt, lo, lo + bucket_size - 1, leaf_rows)
+    return diffs
+
+
+def diff_table_on(
+    src_conn: pyodbc.Connection,
+    tgt_conn: psycopg.Connection,
+    src_table: str,
+    bucket_size: int = 100000,
+    leaf_rows: int = 1000,
+    executor: Optional[Executor] = None,
+    columnar_conn: Optional[str] = None,
+) -> List[RowDiff]:
+    """
+    With columnar_conn (a SQL Server connection string) the source rows of
+    mismatching leaf ranges are read through common.columnar.
+    """
+    table = get_catalog().table(src_table)
+    if columnar_conn is not None:
+        src = _ColumnarSqlServerSide(src_conn.cursor(), table, columnar_conn)
+    else:
+        src = _SqlServerSide(src_conn.cursor(), table)
+    return diff_table(
+        src,
+        _PostgresSide(tgt_conn.cursor(), table),
+        bucket_size,
+        leaf_rows,
+        executor,
+    )
+
+
+def diff_keys_on(
+    src_conn: pyodbc.Connection,
+    tgt_conn: psycopg.Connection,
+    src_table: str,
+    bucket_size: int = 100000,
+    leaf_rows: int = 1000,
+    executor: Optional[Executor] = None,
+) -> List[RowDiff]:
+    """
+    diff_table_on over the primary key alone: finds rows present on one
+    side only (deletes and missed inserts) with index-only scans, without
+    reading or hashing the other columns.
+    """
+    table = get_catalog().table(src_table)
+    keys = table._replace(columns=[table.pk])
+    return diff_table(
+        _SqlServerSide(src_conn.cursor(), keys),
+        _PostgresSide(tgt_conn.cursor(), keys),
+        bucket_size,
+        leaf_rows,
+        executor,
+    )
+
+
+def report_diffs(src_table: str, diffs: List[RowDiff], max_reported: int = 20) -> bool:
+    if not diffs:
+        logger.info("Hash diff: %s matches", src_table)
+        return True
+    logger.warning("Hash diff: %s has %d differing rows", src_table, len(diffs))
+    for diff in diffs[:max_reported]:
+        logger.warning("  %s %s=%s %s", src_table, get_catalog().table(src_table).pk_src, diff.pk, diff.kind)
+    return False
+
+
+def validate_hashes(
+    sqlserver_conn: str,
+    postgres_conn: str,
+    bucket_size: int = 100000,
+    leaf_rows: int = 1000,
+    max_reported: int = 20,
+) -> bool:
+    """
+    Full-content comparison of every table by PK-range hashes computed
+    server-side. Requires target PKs equal to source PKs (bulk_migrate
+    --preserve-ids).
+    """
+    ok = True
+    catalog = load_catalog(sqlserver_conn, postgres_conn)
+    with connect_sqlserver("validation", sqlserver_conn) as src_conn, \
+            connect_postgres("validation", postgres_conn) as tgt_conn:
+        for src_table in [t.source for t in catalog.keyed_tables()]:
+            diffs = diff_table_on(src_conn, tgt_conn, src_table, bucket_size, leaf_rows)
+            ok = report_diffs(src_table, diffs, max_reported) and ok
+    return ok
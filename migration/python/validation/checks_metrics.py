@@ -1,156 +1,217 @@
 import logging
-from typing import Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import pyodbc
 import psycopg
 
+from common.catalog import TableMapping, get_catalog, load_catalog
+from common.connections import PostgresPool, sqlserver_pool
+
 logger = logging.getLogger(__name__)
 
-# target table -> target numeric cols
-NUMERIC_COLUMNS = {
-    "customers": ["customer_id"],
-    "orders": ["order_id", "total_amount"],
-    "order_items": ["order_item_id", "quantity", "unit_price"],
-    "products": ["product_id", "price", "stock_quantity"],
-}
-
-# explicit source mapping (SQL Server)
-SRC_TABLE_MAP = {
-    "customers": "Customers",
-    "orders": "Orders",
-    "order_items": "OrderItems",
-    "products": "Products",
-}
-
-SRC_COL_MAP = {
-    # target_col -> source_col
-    "customer_id": "CustomerID",
-    "order_id": "OrderID",
-    "total_amount": "TotalAmount",
-    "order_item_id": "OrderItemID",
-    "quantity": "Quantity",
-    "unit_price": "UnitPrice",
-    "price": "Price",
-    "stock_quantity": "StockQuantity",
-    "product_id": "ProductID",
-}
-
-
-def _agg_sqlserver(conn_str: str) -> Dict[Tuple[str, str], Tuple[float, float, float]]:
+KeyRange = Optional[Tuple[int, int]]
+
+
+class ColumnMetrics(NamedTuple):
+    count: int
+    nulls: int
+    total: Optional[Decimal]
+    minimum: Any
+    maximum: Any
+
+
+def _combine(a: ColumnMetrics, b: ColumnMetrics) -> ColumnMetrics:
+    def pick(fn, x, y):
+        return y if x is None else x if y is None else fn(x, y)
+
+    return ColumnMetrics(
+        a.count + b.count,
+        a.nulls + b.nulls,
+        pick(lambda x, y: x + y, a.total, b.total),
+        pick(min, a.minimum, b.minimum),
+        pick(max, a.maximum, b.maximum),
+    )
+
+
+def metric_tables() -> List[TableMapping]:
     """
-    Return {(target_table, target_col): (count, sum, max)} using source SQL Server data.
+    Catalog tables with at least one int/money column to aggregate.
     """
-    result = {}
-    with pyodbc.connect(conn_str) as conn:
-        cur = conn.cursor()
-        for tgt_tbl, cols in NUMERIC_COLUMNS.items():
-            src_tbl = SRC_TABLE_MAP[tgt_tbl]
-            for tgt_col in cols:
-                src_col = SRC_COL_MAP[tgt_col]
-                cur.execute(f"""
-                    SELECT COUNT([{src_col}]), SUM(CAST([{src_col}] AS FLOAT)), MAX(CAST([{src_col}] AS FLOAT))
-                    FROM dbo.[{src_tbl}];
-                """)
-                cnt, s, mx = cur.fetchone()
-                result[(tgt_tbl, tgt_col)] = (float(cnt or 0), float(s or 0), float(mx or 0))
-    return result
+    return [t for t in get_catalog().tables() if t.numeric_columns]
 
 
-def _agg_postgres(conn_str: str) -> Dict[Tuple[str, str], Tuple[float, float, float]]:
+def _metrics_from_row(table: TableMapping, row) -> Dict[Tuple[str, str], ColumnMetrics]:
     """
-    Return {(target_table, target_col): (count, sum, max)} using Postgres data
-    from the SCT adventureworkslite_dbo schema.
+    Row layout: COUNT(*), then (COUNT, SUM, MIN, MAX) for every column.
     """
-    result: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
-
-    with psycopg.connect(conn_str) as conn:
-        cur = conn.cursor()
-
-        # customers.customer_id  -> customers.customerid
-        cur.execute("""
-            SELECT COUNT(customerid), SUM(customerid), MAX(customerid)
-            FROM adventureworkslite_dbo.customers;
-        """)
-        cnt, s, mx = cur.fetchone()
-        result[("customers", "customer_id")] = (
-            float(cnt or 0), float(s or 0), float(mx or 0)
+    total_rows = int(row[0])
+    result = {}
+    for n, column in enumerate(table.numeric_columns):
+        cnt, total, mn, mx = row[1 + 4 * n: 5 + 4 * n]
+        result[(table.target, column.target)] = ColumnMetrics(
+            int(cnt), total_rows - int(cnt),
+            Decimal(total) if total is not None else None, mn, mx,
         )
+    return result
 
-        # orders.order_id and orders.total_amount
-        cur.execute("""
-            SELECT
-                COUNT(orderid),    SUM(orderid),    MAX(orderid),
-                COUNT(totalamount),SUM(totalamount),MAX(totalamount)
-            FROM adventureworkslite_dbo.orders;
-        """)
-        ocnt, osum, omax, tcnt, tsum, tmax = cur.fetchone()
-        result[("orders", "order_id")] = (
-            float(ocnt or 0), float(osum or 0), float(omax or 0)
-        )
-        result[("orders", "total_amount")] = (
-            float(tcnt or 0), float(tsum or 0), float(tmax or 0)
-        )
 
-        # order_items.*  -> orderitems.*
-        cur.execute("""
-            SELECT
-                COUNT(orderitemid), SUM(orderitemid), MAX(orderitemid),
-                COUNT(quantity),     SUM(quantity),     MAX(quantity),
-                COUNT(unitprice),    SUM(unitprice),    MAX(unitprice)
-            FROM adventureworkslite_dbo.orderitems;
-        """)
-        icnt, isum, imax, qcnt, qsum, qmax, pcnt, psum, pmax = cur.fetchone()
-        result[("order_items", "order_item_id")] = (
-            float(icnt or 0), float(isum or 0), float(imax or 0)
-        )
-        result[("order_items", "quantity")] = (
-            float(qcnt or 0), float(qsum or 0), float(qmax or 0)
-        )
-        result[("order_items", "unit_price")] = (
-            float(pcnt or 0), float(psum or 0), float(pmax or 0)
-        )
+def sqlserver_table_aggregates(
+    conn: pyodbc.Connection, src_table: str, key_range: KeyRange = None,
+) -> Dict[Tuple[str, str], ColumnMetrics]:
+    """
+    One scan of the source table covering all of its numeric columns.
+    Sums are taken as DECIMAL(38,4): exact for MONEY and safe from INT overflow.
+    """
+    table = get_catalog().table(src_table)
+    exprs = ["COUNT_BIG(*)"]
+    for column in table.numeric_columns:
+        c = f"[{column.source}]"
+        exprs += [f"COUNT_BIG({c})", f"SUM(CAST({c} AS DECIMAL(38,4)))", f"MIN({c})", f"MAX({c})"]
+    sql = f"SELECT {', '.join(exprs)} FROM dbo.[{src_table}]"
+    params = ()
+    if key_range is not None:
+        sql += f" WHERE [{table.pk_src}] BETWEEN ? AND ?"
+        params = key_range
+    cur = conn.cursor()
+    cur.execute(sql, *params)
+    return _metrics_from_row(table, cur.fetchone())
+
+
+def postgres_table_aggregates(
+    conn: psycopg.Connection, src_table: str, key_range: KeyRange = None,
+) -> Dict[Tuple[str, str], ColumnMetrics]:
+    """
+    Same single scan on the mapped target table.
+    """
+    table = get_catalog().table(src_table)
+    exprs = ["COUNT(*)"]
+    for column in table.numeric_columns:
+        c = column.target
+        exprs += [f"COUNT({c})", f"SUM({c})::numeric", f"MIN({c})", f"MAX({c})"]
+    sql = f"SELECT {', '.join(exprs)} FROM {table.target}"
+    params = ()
+    if key_range is not None:
+        sql += f" WHERE {table.pk_tgt} BETWEEN %s AND %s"
+        params = key_range
+    return _metrics_from_row(table, conn.execute(sql, params).fetchone())
+
+
+def sqlserver_aggregates(conn: pyodbc.Connection) -> Dict[Tuple[str, str], ColumnMetrics]:
+    result = {}
+    for table in metric_tables():
+        result.update(sqlserver_table_aggregates(conn, table.source))
+    return result
 
-        # products.*  -> products.*
-        cur.execute("""
-            SELECT
-                COUNT(productid),     SUM(productid),     MAX(productid),
-                COUNT(price),         SUM(price),         MAX(price),
-                COUNT(stockquantity), SUM(stockquantity), MAX(stockquantity)
-            FROM adventureworkslite_dbo.products;
-        """)
-        pcnt, psum, pmax, prcnt, prsum, prmax, scnt, ssum, smax = cur.fetchone()
-        result[("products", "product_id")] = (
-            float(pcnt or 0), float(psum or 0), float(pmax or 0)
-        )
-        result[("products", "price")] = (
-            float(prcnt or 0), float(prsum or 0), float(prmax or 0)
-        )
-        result[("products", "stock_quantity")] = (
-            float(scnt or 0), float(ssum or 0), float(smax or 0)
-        )
 
+def postgres_aggregates(conn: psycopg.Connection) -> Dict[Tuple[str, str], ColumnMetrics]:
+    result = {}
+    for table in metric_tables():
+        result.update(postgres_table_aggregates(conn, table.source))
     return result
 
-def validate_metrics(sqlserver_conn: str, postgres_conn: str, tol: float = 1e-6) -> bool:
-    src = _agg_sqlserver(sqlserver_conn)
-    tgt = _agg_postgres(postgres_conn)
 
+def sqlserver_key_ranges(conn: pyodbc.Connection, partitions: int) -> Dict[str, List[KeyRange]]:
+    """
+    Split every table's PK span on the source into `partitions` ranges;
+    tables without an integer key, or with no source rows, are scanned
+    whole (a single None range).
+    """
+    cur = conn.cursor()
+    ranges: Dict[str, List[KeyRange]] = {}
+    for table in metric_tables():
+        src_table = table.source
+        if table.chunk_key is None:
+            ranges[src_table] = [None]
+            continue
+        pk = table.pk_src
+        cur.execute(f"SELECT MIN([{pk}]), MAX([{pk}]) FROM dbo.[{src_table}]")
+        lo, hi = cur.fetchone()
+        if lo is None:
+            # nothing on the source: the target may still have rows
+            ranges[src_table] = [None]
+            continue
+        step = max(1, -(-(hi - lo + 1) // partitions))
+        # the last range is open-ended so target-only rows above the source max count too
+        bounds = list(range(lo, hi + 1, step))
+        ranges[src_table] = [
+            (start, start + step - 1 if n < len(bounds) - 1 else 2 ** 63 - 1)
+            for n, start in enumerate(bounds)
+        ]
+        ranges[src_table][0] = (-(2 ** 63), ranges[src_table][0][1])
+    return ranges
+
+
+def merge_partitions(parts: List[Dict[Tuple[str, str], ColumnMetrics]]) -> Dict[Tuple[str, str], ColumnMetrics]:
+    merged: Dict[Tuple[str, str], ColumnMetrics] = {}
+    for part in parts:
+        for key, metrics in part.items():
+            merged[key] = _combine(merged[key], metrics) if key in merged else metrics
+    return merged
+
+
+def _partitioned(connections, table_aggregates, ranges, workers: int):
+    def run(src_table, key_range):
+        with connections.connection() as conn:
+            return table_aggregates(conn, src_table, key_range)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, t, r) for t, table_ranges in ranges.items() for r in table_ranges]
+        return merge_partitions([f.result() for f in futures])
+
+
+def _agg_sqlserver(connections) -> Dict[Tuple[str, str], ColumnMetrics]:
+    with connections.connection() as conn:
+        return sqlserver_aggregates(conn)
+
+
+def _agg_postgres(connections) -> Dict[Tuple[str, str], ColumnMetrics]:
+    with connections.connection() as conn:
+        return postgres_aggregates(conn)
+
+
+def validate_metrics(sqlserver_conn: str, postgres_conn: str, tol: float = 0, partitions: int = 1) -> bool:
+    """
+    Compare count, null count, exact sum, min and max of every numeric
+    column in the catalog. With partitions > 1 each table is aggregated per
+    PK range on parallel connections and the partial results are combined.
+    """
+    load_catalog(sqlserver_conn, postgres_conn)
+    size = max(partitions, 1)
+    src_pool = sqlserver_pool("validation", size, sqlserver_conn)
+    tgt_pool = PostgresPool("validation", size, postgres_conn)
+    try:
+        if partitions <= 1:
+            return compare_metrics(_agg_sqlserver(src_pool), _agg_postgres(tgt_pool), tol)
+
+        with src_pool.connection() as conn:
+            ranges = sqlserver_key_ranges(conn, partitions)
+        src = _partitioned(src_pool, sqlserver_table_aggregates, ranges, partitions)
+        tgt = _partitioned(tgt_pool, postgres_table_aggregates, ranges, partitions)
+        return compare_metrics(src, tgt, tol)
+    finally:
+        src_pool.close()
+        tgt_pool.close()
+
+
+def _differs(a, b, tol) -> bool:
+    if a is None or b is None:
+        return a is not b
+    return abs(a - b) > tol
+
+
+def compare_metrics(src, tgt, tol: float = 0) -> bool:
     ok = True
-    for key, (src_cnt, src_sum, src_max) in src.items():
-        tgt_cnt, tgt_sum, tgt_max = tgt.get(key, (0.0, 0.0, 0.0))
+    for key, src_m in src.items():
+        tgt_m = tgt.get(key, ColumnMetrics(0, 0, None, None, None))
         tbl, col = key
 
-        if (
-            abs(src_cnt - tgt_cnt) > tol
-            or abs(src_sum - tgt_sum) > tol
-            or abs(src_max - tgt_max) > tol
-        ):
+        if any(_differs(a, b, tol) for a, b in zip(src_m, tgt_m)):
             ok = False
             logger.warning(
                 "Metric mismatch %s.%s: "
-                "src(cnt=%s,sum=%s,max=%s) tgt(cnt=%s,sum=%s,max=%s)",
-                tbl, col,
-                src_cnt, src_sum, src_max,
-                tgt_cnt, tgt_sum, tgt_max,
+                "src(cnt=%s,nulls=%s,sum=%s,min=%s,max=%s) tgt(cnt=%s,nulls=%s,sum=%s,min=%s,max=%s)",
+                tbl, col, *src_m, *tgt_m,
             )
     return ok
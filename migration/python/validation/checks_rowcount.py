@@ -1,69 +1,233 @@
 import logging
-from typing import Dict, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pyodbc
 import psycopg
 
+from common.catalog import SOURCE_SCHEMA, get_catalog, load_catalog
+from common.connections import PostgresPool, sqlserver_pool
+
 logger = logging.getLogger(__name__)
 
-TABLE_MAP = {
-    "Customers": "adventureworkslite_dbo.customers",
-    "Orders": "adventureworkslite_dbo.orders",
-    "OrderItems": "adventureworkslite_dbo.orderitems",
-    "Products": "adventureworkslite_dbo.products",
-}
 
+def table_map() -> Dict[str, str]:
+    """
+    Source table -> schema-qualified target table, for every catalog table.
+    """
+    return {t.source: t.target for t in get_catalog().tables()}
 
 
-def _get_sqlserver_counts(conn_str: str) -> Dict[str, int]:
+def sqlserver_counts(conn: pyodbc.Connection) -> Dict[str, int]:
     counts = {}
-    with pyodbc.connect(conn_str) as conn:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT t.name AS table_name, SUM(p.rows) AS row_count
-            FROM sys.tables t
-            JOIN sys.partitions p ON t.object_id = p.object_id
-            WHERE p.index_id IN (0, 1)
-              AND t.schema_id = SCHEMA_ID('dbo')
-              AND t.name IN ('Customers','Orders','OrderItems','Products')
-            GROUP BY t.name;
-        """)
-        for name, row_count in cur.fetchall():
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT t.name AS table_name, SUM(p.rows) AS row_count
+        FROM sys.tables t
+        JOIN sys.partitions p ON t.object_id = p.object_id
+        WHERE p.index_id IN (0, 1)
+          AND t.schema_id = SCHEMA_ID(?)
+        GROUP BY t.name;
+    """, SOURCE_SCHEMA)
+    mapped = table_map()
+    for name, row_count in cur.fetchall():
+        if name in mapped:
             counts[name] = int(row_count)
     return counts
 
 
-def _get_postgres_counts(conn_str: str) -> Dict[str, int]:
+def postgres_counts(conn: psycopg.Connection) -> Dict[str, int]:
+    """
+    Exact COUNT(*) of every mapped table (a full scan each).
+    """
     counts = {}
-    with psycopg.connect(conn_str) as conn:
-        cur = conn.cursor()
-        # We now know exact table names; just count them directly
-        for tbl in [
-            "adventureworkslite_dbo.customers",
-            "adventureworkslite_dbo.orders",
-            "adventureworkslite_dbo.orderitems",
-            "adventureworkslite_dbo.products",
-        ]:
-            cur.execute(f"SELECT COUNT(*) FROM {tbl};")
-            (row_count,) = cur.fetchone()
-            counts[tbl] = int(row_count)
+    cur = conn.cursor()
+    for tbl in table_map().values():
+        cur.execute(f"SELECT COUNT(*) FROM {tbl};")
+        (row_count,) = cur.fetchone()
+        counts[tbl] = int(row_count)
     return counts
 
 
-def validate_rowcounts(sqlserver_conn: str, postgres_conn: str) -> Tuple[bool, Dict[str, Tuple[int, int]]]:
+def postgres_estimates(conn: psycopg.Connection) -> Dict[str, int]:
+    """
+    Row counts from the statistics: n_live_tup (kept current by every
+    insert/delete) or, when that is missing or still 0 (stats reset, or
+    not collected yet right after a load), reltuples from the last
+    ANALYZE. Metadata only, no table is read.
+    """
+    rows = conn.execute("""
+        SELECT n.nspname || '.' || c.relname,
+               COALESCE(NULLIF(s.n_live_tup, 0), GREATEST(c.reltuples, 0)::bigint)
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE c.oid = ANY(%s::regclass[])
+    """, (list(table_map().values()),)).fetchall()
+    return {tbl: int(n) for tbl, n in rows}
+
+
+def sqlserver_key_bounds(conn: pyodbc.Connection, src_table: str) -> Tuple[Any, Any]:
+    cur = conn.cursor()
+    pk = get_catalog().table(src_table).pk_src
+    cur.execute(f"SELECT MIN([{pk}]), MAX([{pk}]) FROM dbo.[{src_table}]")
+    return tuple(cur.fetchone())
+
+
+def postgres_key_bounds(conn: psycopg.Connection, src_table: str) -> Tuple[Any, Any]:
+    table = get_catalog().table(src_table)
+    return tuple(conn.execute(f"SELECT MIN({table.pk_tgt}), MAX({table.pk_tgt}) FROM {table.target}").fetchone())
+
+
+def sqlserver_exact_count(conn: pyodbc.Connection, src_table: str, lo: Optional[int], hi: Optional[int]) -> int:
+    """
+    COUNT_BIG(*) of one PK range, or of the whole table when lo is None.
+    """
+    cur = conn.cursor()
+    sql = f"SELECT COUNT_BIG(*) FROM dbo.[{src_table}]"
+    if lo is None:
+        cur.execute(sql)
+    else:
+        pk = get_catalog().table(src_table).pk_src
+        cur.execute(f"{sql} WHERE [{pk}] BETWEEN ? AND ?", lo, hi)
+    return int(cur.fetchone()[0])
+
+
+def postgres_exact_count(conn: psycopg.Connection, src_table: str, lo: Optional[int], hi: Optional[int]) -> int:
+    table = get_catalog().table(src_table)
+    if lo is None:
+        return int(conn.execute(f"SELECT COUNT(*) FROM {table.target}").fetchone()[0])
+    sql = f"SELECT COUNT(*) FROM {table.target} WHERE {table.pk_tgt} BETWEEN %s AND %s"
+    return int(conn.execute(sql, (lo, hi)).fetchone()[0])
+
+
+def key_ranges(lo: int, hi: int, partitions: int) -> List[Tuple[int, int]]:
+    step = max(1, -(-(hi - lo + 1) // max(partitions, 1)))
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+
+# fn(conn, *args) -> Future running fn on a connection of one side
+Submit = Callable[..., Future]
+
+
+def exact_counts(
+    on_source: Submit, on_target: Submit, src_tables: List[str], partitions: int,
+) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Exact counts of `src_tables` on both sides, each table with an integer
+    key split into `partitions` PK ranges counted concurrently. The ranges
+    span the keys of both sides, so rows that exist on one side only are
+    counted too. Tables without such a key get one whole-table count.
+    """
+    catalog = get_catalog()
+    keyed = [t for t in src_tables if catalog.table(t).chunk_key is not None]
+    bounds = {
+        t: (on_source(sqlserver_key_bounds, t), on_target(postgres_key_bounds, t))
+        for t in keyed
+    }
+    futures = {}
+    for src_table in src_tables:
+        if src_table not in bounds:
+            ranges = [(None, None)]
+        else:
+            src_f, tgt_f = bounds[src_table]
+            found = [v for v in src_f.result() + tgt_f.result() if v is not None]
+            ranges = key_ranges(min(found), max(found), partitions) if found else []
+        futures[src_table] = (
+            [on_source(sqlserver_exact_count, src_table, lo, hi) for lo, hi in ranges],
+            [on_target(postgres_exact_count, src_table, lo, hi) for lo, hi in ranges],
+        )
+    src = {t: sum(f.result() for f in src_fs) for t, (src_fs, _) in futures.items()}
+    mapped = table_map()
+    tgt = {mapped[t]: sum(f.result() for f in tgt_fs) for t, (_, tgt_fs) in futures.items()}
+    return src, tgt
+
+
+def tiered_counts(
+    on_source: Submit, on_target: Submit, partitions: int, tolerance: float = 0.0,
+) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Compare catalog counts first (sys.partitions vs pg statistics) and
+    count exactly only the tables whose estimates differ by more than
+    `tolerance` (a fraction of the source count).
+    """
+    src_f, tgt_f = on_source(sqlserver_counts), on_target(postgres_estimates)
+    src, tgt = src_f.result(), tgt_f.result()
+
+    recount = []
+    for src_table, tgt_table in table_map().items():
+        src_n, tgt_n = src.get(src_table), tgt.get(tgt_table)
+        if src_n is None or tgt_n is None or abs(src_n - tgt_n) > tolerance * max(src_n, 1):
+            recount.append(src_table)
+    if recount:
+        logger.info("Rowcount: estimates differ for %s, counting exactly", ", ".join(recount))
+        exact_src, exact_tgt = exact_counts(on_source, on_target, recount, partitions)
+        src.update(exact_src)
+        tgt.update(exact_tgt)
+    return src, tgt
+
+
+def count_rows(
+    on_source: Submit, on_target: Submit, mode: str = "tiered", partitions: int = 4, tolerance: float = 0.0,
+) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Source and target counts by mode: "estimate" (catalog only),
+    "tiered" (catalog, exact where they disagree) or "exact".
+    """
+    if mode == "exact":
+        return exact_counts(on_source, on_target, list(table_map()), partitions)
+    if mode == "tiered":
+        return tiered_counts(on_source, on_target, partitions, tolerance)
+    if mode == "estimate":
+        src_f, tgt_f = on_source(sqlserver_counts), on_target(postgres_estimates)
+        return src_f.result(), tgt_f.result()
+    raise ValueError(f"Unknown rowcount mode {mode!r}")
+
+
+def _submitter(pool: ThreadPoolExecutor, connections) -> Submit:
+    """
+    Submit that runs fn on a connection borrowed from `connections` (a
+    common.connections pool), like ValidationRunner._on_source.
+    """
+    def submit(fn, *args):
+        def run():
+            with connections.connection() as conn:
+                return fn(conn, *args)
+        return pool.submit(run)
+    return submit
+
+
+def validate_rowcounts(
+    sqlserver_conn: str,
+    postgres_conn: str,
+    mode: str = "tiered",
+    partitions: int = 4,
+) -> Tuple[bool, Dict[str, Tuple[int, int]]]:
     """
     Return (ok, details) where details[table] = (src_count, tgt_count),
-    using TABLE_MAP to relate SQL Server table names to PostgreSQL names.
+    using the catalog to relate SQL Server table names to PostgreSQL names.
     """
-    src = _get_sqlserver_counts(sqlserver_conn)
-    tgt = _get_postgres_counts(postgres_conn)
+    load_catalog(sqlserver_conn, postgres_conn)
+    size = max(partitions, 1)
+    src_pool = sqlserver_pool("validation", size, sqlserver_conn)
+    tgt_pool = PostgresPool("validation", size, postgres_conn)
+    try:
+        with ThreadPoolExecutor(max_workers=2 * size) as pool:
+            src, tgt = count_rows(_submitter(pool, src_pool), _submitter(pool, tgt_pool), mode, partitions)
+    finally:
+        src_pool.close()
+        tgt_pool.close()
+    return compare_rowcounts(src, tgt)
+
 
+def compare_rowcounts(src: Dict[str, int], tgt: Dict[str, int]) -> Tuple[bool, Dict[str, Tuple[int, int]]]:
     all_ok = True
     details: Dict[str, Tuple[int, int]] = {}
+    mapped = table_map()
 
     # Compare mapped tables
     for src_table, src_count in src.items():
-        tgt_table = TABLE_MAP.get(src_table)
+        tgt_table = mapped.get(src_table)
         tgt_count = tgt.get(tgt_table, 0) if tgt_table else 0
         key = tgt_table or src_table
         details[key] = (src_count, tgt_count)
@@ -76,7 +240,7 @@ def validate_rowcounts(sqlserver_conn: str, postgres_conn: str) -> Tuple[bool, D
 
     # Tables only in Postgres (among mapped targets)
     for tgt_table, tgt_count in tgt.items():
-        if tgt_table not in TABLE_MAP.values():
+        if tgt_table not in mapped.values():
             continue
         if tgt_table not in details:
             details[tgt_table] = (0, tgt_count)
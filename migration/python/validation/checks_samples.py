@@ -1,77 +1,198 @@
 import logging
 import random
-from typing import Dict, Any, List
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 import pyodbc
 import psycopg
 
+from common import columnar
+from common.catalog import get_catalog, load_catalog
+from common.connections import connect_postgres, connect_sqlserver
+from validation.normalize import compare_rows
+
 logger = logging.getLogger(__name__)
 
-TABLE_KEY_MAP = {
-    # source_table -> (target_table, pk_source, pk_target)
-    "Customers": ("adventureworkslite_dbo.customers", "CustomerID", "customerid"),
-    "Orders": ("adventureworkslite_dbo.orders", "OrderID", "orderid"),
-    "OrderItems": ("adventureworkslite_dbo.orderitems", "OrderItemID", "orderitemid"),
-    "Products": ("adventureworkslite_dbo.products", "ProductID", "productid"),
-}
+
+# SQL Server allows 2100 parameters per statement
+SOURCE_BATCH = 1000
+
+
+def _batches(values: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _key_bounds(cur: pyodbc.Cursor, table: str, pk_col: str) -> Tuple[Any, Any, Optional[int]]:
+    """
+    MIN/MAX of the clustered PK (two index seeks) and the row count from
+    sys.partitions metadata; nothing here scans the table.
+    """
+    cur.execute(f"""
+        SELECT MIN([{pk_col}]), MAX([{pk_col}]),
+               (SELECT SUM(p.rows) FROM sys.partitions p
+                WHERE p.object_id = OBJECT_ID(?) AND p.index_id IN (0, 1))
+        FROM dbo.[{table}]
+    """, f"dbo.{table}")
+    lo, hi, rows = cur.fetchone()
+    return lo, hi, int(rows) if rows is not None else None
+
+
+def _probe(cur: pyodbc.Cursor, table: str, pk_col: str, probes: List[int]) -> List[Any]:
+    """
+    For each random probe value, the first existing key at or above it.
+    One statement per batch; every probe is a single index seek.
+    """
+    values = ", ".join("(?)" for _ in probes)
+    cur.execute(f"""
+        SELECT DISTINCT k.pk
+        FROM (VALUES {values}) AS v(probe)
+        CROSS APPLY (
+            SELECT TOP 1 [{pk_col}] AS pk FROM dbo.[{table}]
+            WHERE [{pk_col}] >= v.probe ORDER BY [{pk_col}]
+        ) k
+    """, *probes)
+    return [row[0] for row in cur.fetchall()]
 
 
 def _pick_random_ids(cur: pyodbc.Cursor, table: str, pk_col: str, sample_size: int) -> List[Any]:
-    cur.execute(f"SELECT [{pk_col}] FROM dbo.[{table}];")
-    ids = [row[0] for row in cur.fetchall()]
-    if not ids:
+    """
+    Random PK-range probes between MIN and MAX of the key. Keys that follow
+    a gap in the sequence are slightly more likely to be picked, which is
+    fine for spot checks. Small tables just read all their keys.
+    """
+    lo, hi, rows = _key_bounds(cur, table, pk_col)
+    if lo is None or sample_size <= 0:
         return []
-    if len(ids) <= sample_size:
-        return ids
-    return random.sample(ids, sample_size)
+    if rows is None or rows <= 2 * sample_size:
+        cur.execute(f"SELECT [{pk_col}] FROM dbo.[{table}];")
+        ids = [row[0] for row in cur.fetchall()]
+        return ids if len(ids) <= sample_size else random.sample(ids, sample_size)
 
+    picked: Set[Any] = set()
+    for _ in range(5):  # collisions are rare; a few rounds top the sample up
+        missing = sample_size - len(picked)
+        if missing <= 0:
+            break
+        probes = [random.randint(lo, hi) for _ in range(missing + missing // 10 + 1)]
+        for batch in _batches(probes, SOURCE_BATCH):
+            picked.update(_probe(cur, table, pk_col, batch))
+    ids = sorted(picked)
+    return ids if len(ids) <= sample_size else random.sample(ids, sample_size)
 
-def validate_samples(
-    sqlserver_conn: str,
-    postgres_conn: str,
-    sample_size: int = 3,
+
+def pick_sample_ids(src_conn: pyodbc.Connection, sample_size: int) -> Dict[str, List[Any]]:
+    cur = src_conn.cursor()
+    return {
+        table.source: _pick_random_ids(cur, table.source, table.pk_src, sample_size)
+        for table in get_catalog().keyed_tables()
+    }
+
+
+def _source_columns(src_table: str) -> str:
+    table = get_catalog().table(src_table)
+    return ", ".join(f"[{c}]" for c in [table.pk_src] + [c.source for c in table.compared_columns])
+
+
+def _target_columns(src_table: str) -> str:
+    table = get_catalog().table(src_table)
+    return ", ".join([table.pk_tgt] + [c.target for c in table.compared_columns])
+
+
+def _columnar_rows(sql: str, params: List[Any], conn_str: str) -> Iterator[Tuple[Any, ...]]:
+    result = columnar.read_table(sql, params, "validation", conn_str)
+    return zip(*(column.to_pylist() for column in result.columns))
+
+
+def fetch_source_rows(
+    src_conn: pyodbc.Connection,
+    ids_by_table: Dict[str, List[Any]],
+    columnar_conn: Optional[str] = None,
+) -> Dict[Tuple[str, Any], Any]:
+    """
+    Sampled rows as (pk, *compared columns), in catalog column order. With
+    columnar_conn (a SQL Server connection string) they are read through
+    common.columnar instead of src_conn.
+    """
+    cur = src_conn.cursor()
+    rows = {}
+    for src_table, ids in ids_by_table.items():
+        pk_src = get_catalog().table(src_table).pk_src
+        for batch in _batches(ids, SOURCE_BATCH):
+            placeholders = ", ".join("?" for _ in batch)
+            sql = f"SELECT {_source_columns(src_table)} FROM dbo.[{src_table}] WHERE [{pk_src}] IN ({placeholders})"
+            if columnar_conn is not None:
+                fetched = _columnar_rows(sql, batch, columnar_conn)
+            else:
+                cur.execute(sql, *batch)
+                fetched = cur.fetchall()
+            for row in fetched:
+                rows[(src_table, row[0])] = row
+    return rows
+
+
+def fetch_target_rows(tgt_conn: psycopg.Connection, ids_by_table: Dict[str, List[Any]]) -> Dict[Tuple[str, Any], Any]:
+    cur = tgt_conn.cursor()
+    rows = {}
+    for src_table, ids in ids_by_table.items():
+        if not ids:
+            continue
+        table = get_catalog().table(src_table)
+        cur.execute(
+            f"SELECT {_target_columns(src_table)} FROM {table.target} WHERE {table.pk_tgt} = ANY(%s)", (list(ids),),
+        )
+        for row in cur.fetchall():
+            rows[(src_table, row[0])] = row
+    return rows
+
+
+def compare_samples(
+    ids_by_table: Dict[str, List[Any]],
+    src_rows: Dict[Tuple[str, Any], Any],
+    tgt_rows: Dict[Tuple[str, Any], Any],
 ) -> bool:
     """
-    Randomly sample PKs on SQL Server and compare full rows with Postgres.
+    Compare the sampled rows of each table in one batch, normalizing
+    driver types per column kind (see validation.normalize).
     """
     ok = True
+    for src_table, ids in ids_by_table.items():
+        if not ids:
+            logger.info("Sampling: table %s has no rows, skipping", src_table)
+            continue
 
-    with pyodbc.connect(sqlserver_conn) as src_conn, psycopg.connect(postgres_conn) as tgt_conn:
-        src_cur = src_conn.cursor()
-        tgt_cur = tgt_conn.cursor()
-
-        for src_table, (tgt_table, pk_src, pk_tgt) in TABLE_KEY_MAP.items():
-            ids = _pick_random_ids(src_cur, src_table, pk_src, sample_size)
-            if not ids:
-                logger.info("Sampling: table %s has no rows, skipping", src_table)
-                continue
-
-            for pk_val in ids:
-                # fetch source row
-                src_cur.execute(f"SELECT * FROM dbo.[{src_table}] WHERE [{pk_src}] = ?", pk_val)
-                src_row = src_cur.fetchone()
-
-                # fetch target row
-                tgt_cur.execute(
-                    f'SELECT * FROM {tgt_table} WHERE {pk_tgt} = %s',
-                    (pk_val,),
+        table = get_catalog().table(src_table)
+        mismatches = compare_rows(
+            table.pk_tgt,
+            [(c.target, c.kind) for c in table.compared_columns],
+            [src_rows[(src_table, pk)] for pk in ids if (src_table, pk) in src_rows],
+            [tgt_rows[(src_table, pk)] for pk in ids if (src_table, pk) in tgt_rows],
+        )
+        for m in mismatches:
+            ok = False
+            if m.kind == "changed":
+                logger.warning(
+                    "Sampling mismatch for %s id=%s column %s: src=%r tgt=%r",
+                    src_table, m.pk, m.column, m.source, m.target,
                 )
-                tgt_row = tgt_cur.fetchone()
-
-                if src_row is None or tgt_row is None:
-                    ok = False
-                    logger.warning(
-                        "Sampling mismatch for %s id=%s: src_row=%s tgt_row=%s",
-                        src_table, pk_val, bool(src_row), bool(tgt_row),
-                    )
-                    continue
-
-                # compare by position (schemas already aligned in bulk_migrate)
-                if tuple(src_row) != tuple(tgt_row):
-                    ok = False
-                    logger.warning(
-                        "Sampling mismatch for %s id=%s: src=%s tgt=%s",
-                        src_table, pk_val, tuple(src_row), tuple(tgt_row),
-                    )
+            else:
+                logger.warning("Sampling mismatch for %s id=%s: %s", src_table, m.pk, m.kind)
 
     return ok
+
+
+def validate_samples(
+    sqlserver_conn: str,
+    postgres_conn: str,
+    sample_size: int = 3,
+) -> bool:
+    """
+    Randomly sample PKs on SQL Server and compare full rows with Postgres,
+    fetching the sampled rows in batches on both sides.
+    """
+    load_catalog(sqlserver_conn, postgres_conn)
+    with connect_sqlserver("validation", sqlserver_conn) as src_conn, \
+            connect_postgres("validation", postgres_conn) as tgt_conn:
+        ids_by_table = pick_sample_ids(src_conn, sample_size)
+        src_rows = fetch_source_rows(src_conn, ids_by_table)
+        tgt_rows = fetch_target_rows(tgt_conn, ids_by_table)
+    return compare_samples(ids_by_table, src_rows, tgt_rows)
@@ -1,25 +1,41 @@
 import os
 from dataclasses import dataclass
+from typing import Optional
+
+from common.settings import load_settings
 
 @dataclass
 class DbConfig:
     sqlserver_conn: str
     postgres_conn: str
     sample_size: int
+    hash_diff: bool
+    max_connections: int
+    metric_partitions: int
+    rowcount_mode: str
+    fetch: str
 
-def load_config() -> DbConfig:
-    sqlserver_conn = os.environ.get(
-        "SRC_SQLSERVER_CONN_STR",
-        "Driver={ODBC Driver 18 for SQL Server};Server=localhost,1433;Database=AdventureWorksLite;Uid=sa;Pwd=MigrationLab123!;Encrypt=yes;TrustServerCertificate=yes;",
-    )
-    postgres_conn = os.environ.get(
-        "TGT_POSTGRES_CONN_STR",
-        "host=localhost port=5432 dbname=migration_target user=postgres password=MigrationLab123!",
-    )
+def load_config(env: Optional[str] = None) -> DbConfig:
+    # Connection strings come from the shared settings (env vars, envs/<env>.yaml)
+    settings = load_settings(env)
+    sqlserver_conn = settings.sqlserver_conn
+    postgres_conn = settings.postgres_conn
     sample_size = int(os.environ.get("VALIDATION_SAMPLE_SIZE", "50"))
+    hash_diff = os.environ.get("VALIDATION_HASH_DIFF", "1") == "1"
+    max_connections = int(os.environ.get("VALIDATION_MAX_CONNECTIONS", "4"))
+    metric_partitions = int(os.environ.get("VALIDATION_METRIC_PARTITIONS", "1"))
+    # estimate | tiered | exact
+    rowcount_mode = os.environ.get("VALIDATION_ROWCOUNT_MODE", "tiered")
+    # rows | arrow (source reads through arrow-odbc when it is installed)
+    fetch = os.environ.get("VALIDATION_FETCH", "rows")
 
     return DbConfig(
         sqlserver_conn=sqlserver_conn,
         postgres_conn=postgres_conn,
         sample_size=sample_size,
+        hash_diff=hash_diff,
+        max_connections=max_connections,
+        metric_partitions=metric_partitions,
+        rowcount_mode=rowcount_mode,
+        fetch=fetch,
     )
@@ -0,0 +1,118 @@
+"""
+Type-normalizing comparison of source and target rows.
+
+pyodbc and psycopg return different Python values for the same data:
+MONEY arrives as Decimal with SQL Server's scale, NUMERIC(19,4) with
+Postgres', DATETIME has 1/300 s resolution while timestamp keeps
+microseconds, and NVARCHAR vs VARCHAR can differ in trailing padding.
+Rows are loaded into DataFrames indexed by PK, every column is normalized
+by its kind ("int", "money", "datetime", "text" -- derived from the
+source data type in common.catalog) and then compared column-at-a-time.
+"""
+
+from decimal import Decimal
+from typing import Any, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+MONEY_SCALE = 4
+
+# float64 holds integers exactly up to 2**53, so scaled money values below
+# this bound survive the float round trip; larger columns compare as Decimal.
+_FLOAT_EXACT = 2 ** 53 / 10 ** MONEY_SCALE
+
+# DATETIME ticks are rounded to .000/.003/.007 s; anything within one
+# rounding step is the same instant.
+DATETIME_TOLERANCE = pd.Timedelta(milliseconds=2)
+
+
+class RowMismatch(NamedTuple):
+    pk: Any
+    kind: str  # "missing_in_target", "missing_in_source" or "changed"
+    column: Optional[str] = None
+    source: Any = None
+    target: Any = None
+
+
+def _money(series: pd.Series) -> pd.Series:
+    values = pd.to_numeric(series, errors="coerce")
+    if values.abs().max() >= _FLOAT_EXACT:
+        quantum = Decimal(1).scaleb(-MONEY_SCALE)
+        return series.map(lambda v: None if v is None else Decimal(v).quantize(quantum))
+    return np.rint(values * 10 ** MONEY_SCALE).astype("Int64")
+
+
+def _datetime(series: pd.Series) -> pd.Series:
+    return pd.to_datetime(series)
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.astype("string").str.rstrip(" ")
+
+
+def _int(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series).astype("Int64")
+
+
+NORMALIZERS = {
+    "int": _int,
+    "money": _money,
+    "datetime": _datetime,
+    "text": _text,
+}
+
+
+def normalize_frame(frame: pd.DataFrame, columns: Sequence[Tuple[str, str]]) -> pd.DataFrame:
+    """
+    Return a copy of `frame` with every (column, kind) normalized.
+    """
+    return frame.assign(**{col: NORMALIZERS[kind](frame[col]) for col, kind in columns})
+
+
+def equal_mask(kind: str, a: pd.Series, b: pd.Series) -> pd.Series:
+    """
+    Element-wise equality after normalization; two NULLs are equal.
+    """
+    both_null = a.isna().to_numpy() & b.isna().to_numpy()
+    same = (a - b).abs() <= DATETIME_TOLERANCE if kind == "datetime" else a == b
+    return pd.Series(same.fillna(False).to_numpy(dtype=bool) | both_null, index=a.index)
+
+
+def to_frame(rows: Iterable[Sequence[Any]], pk: str, columns: Sequence[Tuple[str, str]]) -> pd.DataFrame:
+    """
+    Rows laid out as (pk, *columns) -> DataFrame indexed by pk. Object
+    dtype keeps the driver's values untouched until they are normalized.
+    """
+    names = [pk] + [col for col, _ in columns]
+    frame = pd.DataFrame.from_records([tuple(row) for row in rows], columns=names)
+    return frame.astype(object).set_index(pk)
+
+
+def compare_rows(
+    pk: str,
+    columns: Sequence[Tuple[str, str]],
+    src_rows: Iterable[Sequence[Any]],
+    tgt_rows: Iterable[Sequence[Any]],
+) -> List[RowMismatch]:
+    """
+    Compare two batches of rows laid out as (pk, *columns) in the same
+    column order. Returns one entry per missing row and per differing cell,
+    reporting the values as the drivers returned them.
+    """
+    src = to_frame(src_rows, pk, columns)
+    tgt = to_frame(tgt_rows, pk, columns)
+
+    mismatches = [RowMismatch(k, "missing_in_target") for k in src.index.difference(tgt.index)]
+    mismatches += [RowMismatch(k, "missing_in_source") for k in tgt.index.difference(src.index)]
+
+    common = src.index.intersection(tgt.index)
+    src, tgt = src.loc[common], tgt.loc[common]
+    # normalized together so both sides always get the same representation
+    both = normalize_frame(pd.concat([src, tgt]), columns)
+    src_norm, tgt_norm = both.iloc[:len(common)], both.iloc[len(common):]
+    for col, kind in columns:
+        differs = ~equal_mask(kind, src_norm[col], tgt_norm[col])
+        for k in common[differs.to_numpy()]:
+            mismatches.append(RowMismatch(k, "changed", col, src.at[k, col], tgt.at[k, col]))
+    return sorted(mismatches, key=lambda m: (m.pk, m.column or ""))
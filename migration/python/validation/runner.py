@@ -0,0 +1,140 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from common import columnar, metrics
+from common.catalog import load_catalog
+from common.connections import PostgresPool, sqlserver_pool
+from validation.checks_hash import diff_table_on, report_diffs
+from validation.checks_metrics import (
+    compare_metrics,
+    merge_partitions,
+    metric_tables,
+    postgres_table_aggregates,
+    sqlserver_key_ranges,
+    sqlserver_table_aggregates,
+)
+from validation.checks_rowcount import compare_rowcounts, count_rows
+from validation.checks_samples import compare_samples, fetch_source_rows, fetch_target_rows, pick_sample_ids
+from validation.config import DbConfig
+
+logger = logging.getLogger(__name__)
+
+
+class CheckResult(NamedTuple):
+    name: str
+    ok: bool
+    seconds: float
+    details: Any = None
+
+
+class ValidationRunner:
+    """
+    Runs the source-side and target-side queries of every check at the same
+    time on two bounded connection pools, so a validation run takes about
+    as long as its slowest query instead of the sum of all of them.
+
+    Checks are orchestrated on their own threads; the queries themselves go
+    through the I/O pool, which is sized to the connection pools.
+    """
+
+    def __init__(self, cfg: DbConfig):
+        self._cfg = cfg
+        # Introspected once (or read from the fingerprinted cache); every
+        # check below takes its tables and columns from it.
+        self._catalog = load_catalog(cfg.sqlserver_conn, cfg.postgres_conn)
+        size = cfg.max_connections
+        self._src_pool = sqlserver_pool("validation", size, cfg.sqlserver_conn)
+        self._tgt_pool = PostgresPool("validation", size, cfg.postgres_conn)
+        self._io = ThreadPoolExecutor(max_workers=2 * size, thread_name_prefix="validation-io")
+        # Source reads of the sample and hash checks go through arrow-odbc
+        # when asked for and installed; None keeps them on the pyodbc pool.
+        self._columnar_conn = None
+        if cfg.fetch == "arrow":
+            if columnar.available():
+                self._columnar_conn = cfg.sqlserver_conn
+            else:
+                logger.warning("VALIDATION_FETCH=arrow but arrow-odbc/pyarrow are not installed, using pyodbc")
+
+    def _on_source(self, fn: Callable, *args):
+        def run():
+            with self._src_pool.connection() as conn:
+                with metrics.span("validation.query", side="source", query=fn.__name__):
+                    return fn(conn, *args)
+        return self._io.submit(run)
+
+    def _on_target(self, fn: Callable, *args):
+        def run():
+            with self._tgt_pool.connection() as conn:
+                with metrics.span("validation.query", side="target", query=fn.__name__):
+                    return fn(conn, *args)
+        return self._io.submit(run)
+
+    def check_rowcounts(self):
+        cfg = self._cfg
+        src, tgt = count_rows(self._on_source, self._on_target, cfg.rowcount_mode, cfg.max_connections)
+        return compare_rowcounts(src, tgt)
+
+    def check_metrics(self):
+        # One scan per table and side, or per PK range when partitioned.
+        partitions = self._cfg.metric_partitions
+        if partitions > 1:
+            ranges = self._on_source(sqlserver_key_ranges, partitions).result()
+        else:
+            ranges = {t.source: [None] for t in metric_tables()}
+        tasks = [(t, r) for t, table_ranges in ranges.items() for r in table_ranges]
+        src = [self._on_source(sqlserver_table_aggregates, t, r) for t, r in tasks]
+        tgt = [self._on_target(postgres_table_aggregates, t, r) for t, r in tasks]
+        return compare_metrics(
+            merge_partitions([f.result() for f in src]),
+            merge_partitions([f.result() for f in tgt]),
+        ), None
+
+    def check_samples(self):
+        ids_by_table = self._on_source(pick_sample_ids, self._cfg.sample_size).result()
+        src = self._on_source(fetch_source_rows, ids_by_table, self._columnar_conn)
+        tgt = self._on_target(fetch_target_rows, ids_by_table)
+        return compare_samples(ids_by_table, src.result(), tgt.result()), None
+
+    def check_hashes(self):
+        # One task per table; each holds a source and a target connection
+        # and runs its two bucket scans concurrently on a side thread.
+        tables = [t.source for t in self._catalog.keyed_tables()]
+        with ThreadPoolExecutor(max_workers=max(len(tables), 1)) as sides:
+            def diff(src_table):
+                with self._src_pool.connection() as src_conn, self._tgt_pool.connection() as tgt_conn:
+                    with metrics.span("validation.query", side="both", query="diff_table_on"):
+                        return diff_table_on(
+                            src_conn, tgt_conn, src_table, executor=sides, columnar_conn=self._columnar_conn,
+                        )
+
+            futures = {t: self._io.submit(diff, t) for t in tables}
+            results = [report_diffs(t, f.result()) for t, f in futures.items()]
+        return all(results), None
+
+    def run(self) -> List[CheckResult]:
+        checks: Dict[str, Callable] = {
+            "rowcount": self.check_rowcounts,
+            "metrics": self.check_metrics,
+            "samples": self.check_samples,
+        }
+        if self._cfg.hash_diff:
+            checks["hashes"] = self.check_hashes
+
+        def timed(name, fn):
+            started = time.perf_counter()
+            with metrics.span("validation.check", check=name):
+                ok, details = fn()
+            return CheckResult(name, ok, time.perf_counter() - started, details)
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix="validation-check") as pool:
+                futures = [pool.submit(timed, name, fn) for name, fn in checks.items()]
+                return [f.result() for f in futures]
+        finally:
+            self._io.shutdown()
+            self._src_pool.close()
+            self._tgt_pool.close()
+            for pool in (self._src_pool, self._tgt_pool):
+                logger.info("Connections %s", pool.metrics.summary())
@@ -0,0 +1,32 @@
+from collections import namedtuple
+
+from cdc.coalesce import Coalescer
+
+Record = namedtuple("Record", "topic key value")
+
+TOPIC = "migrationlab-sqlserver.AdventureWorksLite.dbo.Customers"
+
+
+def _event(key, op, name=None):
+    row = {"CustomerID": key, "FirstName": name}
+    return Record(TOPIC, str(key).encode(), {"payload": {"op": op, "before": row, "after": row}})
+
+
+def test_updates_collapse_to_last_state():
+    records = [_event(1, "c", "a"), _event(1, "u", "b"), _event(1, "u", "c")]
+    coalescer = Coalescer()
+    out = coalescer.compact(records)
+    assert [r.value["payload"]["after"]["FirstName"] for r in out] == ["c"]
+    assert coalescer.ratio == 3.0
+
+
+def test_insert_then_delete_keeps_the_delete():
+    # the insert may have been applied before a replay: the delete must still run
+    out = Coalescer().compact([_event(1, "c"), _event(1, "u"), _event(1, "d")])
+    assert [(r.key, r.value["payload"]["op"]) for r in out] == [(b"1", "d")]
+
+
+def test_delete_of_preexisting_row_is_kept_after_other_keys():
+    records = [_event(1, "u"), _event(2, "c"), _event(1, "d")]
+    out = Coalescer().compact(records)
+    assert [(r.key, r.value["payload"]["op"]) for r in out] == [(b"2", "c"), (b"1", "d")]
@@ -0,0 +1,73 @@
+from collections import namedtuple
+
+from cdc.ordering import FkOrder, fk_order, fk_phases, table_depths
+from common.catalog import build_catalog
+
+from test_common_catalog import FOREIGN_KEYS, SOURCE_COLUMNS, TARGET_COLUMNS
+
+Record = namedtuple("Record", "topic key value")
+
+PREFIX = "migrationlab-sqlserver.AdventureWorksLite.dbo"
+DEPTHS = {"Customers": 0, "Orders": 1, "OrderItems": 2}
+ORDER = FkOrder(DEPTHS, {"Customers": ["Orders"], "Orders": ["OrderItems"]})
+
+
+def _event(table, key, op, **after):
+    return Record(f"{PREFIX}.{table}", str(key).encode(), {"payload": {"op": op, "after": {"id": key, **after}}})
+
+
+def _table(topic):
+    return topic.rsplit(".", 1)[-1]
+
+
+def _phases(records):
+    return [
+        [(_table(r.topic), int(r.key), r.value["payload"]["op"]) for r in phase]
+        for phase in fk_phases(records, ORDER, _table)
+    ]
+
+
+def test_depths_follow_foreign_keys():
+    catalog = build_catalog(SOURCE_COLUMNS, FOREIGN_KEYS, TARGET_COLUMNS, rules={})
+    assert table_depths(catalog) == DEPTHS
+    assert fk_order(catalog) == ORDER
+
+
+def test_children_are_inserted_after_and_deleted_before_their_parents():
+    records = [
+        _event("OrderItems", 10, "c"), _event("Orders", 5, "c"), _event("Customers", 1, "c"),
+        _event("Customers", 2, "d"), _event("Orders", 6, "d"), _event("OrderItems", 11, "d"),
+    ]
+    assert _phases(records) == [
+        [("OrderItems", 11, "d")], [("Orders", 6, "d")], [("Customers", 2, "d")],
+        [("Customers", 1, "c")], [("Orders", 5, "c")], [("OrderItems", 10, "c")],
+    ]
+
+
+def test_a_deleted_row_frees_its_unique_values_before_the_inserts():
+    records = [
+        _event("Orders", 5, "d"), _event("Customers", 1, "d", email="a@example.com"),
+        _event("Customers", 2, "c", email="a@example.com"), _event("Orders", 6, "c"),
+    ]
+    assert _phases(records) == [
+        [("Orders", 5, "d")], [("Customers", 1, "d")], [("Customers", 2, "c")], [("Orders", 6, "c")],
+    ]
+
+
+def test_parent_deletes_wait_for_children_moved_off_them():
+    records = [
+        _event("Customers", 2, "c"), _event("Orders", 5, "u"), _event("Customers", 1, "d"),
+        _event("OrderItems", 10, "d"),
+    ]
+    assert _phases(records) == [
+        [("OrderItems", 10, "d")], [("Customers", 2, "c")], [("Orders", 5, "u")], [("Customers", 1, "d")],
+    ]
+
+
+def test_each_row_is_applied_once_with_its_last_event():
+    records = [
+        _event("Orders", 5, "c"), _event("Orders", 5, "d"),
+        Record(f"{PREFIX}.Orders", b"5", None),  # tombstone after the delete
+        _event("Customers", 1, "d"), _event("Customers", 1, "c"),
+    ]
+    assert _phases(records) == [[("Orders", 5, "d")], [("Customers", 1, "c")]]
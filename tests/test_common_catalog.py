@@ -0,0 +1,60 @@
+from common.catalog import TARGET_SCHEMA, Catalog, TableRule, build_catalog
+
+SOURCE_COLUMNS = [
+    ("OrderItems", "OrderItemID", "int", "NO", 1, 1),
+    ("OrderItems", "OrderID", "int", "NO", 0, None),
+    ("OrderItems", "UnitPrice", "money", "NO", 0, None),
+    ("Orders", "OrderID", "int", "NO", 1, 1),
+    ("Orders", "CustomerID", "int", "NO", 0, None),
+    ("Orders", "OrderDate", "datetime", "YES", 0, None),
+    ("Orders", "RowVer", "timestamp", "NO", 0, None),
+    ("Customers", "CustomerID", "int", "NO", 1, 1),
+    ("Customers", "Email", "nvarchar", "YES", 0, None),
+    ("systranschemas", "tabid", "int", "NO", 0, None),
+]
+FOREIGN_KEYS = [("OrderItems", "Orders"), ("Orders", "Customers")]
+TARGET_COLUMNS = [
+    ("orderitems", "orderitemid", "integer"),
+    ("orderitems", "orderid", "integer"),
+    ("orderitems", "unitprice", "numeric"),
+    ("orders", "orderid", "integer"),
+    ("orders", "customerid", "integer"),
+    ("orders", "orderdate", "timestamp without time zone"),
+    ("orders", "rowver", "bytea"),
+    ("customers", "customerid", "integer"),
+    ("customers", "email", "character varying"),
+]
+
+
+def test_tables_are_matched_by_sct_names_and_ordered_parents_first():
+    catalog = build_catalog(SOURCE_COLUMNS, FOREIGN_KEYS, TARGET_COLUMNS, rules={})
+    assert [t.source for t in catalog.tables()] == ["Customers", "Orders", "OrderItems"]
+    assert "systranschemas" not in catalog
+
+    orders = catalog.table("Orders")
+    assert orders.target == f"{TARGET_SCHEMA}.orders"
+    assert (orders.pk_src, orders.pk_tgt, orders.chunk_key) == ("OrderID", "orderid", "OrderID")
+    assert orders.identity.target == "orderid"
+    assert orders.parents == ["Customers"]
+    # loaded, but not compared: no kind for rowversion
+    assert [c.source for c in orders.columns] == ["OrderID", "CustomerID", "OrderDate", "RowVer"]
+    assert [(c.target, c.kind) for c in orders.compared_columns] == [("customerid", "int"), ("orderdate", "datetime")]
+    assert [c.target for c in catalog.table("OrderItems").numeric_columns] == ["orderitemid", "orderid", "unitprice"]
+    assert catalog.by_target(f"{TARGET_SCHEMA}.customers").source == "Customers"
+
+
+def test_rules_rename_and_exclude():
+    target = TARGET_COLUMNS + [("clients", "customerid", "integer"), ("clients", "mail", "text")]
+    rules = {"Customers": TableRule(target="clients", columns={"Email": "mail"}), "Orders": TableRule(exclude=["RowVer"])}
+    catalog = build_catalog(SOURCE_COLUMNS, FOREIGN_KEYS, target, rules=rules)
+    customers = catalog.table("Customers")
+    assert customers.target == f"{TARGET_SCHEMA}.clients"
+    assert [c.target for c in customers.columns] == ["customerid", "mail"]
+    assert "RowVer" not in [c.source for c in catalog.table("Orders").columns]
+
+
+def test_json_round_trip():
+    catalog = build_catalog(SOURCE_COLUMNS, FOREIGN_KEYS, TARGET_COLUMNS, rules={}, fingerprint="abc")
+    restored = Catalog.from_json(catalog.to_json())
+    assert restored.fingerprint == "abc"
+    assert restored.tables() == catalog.tables()
@@ -0,0 +1,32 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from common import columnar  # noqa: E402
+
+
+def test_copy_csv_keeps_nulls_empty_strings_and_money_scale():
+    batch = pa.record_batch(
+        [
+            pa.array([1, 2], pa.int32()),
+            pa.array([Decimal("19.9900"), None], pa.decimal128(19, 4)),
+            pa.array([datetime(2024, 2, 29, 13, 45, 1, 3000), None], pa.timestamp("ms")),
+            pa.array(['say "hi"\nbye', ""], pa.string()),
+            pa.array([None, "x"], pa.string()),
+        ],
+        names=["id", "price", "created", "note", "code"],
+    )
+    data = columnar.to_copy_csv(batch).to_pybytes().decode()
+    assert data.splitlines(keepends=True) == [
+        '1,19.9900,2024-02-29 13:45:01.003,"say ""hi""\n',
+        'bye",\n',
+        '2,,,"","x"\n',
+    ]
+
+
+def test_binary_columns_stay_on_the_row_path():
+    assert columnar.supports(["integer", "numeric", "character varying"])
+    assert not columnar.supports(["integer", "bytea"])
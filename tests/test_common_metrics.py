@@ -0,0 +1,50 @@
+import urllib.request
+
+from common.metrics import Registry, serve, write_textfile
+
+
+def test_render_counters_and_cumulative_histogram_buckets():
+    registry = Registry()
+    rows = registry.counter("rows_total", "Rows")
+    rows.inc(3, table="orders")
+    rows.inc(2, table="orders")
+    sizes = registry.histogram("batch_rows", "Batch size", buckets=(10, 100))
+    sizes.observe_many([5, 10, 50, 500], phase="load")
+
+    text = registry.render()
+    assert 'rows_total{table="orders"} 5' in text
+    assert 'batch_rows_bucket{phase="load",le="10"} 2' in text
+    assert 'batch_rows_bucket{phase="load",le="100"} 3' in text
+    assert 'batch_rows_bucket{phase="load",le="+Inf"} 4' in text
+    assert 'batch_rows_count{phase="load"} 4' in text
+    assert "# TYPE batch_rows histogram" in text
+
+    snapshot = registry.snapshot()
+    assert snapshot["rows_total"] == [{"labels": {"table": "orders"}, "value": 5}]
+    assert snapshot["batch_rows"][0]["max"] == 500
+
+
+def test_same_name_with_other_kind_is_rejected():
+    registry = Registry()
+    assert registry.counter("x", "X") is registry.counter("x", "X")
+    try:
+        registry.gauge("x", "X")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_textfile_and_http_endpoint(tmp_path):
+    registry = Registry()
+    registry.gauge("lag", "Lag").set(7, topic='a"b')
+    path = tmp_path / "metrics.prom"
+    write_textfile(str(path), registry)
+    assert 'lag{topic="a\\"b"} 7' in path.read_text()
+
+    server = serve(0, "127.0.0.1", registry)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.read().decode() == registry.render()
+    finally:
+        server.shutdown()
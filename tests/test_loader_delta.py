@@ -0,0 +1,55 @@
+from common.catalog import TableRule, build_catalog
+from loader import delta
+
+from test_common_catalog import FOREIGN_KEYS, SOURCE_COLUMNS, TARGET_COLUMNS
+
+MODIFIED = [("Customers", "ModifiedDate", "datetime", "YES", 0, None)]
+MODIFIED_TARGET = [("customers", "modifieddate", "timestamp without time zone")]
+
+
+def test_rowversion_is_preferred_then_modified_date():
+    catalog = build_catalog(SOURCE_COLUMNS + MODIFIED, FOREIGN_KEYS, TARGET_COLUMNS + MODIFIED_TARGET, rules={})
+    assert delta.watermark_for(catalog.table("Orders")) == delta.Watermark("RowVer", True)
+    assert delta.watermark_for(catalog.table("Customers")) == delta.Watermark("ModifiedDate", False)
+    assert delta.watermark_for(catalog.table("OrderItems")) is None
+
+    no_rowversion = build_catalog(SOURCE_COLUMNS, FOREIGN_KEYS, TARGET_COLUMNS, {"Orders": TableRule(exclude=["RowVer"])})
+    assert delta.watermark_for(no_rowversion.table("Orders")) is None
+
+
+def test_changed_rows_filter_bounds():
+    rv = delta.Watermark("RowVer", True)
+    assert delta.changed_rows_filter(rv, None, "0x10") == ("WHERE [RowVer] < CONVERT(BINARY(8), ?, 1)", ("0x10",))
+    where, params = delta.changed_rows_filter(rv, "0x08", "0x10")
+    assert where.startswith("WHERE [RowVer] >= CONVERT(BINARY(8), ?, 1) AND") and params == ("0x08", "0x10")
+
+    dt = delta.Watermark("ModifiedDate", False)
+    where, params = delta.changed_rows_filter(dt, None, "2024-01-02 00:00:00.000")
+    assert "IS NULL" in where and params == ("2024-01-02 00:00:00.000",)
+    where, params = delta.changed_rows_filter(dt, "2024-01-01 00:00:00.000", "2024-01-02 00:00:00.000")
+    assert f"DATEADD(SECOND, -{delta.DATETIME_OVERLAP_SECONDS}" in where and len(params) == 2
+    assert delta.changed_rows_filter(dt, "2024-01-01 00:00:00.000", None) == ("WHERE 1 = 0", ())
+
+
+def test_upsert_skips_unchanged_rows_and_key_batches_fit_sql_server():
+    sql = delta.upsert_sql("dbo.orders", ["orderid", "customerid", "orderdate"], "orderid", overriding=True)
+    assert sql.startswith("INSERT INTO dbo.orders AS t (orderid, customerid, orderdate) OVERRIDING SYSTEM VALUE ")
+    assert sql.endswith(
+        "DO UPDATE SET customerid = EXCLUDED.customerid, orderdate = EXCLUDED.orderdate "
+        "WHERE ROW(t.customerid, t.orderdate) IS DISTINCT FROM ROW(EXCLUDED.customerid, EXCLUDED.orderdate)"
+    )
+    assert delta.upsert_sql("dbo.tags", ["tagid"], "tagid").endswith("ON CONFLICT (tagid) DO NOTHING")
+
+    batches = list(delta.key_batches(list(range(2500, 0, -1))))
+    assert [len(b) for b in batches] == [1000, 1000, 500] and batches[0][0] == 1
+    where, params = delta.keys_filter("OrderID", [3, 5])
+    assert (where, params) == ("WHERE [OrderID] IN (?, ?)", (3, 5))
+    bound = delta.upper_bound_filter(delta.Watermark("RowVer", True), "0x10")
+    assert delta.keys_filter("OrderID", [3], bound) == (
+        "WHERE [OrderID] IN (?) AND [RowVer] < CONVERT(BINARY(8), ?, 1)", (3, "0x10"),
+    )
+    cutoff = delta.key_cutoff_filter("OrderItemID", 40)
+    assert delta.keys_filter("OrderItemID", [3, 50], cutoff) == (
+        "WHERE [OrderItemID] IN (?, ?) AND [OrderItemID] <= ?", (3, 50, 40),
+    )
+    assert delta.key_cutoff_filter("OrderItemID", None) == ("1 = 0", ())
@@ -0,0 +1,40 @@
+import pytest
+
+from common.catalog import build_catalog, set_catalog
+from loader.ledger import SqliteChunkLedger, high_water_mark
+
+from test_common_catalog import FOREIGN_KEYS, SOURCE_COLUMNS, TARGET_COLUMNS
+
+
+class _EmptyTableCursor:
+    def execute(self, sql, *params):
+        self.sql = sql
+
+    def fetchone(self):
+        return (None, None)
+
+
+def test_empty_table_is_planned_as_one_whole_table_chunk():
+    pytest.importorskip("pyodbc")
+    import bulk_migrate
+
+    set_catalog(build_catalog(SOURCE_COLUMNS, FOREIGN_KEYS, TARGET_COLUMNS, rules={}))
+    try:
+        (chunk,) = bulk_migrate.plan_chunks(_EmptyTableCursor(), "Orders", "dbo.orders", ["OrderID"], ["orderid"], 1000)
+    finally:
+        set_catalog(None)
+    assert (chunk.lo, chunk.hi, chunk.index, chunk.total) == (None, None, 1, 1)
+
+
+def test_whole_table_chunk_is_recorded_and_resumed(tmp_path):
+    ledger = SqliteChunkLedger(str(tmp_path / "ledger.sqlite"))
+    ledger.setup()
+    ledger.record(None, "Customers", None, None, 0)
+    ledger.record(None, "Orders", 1, 1000, 1000)
+
+    done = ledger.completed()
+    assert done == {"Customers": {(None, None)}, "Orders": {(1, 1000)}}
+    assert high_water_mark([(None, None)], done["Customers"]) is None
+
+    ledger.clear(["Customers", "Orders"])
+    assert ledger.completed() == {}
@@ -0,0 +1,40 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from psycopg import pq
+from psycopg.adapt import Transformer
+from psycopg.postgres import types as pg_types
+
+from loader import pgcopy
+from loader.pgcopy import HEADER, TRAILER, RowEncoder
+
+try:
+    from psycopg._copy_base import parse_row_binary
+except ImportError:
+    parse_row_binary = None
+
+OIDS = [pg_types.get(name).oid for name in ("integer", "numeric", "timestamp without time zone", "character varying")]
+
+
+def test_header_and_trailer_follow_the_pgcopy_format():
+    assert HEADER == b"PGCOPY\n\xff\r\n\x00" + b"\x00" * 8
+    assert TRAILER == b"\xff\xff"
+
+
+@pytest.mark.skipif(not pgcopy.available() or parse_row_binary is None, reason="psycopg internals changed")
+def test_encoded_rows_parse_back_with_the_target_types():
+    rows = [
+        (1, Decimal("19.9900"), datetime(2024, 2, 29, 13, 45, 1, 3000), "Vélo"),
+        (2, Decimal("-0.0001"), None, ""),
+    ]
+    encoder = RowEncoder(OIDS)
+    data = encoder.encode(rows[:1])
+    assert encoder.encode(rows[1:], data) is data
+
+    tx = Transformer()
+    tx.set_loader_types(OIDS, pq.Format.BINARY)
+    # one tuple: field count (int16), then per field length (int32) + data
+    first_len = 2 + sum(4 + n for n in (4, 12, 8, len("Vélo".encode())))
+    assert parse_row_binary(bytes(data[:first_len]), tx) == rows[0]
+    assert parse_row_binary(bytes(data[first_len:]), tx) == rows[1]
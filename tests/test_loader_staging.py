@@ -0,0 +1,53 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from common import columnar  # noqa: E402
+from loader import staging  # noqa: E402
+
+ROWS = [
+    (1, Decimal("19.9900"), datetime(2024, 1, 1, 10, 0, 0, 3000), "Bikes"),
+    (2, None, None, ""),
+    (3, Decimal("-0.0100"), datetime(2024, 1, 2), None),
+]
+
+
+@pytest.mark.parametrize("fmt", sorted(staging.FORMATS))
+def test_chunk_round_trip_through_a_staged_file(tmp_path, fmt):
+    types = staging.source_arrow_types(["int", "money", "datetime", "nvarchar"])
+    batches = staging.batches_from_rows([ROWS[:2], ROWS[2:]], types)
+    path = tmp_path / staging.chunk_file("Products", 1, fmt)
+    rows, size = staging.write_chunk(path, batches, fmt)
+    assert (rows, path.name) == (3, f"00001{staging.FORMATS[fmt]}")
+    assert size == path.stat().st_size
+
+    read = list(staging.read_chunk(path, fmt, batch_size=2))
+    assert read[0].schema.types == [pa.int32(), pa.decimal128(19, 4), pa.timestamp("ms"), pa.string()]
+    assert [tuple(r.values()) for b in read for r in b.to_pylist()] == ROWS
+    assert columnar.to_copy_csv(read[0]).to_pybytes().startswith(b'1,19.9900,2024-01-01 10:00:00.003,"Bikes"\n')
+
+
+def test_empty_chunk_writes_no_file(tmp_path):
+    path = tmp_path / "Orders" / "00001.parquet"
+    assert staging.write_chunk(path, iter(()), "parquet") == (0, 0)
+    assert not path.exists()
+
+
+def test_manifest_is_replaced_atomically_and_versioned(tmp_path):
+    root = staging.StageRoot(str(tmp_path))
+    chunk = staging.StagedChunk(1, 0, 99, "Orders/00001.parquet", 10, 1234)
+    root.write_manifest({
+        "version": staging.MANIFEST_VERSION,
+        "tables": [staging.manifest_table("Orders", "t.orders", ["OrderID"], ["orderid"], "OrderID", [chunk])],
+    })
+    table = root.read_manifest()["tables"][0]
+    assert staging.staged_chunks(table) == [chunk]
+
+    root.invalidate()
+    assert not (tmp_path / staging.MANIFEST).exists()
+    (tmp_path / staging.MANIFEST).write_text('{"version": 0}')
+    with pytest.raises(ValueError):
+        root.read_manifest()
@@ -0,0 +1,42 @@
+import pathlib
+
+from migrator.statements import needs_autocommit, plan_segments, split_statements
+
+REPO = pathlib.Path(__file__).resolve().parents[1]
+
+
+def test_semicolons_inside_literals_comments_and_bodies_do_not_split():
+    sql = """
+        -- header; not a statement
+        INSERT INTO t VALUES ('a;b', "odd;name");
+        /* block /* nested; */ still comment; */
+        CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;
+        SELECT $$x;y$$
+    """
+    assert split_statements(sql) == [
+        "INSERT INTO t VALUES ('a;b', \"odd;name\")",
+        "CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql",
+        "SELECT $$x;y$$",
+    ]
+
+
+def test_concurrent_index_builds_are_grouped_outside_transactions():
+    statements = [
+        "CREATE TABLE t (id int)",
+        "CREATE INDEX CONCURRENTLY ix_a ON t (a)",
+        "create unique index concurrently ix_b on t (b)",
+        "ANALYZE t",
+    ]
+    assert [(s.transactional, len(s.statements)) for s in plan_segments(statements)] == [
+        (True, 1),
+        (False, 2),
+        (True, 1),
+    ]
+    assert not needs_autocommit("CREATE INDEX ix_c ON t (c)")
+
+
+def test_repo_migrations_split_cleanly():
+    constraints = (REPO / "migration/manual-fixes/001_constraints.sql").read_text()
+    statements = split_statements(constraints)
+    assert len(statements) == 11
+    assert all(s.startswith("ALTER TABLE") for s in statements)
@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+from common.catalog import TARGET_SCHEMA, build_catalog, set_catalog  # noqa: E402
+from validation import checks_metrics  # noqa: E402
+
+from test_common_catalog import FOREIGN_KEYS, SOURCE_COLUMNS, TARGET_COLUMNS  # noqa: E402
+
+
+class FakeCursor:
+    """Empty source: no key bounds, and every aggregate over zero rows."""
+
+    def execute(self, sql, *params):
+        self.row = (None, None) if sql.startswith("SELECT MIN(") else (0,) + (0, None, None, None) * 3
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeSource:
+    def cursor(self):
+        return FakeCursor()
+
+
+class FakeTarget:
+    """Three rows, all of them found only by a scan without a key range."""
+
+    def execute(self, sql, params):
+        row = (0,) + (0, None, None, None) * 3 if "WHERE" in sql else (3,) + (3, 6, 1, 3) * 3
+        return type("Result", (), {"fetchone": lambda self: row})()
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextmanager
+    def connection(self):
+        yield self.conn
+
+
+def test_empty_source_still_aggregates_target_rows():
+    set_catalog(build_catalog(SOURCE_COLUMNS, FOREIGN_KEYS, TARGET_COLUMNS, rules={}))
+    try:
+        ranges = checks_metrics.sqlserver_key_ranges(FakeSource(), partitions=4)
+        assert ranges["Customers"] == [None]
+
+        src = checks_metrics._partitioned(FakePool(FakeSource()), checks_metrics.sqlserver_table_aggregates, ranges, 2)
+        tgt = checks_metrics._partitioned(FakePool(FakeTarget()), checks_metrics.postgres_table_aggregates, ranges, 2)
+        assert tgt[(f"{TARGET_SCHEMA}.customers", "customerid")].count == 3
+        assert not checks_metrics.compare_metrics(src, tgt)
+    finally:
+        set_catalog(None)
@@ -0,0 +1,30 @@
+from datetime import datetime
+from decimal import Decimal
+
+from validation.normalize import compare_rows
+
+COLUMNS = [("price", "money"), ("name", "text"), ("created", "datetime"), ("qty", "int")]
+
+
+def test_driver_representations_compare_equal():
+    src = [(1, Decimal("9.99"), "Bike  ", datetime(2024, 1, 1, 10, 0, 0, 3000), 5)]
+    tgt = [(1, Decimal("9.9900"), "Bike", datetime(2024, 1, 1, 10, 0, 0, 3333), 5)]
+    assert compare_rows("id", COLUMNS, src, tgt) == []
+
+
+def test_nulls_match_and_real_differences_are_reported():
+    src = [(1, Decimal("1.5"), None, None, None), (2, Decimal("1"), "a", None, 1)]
+    tgt = [(1, Decimal("1.5001"), None, None, None), (3, Decimal("1"), "a", None, 1)]
+    diffs = compare_rows("id", COLUMNS, src, tgt)
+    assert [(d.pk, d.kind, d.column) for d in diffs] == [
+        (1, "changed", "price"),
+        (2, "missing_in_target", None),
+        (3, "missing_in_source", None),
+    ]
+    assert diffs[0].source == Decimal("1.5")
+
+
+def test_large_money_values_compare_exactly():
+    src = [(1, Decimal("922337203685.4775"))]
+    tgt = [(1, Decimal("922337203685.4776"))]
+    assert [d.column for d in compare_rows("id", [("amount", "money")], src, tgt)] == ["amount"]